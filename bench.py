@@ -0,0 +1,224 @@
+"""
+Headless end-to-end benchmark for GestureReader.
+
+Feeds a recorded video or image sequence (e.g. frames/%05d.png) through the
+full pipeline with a saved board calibration and a stub sender, then prints
+throughput and per-stage latency as JSON.
+
+    python bench.py recording.mp4 --calibration board.npz --output run.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+from utils.profiling import StageProfiler
+
+
+class NullSender:
+    """ Stands in for WebSocketSyncSender and only counts what would have been sent. """
+
+    def __init__(self):
+        self.counters = {'sent': 0, 'dropped': 0, 'reconnects': 0, 'errors': 0}
+
+    def send_sync(self, xval, yval, gestval, xdim, ydim, top_leftx, top_lefty, event=None, timing=None, hand=None):
+        self.counters['sent'] += 1
+
+    def send_stroke(self, points, xdim, ydim, hand=None):
+        self.counters['sent'] += 1
+
+    def stats(self):
+        return dict(self.counters)
+
+    def close(self):
+        pass
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class AllocationTracer:
+    """
+    Allocation counts and bytes per frame and per profiler stage, from tracemalloc.
+
+    Block counts and byte totals come from snapshot statistics taken around every
+    stage. They are net: what a stage left allocated, with temporaries it freed
+    again not counted. The per-frame peak is folded in before each snapshot and
+    reset after it, so the snapshots' own memory never shows up in it. Snapshots
+    make every stage much slower, so stage latencies from a traced run are not
+    comparable to untraced ones.
+    """
+
+    FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+    def __init__(self):
+        self.frames = []  # (peak bytes, net blocks, net bytes) per frame
+        self.stages = defaultdict(list)  # name -> [(net blocks, net bytes)]
+        self.frame_peak = 0
+
+    def _totals(self):
+        _, peak = tracemalloc.get_traced_memory()
+        self.frame_peak = max(self.frame_peak, peak)
+        stats = tracemalloc.take_snapshot().filter_traces(self.FILTERS).statistics("filename")
+        totals = sum(stat.count for stat in stats), sum(stat.size for stat in stats)
+        del stats
+        tracemalloc.reset_peak()
+        return totals
+
+    def wrap_stage(self, stage):
+        @contextlib.contextmanager
+        def traced(name):
+            blocks, size = self._totals()
+            with stage(name):
+                yield
+            after_blocks, after_size = self._totals()
+            self.stages[name].append((after_blocks - blocks, after_size - size))
+        return traced
+
+    def wrap_frame(self, process_frame):
+        def traced(*args, **kwargs):
+            base, _ = tracemalloc.get_traced_memory()
+            self.frame_peak = base
+            blocks, size = self._totals()
+            process_frame(*args, **kwargs)
+            after_blocks, after_size = self._totals()
+            self.frames.append((self.frame_peak - base, after_blocks - blocks, after_size - size))
+        return traced
+
+
+def trace_allocations(reader, profiler):
+    """ Wrap reader.process_frame and the profiler's stages with an AllocationTracer and start tracing. """
+    tracer = AllocationTracer()
+    reader.process_frame = tracer.wrap_frame(reader.process_frame)
+    profiler.stage = tracer.wrap_stage(profiler.stage)
+    tracemalloc.start()
+    return tracer
+
+
+def summarize_allocations(tracer):
+    if tracer is None or not tracer.frames:
+        return {}
+    peaks = sorted(frame[0] for frame in tracer.frames)
+    return {
+        'frames': len(peaks),
+        'peak_kb_p50': peaks[len(peaks) // 2] / 1024,
+        'peak_kb_max': peaks[-1] / 1024,
+        'peak_kb_mean': sum(peaks) / len(peaks) / 1024,
+        'net_blocks_per_frame': sum(frame[1] for frame in tracer.frames) / len(peaks),
+        'net_kb_per_frame': sum(frame[2] for frame in tracer.frames) / len(peaks) / 1024,
+        'stages': {name: {
+            'calls': len(samples),
+            'net_blocks_mean': sum(blocks for blocks, _ in samples) / len(samples),
+            'net_blocks_total': sum(blocks for blocks, _ in samples),
+            'net_kb_mean': sum(size for _, size in samples) / len(samples) / 1024,
+        } for name, samples in tracer.stages.items() if samples},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(args):
+    # Imported here so --help works without mediapipe installed
+    from new_main import GestureReader
+    from utils.tracking import LandmarkTracker
+
+    if not os.path.exists(args.calibration):
+        raise SystemExit(f"Calibration file {args.calibration} not found; benchmarks never open the picker")
+
+    profiler = StageProfiler()
+    sender = NullSender()
+    reader = GestureReader(args.source, sender, single_model=not args.dual_model, roi=args.roi,
+                           roi_padding=args.roi_padding, inference_width=args.inference_width,
+                           calibration_path=args.calibration, auto_calibrate=False, interactive=False,
+                           sync_inference=True, profiler=profiler,
+                           flip_pixels=args.flip_pixels, max_hands=args.max_hands,
+                           tracker=LandmarkTracker(max_interval=args.max_track_interval) if args.track else None)
+
+    # Keep the background model build out of the measured loop
+    reader.wait_until_ready()
+    allocations = trace_allocations(reader, profiler) if args.trace_allocations else None
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    frames = reader.start_recognition(max_frames=args.max_frames)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    reader.cap.release()
+    if args.trace_allocations:
+        tracemalloc.stop()
+
+    return {
+        'revision': git_revision(),
+        'source': args.source,
+        'settings': {
+            'dual_model': args.dual_model,
+            'roi': args.roi,
+            'roi_padding': args.roi_padding,
+            'inference_width': args.inference_width,
+            'track': args.track,
+            'flip_pixels': args.flip_pixels,
+            'max_track_interval': args.max_track_interval,
+        },
+        'frames': frames,
+        'wall_s': wall,
+        'fps': frames / wall if wall > 0 else 0.0,
+        'cpu_s': cpu,
+        'cpu_per_frame_ms': cpu * 1000.0 / frames if frames else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'startup': reader.startup,
+        'stages': profiler.summary(),
+        'sender': sender.stats(),
+        'capture': reader.cap.stats(),
+        'tracker': reader.tracker.stats() if reader.tracker is not None else {},
+        'events': reader.gesture_gate.stats(),
+        'inference': reader.inference_counters,
+        'allocations': summarize_allocations(allocations),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark GestureReader on recorded input.")
+    parser.add_argument("source", help="video file or printf-style image sequence")
+    parser.add_argument("--calibration", required=True, help="board calibration .npz")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--dual-model", action="store_true")
+    parser.add_argument("--roi", action="store_true")
+    parser.add_argument("--roi-padding", type=int, default=40)
+    parser.add_argument("--inference-width", type=int, default=None)
+    parser.add_argument("--track", action="store_true")
+    parser.add_argument("--max-track-interval", type=int, default=6)
+    parser.add_argument("--flip-pixels", action="store_true", help="use the old cv2.flip preprocessing")
+    parser.add_argument("--max-hands", type=int, default=1, help="hands detected and tracked per frame")
+    parser.add_argument("--trace-allocations", action="store_true",
+                        help="measure allocation bytes and block counts per frame and stage with tracemalloc "
+                             "(slows the run a lot)")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Keep the pipeline's console output off stdout so the report stays machine-readable
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmark(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -18,7 +18,99 @@ pdfjs.GlobalWorkerOptions.workerSrc = `//unpkg.com/pdfjs-dist@${pdfjs.version}/b
 
 const WS_SERVER = "ws://localhost:8080/ws?id=2";
 const DISTANCE_THRESHOLD = 50;
-const GESTURE_COOLDOWN = 1500;
+
+// Binary point-stream protocol (v2), see utils/protocol.py on the Python side
+const PROTOCOL_BINARY = 2;
+const FRAME_HEADER = 0;
+const FRAME_POINTS = 1;
+const QUANT_MAX = 0xffff;
+// The top three bits of a point's gesture byte carry the presenter's hand id
+const HAND_SHIFT = 5;
+const GESTURE_MASK = (1 << HAND_SHIFT) - 1;
+const GESTURE_NAMES: Record<number, string> = {
+  1: "draw",
+  2: "laser",
+  3: "erase",
+  4: "next",
+  5: "previous",
+  16: "Thumb_Up",
+  17: "Thumb_Down",
+  18: "Open_Palm",
+  19: "Closed_Fist",
+  20: "ILoveYou",
+  21: "Pointing_Up",
+  22: "Victory",
+};
+
+interface BinarySession {
+  from: string;
+  xdim: number;
+  ydim: number;
+}
+
+// A relayed message, from JSON or expanded from a binary point batch
+interface GestureMessage {
+  to: string;
+  from: string;
+  gestval: string;
+  xval: number;
+  yval: number;
+  xdim: number;
+  ydim: number;
+  hand?: number;
+  event?: "start" | "end";
+  points?: number[][];
+  // Latency trace fields (seq and per-hop times in ms), echoed back in the ack
+  trace?: Record<string, number>;
+}
+
+// Expands a binary frame into the same message shape the JSON path produces
+const decodeBinaryFrame = (
+  buffer: ArrayBuffer,
+  lastSession: { current: BinarySession | null }
+): GestureMessage[] => {
+  const view = new DataView(buffer);
+  const bytes = new Uint8Array(buffer);
+  const decoder = new TextDecoder();
+  if (bytes[0] !== 0x47 || bytes[1] !== 0x46) return [];
+  const frameType = bytes[3];
+  const toLength = bytes[4];
+  const to = decoder.decode(bytes.subarray(5, 5 + toLength));
+  let offset = 5 + toLength;
+
+  if (frameType === FRAME_HEADER) {
+    const fromLength = bytes[offset];
+    const from = decoder.decode(bytes.subarray(offset + 1, offset + 1 + fromLength));
+    offset += 1 + fromLength;
+    const session = {
+      from,
+      xdim: view.getUint16(offset, true),
+      ydim: view.getUint16(offset + 2, true),
+    };
+    lastSession.current = session;
+    return [];
+  }
+
+  const session = lastSession.current;
+  if (frameType !== FRAME_POINTS || !session) return [];
+  const count = view.getUint16(offset + 4, true);
+  offset += 6;
+  const messages: GestureMessage[] = [];
+  for (let i = 0; i < count; i++) {
+    const base = offset + i * 7;
+    messages.push({
+      to,
+      from: session.from,
+      xval: (view.getUint16(base + 2, true) / QUANT_MAX) * session.xdim,
+      yval: (view.getUint16(base + 4, true) / QUANT_MAX) * session.ydim,
+      gestval: GESTURE_NAMES[bytes[base + 6] & GESTURE_MASK] ?? "unknown",
+      hand: bytes[base + 6] >> HAND_SHIFT,
+      xdim: session.xdim,
+      ydim: session.ydim,
+    });
+  }
+  return messages;
+};
 
 interface SpeechModalProps {
   showImageModal: boolean;
@@ -289,14 +381,14 @@ const WebSocketCanvas = () => {
   const drawingCanvasRef = useRef<HTMLCanvasElement | null>(null);
   const drawingCtxRef = useRef<CanvasRenderingContext2D | null>(null);
   const pdfContainerRef = useRef<HTMLDivElement | null>(null); // Captures both PDF and Annotations
-  const lastPointRef = useRef<{ x: number; y: number } | null>(null);
-  const lastGestureTimeRef = useRef<number>(0);
+  // Last drawn point per hand id, so several presenters draw separate lines
+  const lastPointsRef = useRef(new Map<number, { x: number; y: number }>());
   const [isConnected, setIsConnected] = useState(false);
   const [pdfFile, setPdfFile] = useState<string | null>(null);
   const [pdfPageWidth, setPdfPageWidth] = useState<number | null>(null);
   const [numPages, setNumPages] = useState(0);
   const [pageNumber, setPageNumber] = useState(1);
-  const pointCounterRef = useRef(0);
+  const pointCountersRef = useRef(new Map<number, number>());
   const laserCanvasRef = useRef<HTMLCanvasElement | null>(null);
   const laserCtxRef = useRef<CanvasRenderingContext2D | null>(null);
   const laserPointerRef = useRef<{ x: number; y: number } | null>(null);
@@ -345,7 +437,7 @@ const WebSocketCanvas = () => {
       drawingCanvasRef.current.width,
       drawingCanvasRef.current.height
     );
-    lastPointRef.current = null;
+    lastPointsRef.current.clear();
   }, []);
 
   const goToNextPage = useCallback(() => {
@@ -366,68 +458,89 @@ const WebSocketCanvas = () => {
 
   useEffect(() => {
     const ws = new WebSocket(WS_SERVER);
+    ws.binaryType = "arraybuffer";
+    const lastSession: { current: BinarySession | null } = { current: null };
 
     ws.onopen = () => {
       console.log("Connected to WebSocket");
       setIsConnected(true);
     };
 
+    const handleMessage = (data: GestureMessage) => {
+      // Gesture events arrive as start/end pairs, only the start triggers an action
+      if (data.event === "end") return;
+      if (data.gestval === "stroke" && data.to === "2" && data.from === "1") {
+        drawStroke(data.points ?? [], data.xdim, data.ydim, data.hand ?? 0);
+        return;
+      }
+      if (data.to !== "2" || data.from !== "1") return;
+      // Gestures arrive once per start edge and are already rate limited per gesture
+      // by the sender's GestureEventGate, so they act immediately
+      if (data.gestval === "Thumb_Up") {
+        goToNextPage();
+      } else if (data.gestval === "Thumb_Down") {
+        goToPreviousPage();
+      } else if (data.gestval === "ILoveYou") {
+        setShowImageModal((prev) => !prev);
+      } else if (data.gestval === "Open_Palm") {
+        resetCanvas();
+      } else if (data.gestval === "Closed_Fist") {
+        setShowTextModal((prev) => !prev);
+      } else if (data.gestval === "draw" || data.gestval === "laser") {
+        const hand = data.hand ?? 0;
+        const count = (pointCountersRef.current.get(hand) ?? 0) + 1;
+        pointCountersRef.current.set(hand, count);
+        const x_scaled = data.xval * (window.innerWidth / data.xdim);
+        const y_scaled = data.yval * (window.innerHeight / data.ydim);
+        console.log("scaled", x_scaled, y_scaled);
+        if (count % 2 === 0) {
+          if (data.gestval === "draw") {
+            drawPoint(x_scaled, y_scaled, hand);
+          } else {
+            updateLaserPointer(x_scaled, y_scaled);
+          }
+        }
+      }
+    };
+
+    // Echo latency traces back to the sender once the update has been painted
+    const acknowledgeTrace = (data: GestureMessage, receivedAt: number) => {
+      requestAnimationFrame(() => {
+        if (ws.readyState !== WebSocket.OPEN) return;
+        ws.send(
+          JSON.stringify({
+            to: data.from,
+            from: data.to,
+            gestval: "trace_ack",
+            trace: { ...data.trace, t_recv: receivedAt, t_render: Date.now() },
+          })
+        );
+      });
+    };
+
     ws.onmessage = (event) => {
+      const receivedAt = Date.now();
       try {
+        if (event.data instanceof ArrayBuffer) {
+          decodeBinaryFrame(event.data, lastSession).forEach(handleMessage);
+          return;
+        }
         const data = JSON.parse(event.data);
-        console.log(data);
-        const now = Date.now();
-        if (now - lastGestureTimeRef.current > GESTURE_COOLDOWN) {
-          lastGestureTimeRef.current = now;
-          if (
-            data.to === "2" &&
-            data.from === "1" &&
-            data.gestval === "Thumb_Up"
-          ) {
-            goToNextPage();
-            return;
-          } else if (
-            data.to === "2" &&
-            data.from === "1" &&
-            data.gestval === "Thumb_Down"
-          ) {
-            goToPreviousPage();
-            return;
-          } else if (
-            data.to === "2" &&
-            data.from === "1" &&
-            data.gestval === "ILoveYou"
-          ) {
-            setShowImageModal((prev) => !prev);
-            return;
-          } else if (
-            data.to === "2" &&
-            data.from === "1" &&
-            data.gestval === "Open_Palm"
-          ) {
-            resetCanvas();
-            return;
-          } else if (
-            data.to === "2" &&
-            data.from === "1" &&
-            data.gestval === "Closed_Fist"
-          ) {
-            setShowTextModal((prev) => !prev);
-            return;
-          }
-        } else if (data.to === "2" && data.from === "1") {
-          pointCounterRef.current += 1;
-          const x_scaled = data.xval * (window.innerWidth / data.xdim);
-          const y_scaled = data.yval * (window.innerHeight / data.ydim);
-          console.log("scaled", x_scaled, y_scaled);
-          if (pointCounterRef.current % 2 === 0) {
-            if (data.gestval === "draw") {
-              drawPoint(x_scaled, y_scaled);
-            } else {
-              updateLaserPointer(x_scaled, y_scaled);
-            }
-          }
+        if (data.gestval === "protocol_hello") {
+          const protocols: number[] = data.protocols ?? [];
+          ws.send(
+            JSON.stringify({
+              to: data.from,
+              from: data.to,
+              gestval: "protocol_ack",
+              protocol: protocols.includes(PROTOCOL_BINARY) ? PROTOCOL_BINARY : 1,
+            })
+          );
+          return;
         }
+        console.log(data);
+        handleMessage(data);
+        if (data.trace) acknowledgeTrace(data, receivedAt);
       } catch (error) {
         console.error("Invalid WebSocket message", error);
       }
@@ -443,27 +556,38 @@ const WebSocketCanvas = () => {
     };
   }, [goToNextPage, goToPreviousPage]);
 
-  const drawPoint = (x: number, y: number) => {
+  const drawPoint = (x: number, y: number, hand = 0) => {
     if (!drawingCtxRef.current) return;
     const ctx = drawingCtxRef.current;
+    const last = lastPointsRef.current.get(hand);
 
-    if (lastPointRef.current) {
-      const { x: lastX, y: lastY } = lastPointRef.current;
-      const distance = Math.sqrt((x - lastX) ** 2 + (y - lastY) ** 2);
-
-      if (distance > DISTANCE_THRESHOLD) {
+    // Each segment is its own path so interleaved hands never join up
+    if (last) {
+      const distance = Math.sqrt((x - last.x) ** 2 + (y - last.y) ** 2);
+      if (distance <= DISTANCE_THRESHOLD) {
         ctx.beginPath();
-        ctx.moveTo(window.innerWidth - x, y);
-      } else {
+        ctx.moveTo(window.innerWidth - last.x, last.y);
         ctx.lineTo(window.innerWidth - x, y);
         ctx.stroke();
       }
-    } else {
-      ctx.beginPath();
-      ctx.moveTo(x, y);
     }
 
-    lastPointRef.current = { x, y };
+    lastPointsRef.current.set(hand, { x, y });
+  };
+
+  const drawStroke = (points: number[][], xdim: number, ydim: number, hand = 0) => {
+    if (!drawingCtxRef.current || points.length === 0) return;
+    const ctx = drawingCtxRef.current;
+    const sx = window.innerWidth / xdim;
+    const sy = window.innerHeight / ydim;
+    ctx.beginPath();
+    points.forEach(([x, y], i) => {
+      const px = window.innerWidth - x * sx;
+      if (i === 0) ctx.moveTo(px, y * sy);
+      else ctx.lineTo(px, y * sy);
+    });
+    ctx.stroke();
+    lastPointsRef.current.delete(hand);
   };
 
   const updateLaserPointer = (x: number, y: number) => {
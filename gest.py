@@ -1,7 +1,12 @@
+import argparse
+
 import cv2
 import numpy as np
 import mediapipe as mp
 
+from utils.capture import open_frame_source
+from utils.preview import PreviewServer
+
 # Initialize MediaPipe Gesture Recognizer
 BaseOptions = mp.tasks.BaseOptions
 GestureRecognizer = mp.tasks.vision.GestureRecognizer
@@ -26,33 +31,52 @@ options = GestureRecognizerOptions(
     result_callback=print_result
 )
 
-# Open webcam
-cap = cv2.VideoCapture(0)
+parser = argparse.ArgumentParser(description="Headless gesture recognition with an optional MJPEG preview.")
+parser.add_argument("sources", nargs="*", default=[0], help="camera index, video path or shm://name (default: webcam 0)")
+parser.add_argument("--preview-port", type=int, default=0, help="serve an MJPEG preview on this port (0 disables it)")
+parser.add_argument("--preview-host", default="127.0.0.1")
+parser.add_argument("--preview-fps", type=float, default=10.0)
+parser.add_argument("--preview-width", type=int, default=640)
+args = parser.parse_args()
+
+
+def draw_gesture(frame, gesture):
+    # Runs on the preview thread, on its own copy of the frame
+    if gesture:
+        cv2.putText(frame, f"Gesture: {gesture}", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
 
-# Initialize the gesture recognizer
-with GestureRecognizer.create_from_options(options) as recognizer:
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
 
-        # Convert OpenCV frame to MediaPipe Image
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+preview = None
+if args.preview_port:
+    preview = PreviewServer(args.preview_port, args.preview_host, render=draw_gesture,
+                            max_fps=args.preview_fps, width=args.preview_width).start()
 
-        # Send the image to the recognizer asynchronously
-        recognizer.recognize_async(mp_image, int(cap.get(cv2.CAP_PROP_POS_MSEC)))
+# Open webcam, or attach to a frame bus with `python gest.py shm://gitframe`
+cap = open_frame_source(args.sources)
+last_timestamp_ms = -1
 
-        # Display recognized gesture on frame
-        if gesture_result:
-            cv2.putText(frame, f"Gesture: {gesture_result}", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+# Initialize the gesture recognizer; runs headless until interrupted
+try:
+    with GestureRecognizer.create_from_options(options) as recognizer:
+        while cap.isOpened():
+            ret, frame, capture_time = cap.read_with_time(timeout=1.0)
+            if not ret:
+                continue
 
-        # Show the video feed
-        cv2.imshow('Gesture Recognition', frame)
+            # Convert OpenCV frame to MediaPipe Image
+            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
 
-        # Exit on pressing 'q'
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+            # Send the image to the recognizer asynchronously; live streams need strictly increasing timestamps
+            last_timestamp_ms = max(int(capture_time * 1000), last_timestamp_ms + 1)
+            recognizer.recognize_async(mp_image, last_timestamp_ms)
 
-# Release resources
-cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+            # Hand the frame and the latest gesture to the preview; a no-op while nobody watches
+            if preview is not None:
+                preview.submit(frame, gesture_result)
+except KeyboardInterrupt:
+    pass
+finally:
+    # Release resources
+    if preview is not None:
+        preview.stop()
+    cap.release()
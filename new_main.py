@@ -1,53 +1,223 @@
 import cv2
 import numpy as np
 from collections import deque
-import mediapipe as mp
+from concurrent.futures import ThreadPoolExecutor
 import json
 import websockets
 import asyncio
+import argparse
+import logging
+import threading
+import time
+from utils.board import BoardCalibration, calibration_path_for
+from utils.capture import open_frame_source
+from utils.events import GestureEventGate
+from utils.filters import GestureFilterBank
+from utils.hands import HandIdAssigner, HandStates, hand_centroids, match_hands
+from utils.landmarks import ArrayHand, evaluate, hands_to_array, landmark_array
+from utils.log import setup_logging
+from utils.pipeline import DROP_POLICIES, BoundedQueue, ParallelStage, Pipeline, Stage
+from utils.preprocess import FramePreprocessor
+from utils.profiling import MetricsServer, NullProfiler, RollingProfiler, StatsReporter
+from utils.protocol import (ACK, HELLO, MAX_HAND_IDS, PROTOCOL_BINARY, PROTOCOL_JSON, PointBatcher,
+                            encode_session_header)
+from utils.recording import LandmarkRecorder, LandmarkRecording
+from utils.strokes import StrokeStore
+from utils.tracing import TRACE_ACK, LatencyCollector, monotonic_to_ms, wall_ms
+from utils.tracking import LandmarkTracker
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = "gesture_recognizer.task"
 
 class GestureReader:
-    def __init__(self, ip, ws_sender):
-        try:
-            self.cap = cv2.VideoCapture(4)
-        except:
-            self.cap = cv2.VideoCapture(0)
+    def __init__(self, source, ws_sender, single_model=True, roi=False, roi_padding=40, inference_width=None,
+                 calibration_path=None, sync_inference=False, profiler=None, point_filter=None,
+                 tracker=None, gesture_gate=None, stroke_store=None, stream_strokes=False, flip_pixels=False,
+                 max_in_flight=1, in_flight_timeout=0.5, calibration_dir="calibrations", auto_calibrate=True,
+                 interactive=True, replay=None, replay_speed=1.0, record_path=None, pipeline=False,
+                 inference_workers=0, queue_size=4, drop_policy="drop_oldest", max_hands=1,
+                 hand_match_distance=0.2):
+        self.created_at = time.monotonic()
+        self.startup = {}
+        # Read drawing landmarks from GestureRecognizer instead of running a second Hands model
+        self.single_model = single_model
+        # Every hand up to `max_hands` comes out of the same inference pass
+        self.max_hands = max_hands
+        # Pipelined execution runs each step on its own thread, with inference optionally in worker processes
+        self.pipeline = pipeline
+        self.inference_workers = inference_workers if pipeline else 0
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.stages = None
+        if pipeline and not single_model:
+            logger.warning("The pipeline only supports the single-model path, ignoring dual-model")
+            single_model = self.single_model = True
+        # Synchronous VIDEO-mode inference processes every frame, which is what benchmarks want;
+        # pipeline stages call the recognizer synchronously as well
+        self.sync_inference = sync_inference or pipeline
+        # A LandmarkRecording replaces camera and models: recorded landmarks go straight to the gesture logic
+        self.replay = replay
+        self.replay_speed = replay_speed
+        self.replay_time = None
+        if replay is None and not self.inference_workers:
+            # Import mediapipe and build the models in the background while the camera opens and calibrates
+            warmup_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="warmup")
+            self.recognizer_future = warmup_pool.submit(self.build_recognizer)
+            warmup_pool.shutdown(wait=False)
+        else:
+            self.recognizer_future = None
 
-        ret, frame = self.cap.read()
-        if not ret:
-            print("Failed to capture image from camera.")
-            return
+        if replay is None:
+            # `source` may be an RTSP/HTTP URL, a device index or a video file, a list of fallbacks,
+            # or "shm://name" to read a frame bus another process decodes into.
+            # Pipeline stages hold frames across reads, so they get copies rather than shared views
+            self.cap = open_frame_source(source, copy_frames=pipeline)
+
+            ret, frame = self.cap.read(timeout=5.0)
+            if not ret:
+                logger.error("Failed to capture image from camera.")
+                return
+            frame_shape = frame.shape
+            self.mark_startup("camera")
+        else:
+            self.cap = None
+            frame = None
+            frame_shape = replay.frame_shape
 
         self.coords = []
+        # Crop inference to the padded whiteboard box, optionally downscaled to `inference_width`
+        self.roi = roi
+        self.roi_padding = roi_padding
+        self.inference_width = inference_width
+        self.roi_rect = None
+        # One color conversion per frame into reused buffers; mirroring happens on landmark coordinates
+        self.preprocessor = FramePreprocessor(inference_width, flip_pixels=flip_pixels)
+        self.profiler = profiler or NullProfiler()
+        self.point_filter = point_filter or GestureFilterBank("none")
+        # Optional detect-then-track scheduler; only used with the single-model path
+        self.tracker = tracker if single_model and not pipeline else None
+        if tracker is not None and self.tracker is None:
+            logger.warning("Landmark tracking needs the single-model, non-pipelined path, "
+                           "running full inference on every frame")
+        self.tracked_hands = []
+        # Edge-triggered gesture events and movement-gated points instead of per-frame messages
+        self.gesture_gate = gesture_gate or GestureEventGate()
+        # Vector strokes; with stream_strokes, finished simplified strokes replace raw draw points
+        self.stroke_store = stroke_store if stroke_store is not None or not stream_strokes else StrokeStore()
+        self.stream_strokes = stream_strokes
+        # Hands keep an id across frames by nearest centroid; each id has its own gate, filter and strokes
+        # A couple of spare ids let a hand that reappears elsewhere start fresh while its old track expires;
+        # a single hand always keeps id 0
+        self.hand_ids = HandIdAssigner(max_distance=hand_match_distance,
+                                       max_ids=min(max_hands + 2, MAX_HAND_IDS) if max_hands > 1 else 1)
+        self.hand_states = HandStates(self.gesture_gate, self.point_filter, self.stroke_store)
+        self.frame_hand_ids = []
+        self.frame_rgb = None  # RGB conversion of the current frame, once something has made it
+        self.frame_gesture_indices = []  # recognizer hand index for each detected hand
+        self.hand_match_distance = hand_match_distance
+        # Frames are submitted with their real capture time; at most `max_in_flight` may be pending
+        self.max_in_flight = max_in_flight
+        self.in_flight_timeout = in_flight_timeout
+        self.in_flight = {}  # timestamp_ms -> (capture time, submit time)
+        self.inference_lock = threading.Lock()
+        self.last_timestamp_ms = -1
+        self.inference_counters = {'submitted': 0, 'completed': 0, 'skipped_busy': 0, 'expired': 0, 'stale': 0}
+        self.frames_processed = 0
+        self.started_at = None
         self.ws_sender = ws_sender  # WebSocket sender instance
-        self.get_whiteboard(frame)
+        if replay is not None:
+            self.board = BoardCalibration.load(calibration_path) if calibration_path else replay.board()
+        else:
+            self.board = self.resolve_board(frame, calibration_path or (
+                calibration_path_for(self.cap.source, calibration_dir) if calibration_dir else None),
+                auto_calibrate, interactive)
+        if self.board is not None:
+            self.coords = [tuple(int(v) for v in corner) for corner in self.board.corners]
+        self.mark_startup("calibration")
         self.xdim = 0
         self.ydim = 0
 
         self.lastLaserCoords = (0, 0)
-        
-        if len(self.coords) == 4:
-            x_vals, y_vals = zip(*self.coords)
-            self.xdim = max(x_vals) - min(x_vals)
-            self.ydim = max(y_vals) - min(y_vals)
-            self.top_left_x = min(x_vals)
-            self.top_left_y = min(y_vals)
-        else:
 
+        if self.board is not None:
+            self.xdim, self.ydim = self.board.xdim, self.board.ydim
+            self.top_left_x, self.top_left_y = self.board.top_left_x, self.board.top_left_y
+        else:
             self.xdim, self.ydim = 1920, 1080
-        print(f"Whiteboard dimensions: {self.xdim} x {self.ydim}")
+            self.top_left_x, self.top_left_y = 0, 0
+        logger.info("Whiteboard dimensions: %s x %s", self.xdim, self.ydim)
+        self.gesture_result = None
+        self.gesture_score = 0.0
+        self.recognized_hands = []
+        self.result_timestamp_ms = -1
+        # (timestamp_ms, gesture, score, hands, handedness, hand gestures, (capture time, result time))
+        # from one frame, swapped in as a whole
+        self.latest_result = (-1, None, 0.0, [], [], [], None)
+        self.handedness = []
+        self.hand_gestures = []  # (gesture, score) per hand, in the same order as recognized_hands
+        self.frame_timing = None  # (capture time, landmarks ready time) behind the points being sent
+        self.frame_hands = None  # hands the gesture logic saw this frame, filled by detect_hands
+        # Optional columnar recording of every frame's landmarks for later replay
+        self.recorder = LandmarkRecorder(record_path, frame_shape, self.board.corners if self.board else None) \
+            if record_path else None
+
+    def mark_startup(self, name):
+        """ Record how long after construction a startup milestone was reached. """
+        self.startup[name + "_s"] = round(time.monotonic() - self.created_at, 3)
+
+    def resolve_board(self, frame, path, auto_calibrate=True, interactive=True):
+        """ Saved calibration first, then fiducials or the board contour, then the click picker. """
+        board = BoardCalibration.load_or_none(path)
+        if board is not None and board.matches(frame.shape):
+            logger.info("Loaded calibration from %s", path)
+            return board
+        if board is not None:
+            logger.warning("Calibration %s was made at another resolution, recalibrating", path)
+
+        board = None
+        if auto_calibrate:
+            board, method = BoardCalibration.detect(frame)
+            if board is not None:
+                logger.info("Detected whiteboard from %s", method)
+        if board is None and interactive:
+            self.get_whiteboard(frame)
+            if len(self.coords) == 4:
+                board = BoardCalibration(self.coords, frame.shape)
+        if board is not None:
+            # Corners come from the raw frame; landmarks, the ROI crop and the mask all use
+            # mirrored-frame pixels, so the board is mirrored once here and saved that way
+            board = board.mirrored()
+        if board is None:
+            logger.warning("No whiteboard calibration available")
+        elif path:
+            board.save(path)
+            logger.info("Saved calibration to %s", path)
+        return board
+
+    def build_recognizer(self):
+        """ Import mediapipe and construct the models; runs on the warm-up thread. """
+        import mediapipe
+        self.mp = mediapipe
         self.init_mediapipe()
         self.init_gestures()
-        self.gesture_result = None
         self.options = self.GestureRecognizerOptions(
-            base_options=self.BaseOptions(model_asset_path="gesture_recognizer.task"),  
-            running_mode=self.VisionRunningMode.LIVE_STREAM,
-            result_callback=self.set_gesture
+            base_options=self.BaseOptions(model_asset_path=MODEL_PATH),
+            running_mode=self.VisionRunningMode.VIDEO if self.sync_inference else self.VisionRunningMode.LIVE_STREAM,
+            num_hands=self.max_hands,
+            result_callback=None if self.sync_inference else self.set_gesture
         )
+        recognizer = self.GestureRecognizer.create_from_options(self.options)
+        self.mark_startup("model")
+        return recognizer
 
+    def wait_until_ready(self, timeout=None):
+        """ Block until the background model build has finished; re-raises its error. """
+        return self.recognizer_future.result(timeout)
 
     def init_gestures(self):
         # Initialize MediaPipe Gesture Recognizer
+        mp = self.mp
         self.BaseOptions = mp.tasks.BaseOptions
         self.GestureRecognizer = mp.tasks.vision.GestureRecognizer
         self.GestureRecognizerOptions = mp.tasks.vision.GestureRecognizerOptions
@@ -56,10 +226,61 @@ class GestureReader:
 
     def set_gesture(self, result, output_image, timestamp_ms):
         """Callback function that receives gesture recognition results."""
+        now = time.monotonic()
+        with self.inference_lock:
+            context = self.in_flight.pop(timestamp_ms, None)
+            self.inference_counters['completed'] += 1
+            if timestamp_ms <= self.latest_result[0]:
+                self.inference_counters['stale'] += 1
+                return
+        capture_time = timestamp_ms / 1000.0
+        if context is not None:
+            capture_time, submit_time = context
+            self.profiler.record("recognizer_callback", now - submit_time)
+            self.profiler.record("result_age", now - capture_time)
+
         if result and result.gestures:
-            self.gesture_result = result.gestures[0][0].category_name
+            gesture, score = result.gestures[0][0].category_name, result.gestures[0][0].score
         else:
-            self.gesture_result = None
+            gesture, score = None, 0.0
+        handedness = [(h[0].category_name, h[0].score) for h in result.handedness] if result else []
+        hand_gestures = [(g[0].category_name, g[0].score) for g in result.gestures] if result else []
+        # Kept in dual-model mode too, to match the per-hand gestures to the other model's hands
+        hands = [ArrayHand.from_landmarks(hand) for hand in result.hand_landmarks] if result else []
+        if self.single_model and self.tracker is not None:
+            # The tracker works on the unmirrored inference image, so seed it before mirroring
+            self.tracker.seed(output_image.numpy_view(), hands, current=self.sync_inference)
+        hands = self.preprocessor.to_frame_hands(hands)
+        latest = (timestamp_ms, gesture, score, hands, handedness, hand_gestures, (capture_time, now))
+        with self.inference_lock:
+            # A newer result may have landed while this one was being converted
+            if timestamp_ms <= self.latest_result[0]:
+                self.inference_counters['stale'] += 1
+                return
+            self.latest_result = latest
+
+    def inference_busy(self):
+        """ True while `max_in_flight` frames are still waiting for results. """
+        now = time.monotonic()
+        with self.inference_lock:
+            # The recognizer may drop frames without calling back, so forget old submissions
+            for timestamp_ms, (_, submit_time) in list(self.in_flight.items()):
+                if now - submit_time > self.in_flight_timeout:
+                    del self.in_flight[timestamp_ms]
+                    self.inference_counters['expired'] += 1
+            return len(self.in_flight) >= self.max_in_flight
+
+    def submit_inference(self, recognizer, mp_image, capture_time):
+        """ Submit a frame stamped with its capture time (ms, strictly increasing). """
+        timestamp_ms = max(int(capture_time * 1000), self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = timestamp_ms
+        with self.inference_lock:
+            self.in_flight[timestamp_ms] = (capture_time, time.monotonic())
+            self.inference_counters['submitted'] += 1
+        if self.sync_inference:
+            self.set_gesture(recognizer.recognize_for_video(mp_image, timestamp_ms), mp_image, timestamp_ms)
+        else:
+            recognizer.recognize_async(mp_image, timestamp_ms)
 
 
     def get_whiteboard(self, image):
@@ -81,80 +302,175 @@ class GestureReader:
 
     def init_mediapipe(self):
         """ Initialize MediaPipe for hand tracking. """
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            max_num_hands=1,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.3
-        )
-        self.point_buffer = deque(maxlen=3)
+        self.mp_hands = self.mp.solutions.hands
+        self.hands = None
+        if not self.single_model:
+            self.hands = self.mp_hands.Hands(
+                max_num_hands=self.max_hands,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.3
+            )
 
     def calculate_distance(self, point1, point2):
         return np.sqrt((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2)
 
     def check_inside_polygon(self, x, y):
         """ Check if a point (x, y) is inside the defined polygon. """
-        if len(self.coords) < 4:
+        if self.board is None:
             return False  # Not enough points defined
-        polygon = np.array(self.coords, np.int32)
-        result = cv2.pointPolygonTest(polygon, (x, y), False)
-        return result >= 0
+        return self.board.contains(x, y)
 
-    def fingers_joined(self, hand_landmarks, h, w, threshold=40):
-        """ Detect if index and middle fingers are touching. """
-        try:
-            index_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
-            middle_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP]
+    def board_point(self, xval, yval, message_type, hand_id=0):
+        """
+        Map a frame-pixel point through the board homography and feed it to the hand's
+        stroke store. Runs before the move gate, so strokes keep every point of slow or
+        paused drawing instead of ending at gaps the gate created.
+        """
+        with self.profiler.stage("mapping"):
+            board_u, board_v = self.board.to_board((xval, yval))
+        stroke_store = self.hand_states.get(hand_id).stroke_store
+        if stroke_store is not None:
+            self.handle_finished_stroke(stroke_store.add(self.now(), board_u, board_v, message_type), hand_id)
+        return board_u, board_v
+
+    def mark_first_point(self):
+        if "first_point_s" not in self.startup:
+            self.mark_startup("first_point")
+            logger.info("First point %.2fs after start: %s", self.startup["first_point_s"], self.startup)
+
+    def send_board_point(self, board_u, board_v, message_type, hand_id=0):
+        """ Send a point in board coordinates; draw points only go out as strokes when streaming them. """
+        if self.stream_strokes and message_type == "draw":
+            return
+        self.mark_first_point()
+        with self.profiler.stage("dispatch"):
+            self.ws_sender.send_sync(float(board_u * self.xdim), float(board_v * self.ydim), message_type,
+                                     self.xdim, self.ydim, 0, 0, timing=self.frame_timing, hand=hand_id)
+
+    def handle_finished_stroke(self, stroke, hand_id=0):
+        """ Stream a finished, simplified stroke when stroke streaming is on. """
+        if stroke is None or not self.stream_strokes:
+            return
+        self.mark_first_point()
+        with self.profiler.stage("dispatch"):
+            self.ws_sender.send_stroke(stroke.xy() * (self.xdim, self.ydim), self.xdim, self.ydim, hand=hand_id)
 
-            index_x, index_y = int(index_tip.x * w), int(index_tip.y * h)
-            middle_x, middle_y = int(middle_tip.x * w), int(middle_tip.y * h)
+    def hand_predicates(self, hand_landmarks, h, w, threshold=40):
+        """ Every landmark predicate for one hand in a single vectorized pass, or None if malformed. """
+        try:
+            return evaluate(landmark_array(hand_landmarks), w, h, pinch_threshold=threshold)
+        except (AttributeError, TypeError, ValueError):
+            return None
 
-            distance = self.calculate_distance((index_x, index_y), (middle_x, middle_y))
-            return distance < threshold, (index_x, index_y)
-        except (AttributeError, TypeError):
+    def fingers_joined(self, hand_landmarks, h, w, threshold=40):
+        """ Detect if index and middle fingers are touching. """
+        result = self.hand_predicates(hand_landmarks, h, w, threshold)
+        if result is None:
             return False, None
-    
+        return bool(result['fingers_joined'][0]), tuple(result['join_point'][0].tolist())
+
     def open_palm_detected(self, hand_landmarks, h, w):
         """ Detect if an open palm is present (all fingers extended). """
-        try:
-            fingers = [
-                self.mp_hands.HandLandmark.THUMB_TIP,
-                self.mp_hands.HandLandmark.INDEX_FINGER_TIP,
-                self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP,
-                self.mp_hands.HandLandmark.RING_FINGER_TIP,
-                self.mp_hands.HandLandmark.PINKY_TIP
-            ]
-
-            base_joints = [
-                self.mp_hands.HandLandmark.THUMB_CMC,
-                self.mp_hands.HandLandmark.INDEX_FINGER_MCP,
-                self.mp_hands.HandLandmark.MIDDLE_FINGER_MCP,
-                self.mp_hands.HandLandmark.RING_FINGER_MCP,
-                self.mp_hands.HandLandmark.PINKY_MCP
-            ]
-
-            tip_coords = [(int(hand_landmarks.landmark[f].x * w), int(hand_landmarks.landmark[f].y * h)) for f in fingers]
-            base_coords = [(int(hand_landmarks.landmark[b].x * w), int(hand_landmarks.landmark[b].y * h)) for b in base_joints]
-
-            # Check if all fingertips are above their respective MCP joints (hand is open)
-            all_extended = all(tip[1] < base[1] for tip, base in zip(tip_coords[1:], base_coords[1:]))
-
-            # Check if thumb is extended away from index finger
-            thumb_extended = abs(tip_coords[0][0] - tip_coords[1][0]) > 40
-
-            return all_extended and thumb_extended, tip_coords[2]  # Use middle finger tip as reference
-        except (AttributeError, TypeError):
+        result = self.hand_predicates(hand_landmarks, h, w)
+        if result is None:
             return False, None
+        return bool(result['open_palm'][0]), tuple(result['palm_point'][0].tolist())
+
+    def compute_roi(self, frame_shape):
+        """Return the (x, y, w, h) inference rectangle in full-frame pixels."""
+        frame_h, frame_w = frame_shape[:2]
+        if not self.roi or len(self.coords) < 4:
+            return 0, 0, frame_w, frame_h
+        x0 = max(0, self.top_left_x - self.roi_padding)
+        y0 = max(0, self.top_left_y - self.roi_padding)
+        x1 = min(frame_w, self.top_left_x + self.xdim + self.roi_padding)
+        y1 = min(frame_h, self.top_left_y + self.ydim + self.roi_padding)
+        return x0, y0, x1 - x0, y1 - y0
+
+    def crop_to_roi(self, frame):
+        """Crop the frame to the board ROI and downscale it for inference if configured."""
+        if self.roi_rect is None:
+            self.roi_rect = self.compute_roi(frame.shape)
+        return self.preprocessor.crop(frame, self.roi_rect)
+
+    def to_frame_point(self, point):
+        """Map a point in ROI pixels back to full-frame pixels."""
+        x0, y0, _, _ = self.roi_rect
+        return point[0] + x0, point[1] + y0
 
-    def print_finger_join_point(self, frame):
-        """Detect finger join points and send them via WebSocket."""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_frame)
+    def now(self):
+        """ Clock for the gesture logic: recorded capture time during replay, monotonic time otherwise. """
+        return self.replay_time if self.replay_time is not None else time.monotonic()
 
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                h, w, _ = frame.shape
-                fingers_together, join_point = self.fingers_joined(hand_landmarks, h, w)
+    def detect_hands(self, frame):
+        """Return the hand landmarks for this frame, computed at most once per frame."""
+        if self.frame_hands is None:
+            self.frame_hands = self._detect_hands(frame)
+        return self.frame_hands
+
+    def _detect_hands(self, frame):
+        if self.tracker is not None:
+            return self.tracked_hands
+        if self.single_model:
+            return self.recognized_hands
+        if self.frame_rgb is None:
+            # Recognition was skipped for this frame, so nothing has converted it yet
+            with self.profiler.stage("convert"):
+                self.frame_rgb = self.preprocessor.to_rgb(frame)
+        with self.profiler.stage("hands"):
+            # Reuses the RGB buffer already converted for the recognizer this frame
+            results = self.hands.process(self.frame_rgb)
+        return self.preprocessor.to_frame_hands(results.multi_hand_landmarks or [])
+
+    def identify_hands(self, hands):
+        """ Stable id for each hand of this frame (None for hands beyond the id limit). """
+        try:
+            centroids = hand_centroids(hands)
+        except (AttributeError, TypeError, ValueError):
+            centroids = []
+        self.frame_hand_ids = self.hand_ids.assign(centroids)
+        return self.frame_hand_ids
+
+    def match_recognized_hands(self, hands):
+        """
+        Index into the recognizer's per-hand results for each detected hand. A separate
+        landmark model or the tracker may list hands in another order, so they are
+        paired with the recognizer's hands by landmark centroid.
+        """
+        self.frame_gesture_indices = match_hands(hands or [], self.recognized_hands, self.hand_match_distance)
+        return self.frame_gesture_indices
+
+    def aligned_to_hands(self, values):
+        """ Per-hand recognizer values (gestures, handedness) reordered to the detected hands. """
+        return [values[i] if i is not None and i < len(values) else (None, 0.0) for i in self.frame_gesture_indices]
+
+    def hand_gesture(self, index):
+        """ Recognizer gesture for the detected hand at `index`. """
+        if index is None or index >= len(self.frame_gesture_indices):
+            return None, 0.0
+        recognized = self.frame_gesture_indices[index]
+        if recognized is None or recognized >= len(self.hand_gestures):
+            return None, 0.0
+        return self.hand_gestures[recognized]
+
+    def print_finger_join_point(self, frame, indices=None):
+        """Detect finger join points of the hands at `indices` (default all) and send them via WebSocket."""
+        hands = self.detect_hands(frame)
+
+        if hands:
+            # Landmarks are normalized to the ROI, so scale by its full-resolution size
+            _, _, w, h = self.roi_rect
+            try:
+                predicates = evaluate(hands_to_array(hands), w, h)
+            except (AttributeError, TypeError, ValueError):
+                return
+            for index in range(len(hands)) if indices is None else indices:
+                hand_id = self.frame_hand_ids[index] if index < len(self.frame_hand_ids) else 0
+                if hand_id is None:
+                    continue
+                state = self.hand_states.get(hand_id)
+                fingers_together = bool(predicates['fingers_joined'][index])
+                join_point = self.to_frame_point(tuple(predicates['join_point'][index].tolist()))
                 # open_palm, erase_point = self.open_palm_detected(hand_landmarks, h, w)
                 # thumbs_up, next_point = self.thumbs_up_detected(hand_landmarks, h, w)
                 # thumbs_down, prev_point = self.thumbs_down_detected(hand_landmarks, h, w)
@@ -185,118 +501,333 @@ class GestureReader:
                     xval, yval = join_point
                     message_type = "draw" if fingers_together else "laser"
                     if self.check_inside_polygon(xval, yval):
-                        print(f"Finger join detected at: {xval}, {yval}")
-                        self.ws_sender.send_sync(xval, yval, message_type, self.xdim, self.ydim, self.top_left_x, self.top_left_y)
+                        logger.debug("Finger join detected at: %s, %s (hand %s)", xval, yval, hand_id)
+                        now = self.now()
+                        xval, yval = state.point_filter(now, xval, yval, message_type)
+                        board_u, board_v = self.board_point(xval, yval, message_type, hand_id)
+                        if state.gesture_gate.should_send_point(message_type, xval, yval, now):
+                            self.send_board_point(board_u, board_v, message_type, hand_id)
                         self.lastLaserCoords = (xval, yval)
-                        return
 
     def thumbs_up_detected(self, hand_landmarks, h, w):
         """Detect if hand is making a thumbs-up gesture."""
-        try:
-            # Get landmarks for all fingertips and their base joints
-            fingers = [
-                self.mp_hands.HandLandmark.INDEX_FINGER_TIP,
-                self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP,
-                self.mp_hands.HandLandmark.RING_FINGER_TIP,
-                self.mp_hands.HandLandmark.PINKY_TIP
-            ]
-            
-            thumb_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.THUMB_TIP]
-            thumb_ip = hand_landmarks.landmark[self.mp_hands.HandLandmark.THUMB_IP]
-            wrist = hand_landmarks.landmark[self.mp_hands.HandLandmark.WRIST]
-            
-            # Check if all fingers are closed (tips below PIP joints)
-            all_fingers_closed = True
-            for finger in fingers:
-                tip_y = hand_landmarks.landmark[finger].y
-                pip = hand_landmarks.landmark[finger - 2].y  # PIP joint is 2 points before tip
-                if tip_y < pip:  # If tip is above PIP, finger is extended
-                    all_fingers_closed = False
-                    break
-            
-            # Check if thumb is extended upward
-            thumb_extended = thumb_tip.y < thumb_ip.y
-            thumb_pointing_up = thumb_tip.y < wrist.y
-            
-            return all_fingers_closed and thumb_extended and thumb_pointing_up, (
-                int(thumb_tip.x * w),
-                int(thumb_tip.y * h)
-            )
-        except (AttributeError, TypeError):
+        result = self.hand_predicates(hand_landmarks, h, w)
+        if result is None:
             return False, None
+        return bool(result['thumbs_up'][0]), tuple(result['thumb_point'][0].tolist())
 
     def thumbs_down_detected(self, hand_landmarks, h, w):
         """Detect if hand is making a thumbs-down gesture."""
-        try:
-            # Get landmarks for all fingertips and their base joints
-            fingers = [
-                self.mp_hands.HandLandmark.INDEX_FINGER_TIP,
-                self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP,
-                self.mp_hands.HandLandmark.RING_FINGER_TIP,
-                self.mp_hands.HandLandmark.PINKY_TIP
-            ]
-            
-            thumb_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.THUMB_TIP]
-            thumb_ip = hand_landmarks.landmark[self.mp_hands.HandLandmark.THUMB_IP]
-            wrist = hand_landmarks.landmark[self.mp_hands.HandLandmark.WRIST]
-            
-            # Check if all fingers are closed
-            all_fingers_closed = True
-            for finger in fingers:
-                tip_y = hand_landmarks.landmark[finger].y
-                pip = hand_landmarks.landmark[finger - 2].y
-                if tip_y < pip:
-                    all_fingers_closed = False
-                    break
-            
-            # Check if thumb is extended downward
-            thumb_extended = thumb_tip.y > thumb_ip.y
-            thumb_pointing_down = thumb_tip.y > wrist.y
-            
-            return all_fingers_closed and thumb_extended and thumb_pointing_down, (
-                int(thumb_tip.x * w),
-                int(thumb_tip.y * h)
-            )
-        except (AttributeError, TypeError):
+        result = self.hand_predicates(hand_landmarks, h, w)
+        if result is None:
             return False, None
+        return bool(result['thumbs_down'][0]), tuple(result['thumb_point'][0].tolist())
 
-    def start_recognition(self):
-        """ Start the video capture loop and process frames. """
-        timestamp = 0  # Manually track timestamps
+    def process_frame(self, frame, recognizer, capture_time=None):
+        """ Run one captured frame through preprocessing, inference and gesture logic. """
+        capture_time = capture_time if capture_time is not None else time.monotonic()
+        with self.profiler.stage("crop"):
+            inference_frame = self.crop_to_roi(frame)
+
+        self.frame_rgb = None
+        busy = not self.sync_inference and self.inference_busy()
+        if busy:
+            self.inference_counters['skipped_busy'] += 1
+        elif self.tracker is None or self.tracker.should_detect():
+            with self.profiler.stage("convert"):
+                self.frame_rgb = self.preprocessor.to_rgb(inference_frame)
+                mp_image = self.mp.Image(image_format=self.mp.ImageFormat.SRGB, data=self.frame_rgb)
+            with self.profiler.stage("inference"):
+                self.submit_inference(recognizer, mp_image, capture_time)
+
+        # Gesture and landmarks always come from the same recognizer result
+        with self.inference_lock:
+            latest = self.latest_result
+        (self.result_timestamp_ms, self.gesture_result, self.gesture_score, self.recognized_hands,
+         self.handedness, self.hand_gestures, self.frame_timing) = latest
+        self.frame_hands = None
+
+        if self.tracker is not None:
+            with self.profiler.stage("track"):
+                self.tracked_hands = self.preprocessor.to_frame_hands(self.tracker.track(inference_frame))
+            # Tracked landmarks belong to this frame rather than to the last recognizer result
+            self.frame_timing = (capture_time, time.monotonic())
 
-        with self.GestureRecognizer.create_from_options(self.options) as recognizer:
-            while self.cap.isOpened():
-                ret, frame = self.cap.read()
+        self.run_gestures(inference_frame)
+        if self.recorder is not None:
+            with self.profiler.stage("record"):
+                self.recorder.add(capture_time, self.result_timestamp_ms, self.gesture_result, self.gesture_score,
+                                  self.roi_rect, self.detect_hands(inference_frame),
+                                  self.aligned_to_hands(self.handedness), self.aligned_to_hands(self.hand_gestures))
+
+    def run_gestures(self, inference_frame):
+        """ Per-hand gesture events, draw/laser points and stroke expiry for the current frame's result. """
+        with self.profiler.stage("gesture"):
+            hands = self.detect_hands(inference_frame)
+            hand_ids = self.identify_hands(hands)
+            self.match_recognized_hands(hands)
+            indices = {hand_id: index for index, hand_id in enumerate(hand_ids) if hand_id is not None}
+            now = self.now()
+            pointing = []
+            for hand_id in indices:
+                self.hand_states.get(hand_id)
+            # Hands that left the frame are updated too, so their gestures end and their strokes expire
+            for state in self.hand_states:
+                index = indices.get(state.hand_id)
+                gesture, score = self.hand_gesture(index)
+                for event, name in state.gesture_gate.update(gesture, score, now):
+                    logger.info("Gesture %s: %s (hand %s)", event, name, state.hand_id)
+                    self.ws_sender.send_sync(10000, 100, name, self.xdim, self.ydim, self.top_left_x, self.top_left_y,
+                                             event=event, timing=self.frame_timing, hand=state.hand_id)
+                if index is not None and not (gesture and gesture != "None"):
+                    pointing.append(index)
+            if pointing:
+                self.print_finger_join_point(inference_frame, sorted(pointing))
+            for state in self.hand_states:
+                if state.stroke_store is not None:
+                    self.handle_finished_stroke(state.stroke_store.expire(now), state.hand_id)
+
+    def replay_recording(self, speed=1.0, max_frames=None):
+        """
+        Feed recorded frames through the gesture logic and sender without decoding
+        or inference. `speed` scales the recorded pacing; 0 or None runs as fast as
+        possible. Gate, filter and stroke timing follow the recorded clock either way.
+        """
+        frames = 0
+        self.started_at = time.monotonic()
+        first_t = None
+        for record in self.replay.frames():
+            if max_frames is not None and frames >= max_frames:
+                break
+            if first_t is None:
+                first_t = record.t
+            if speed:
+                delay = (record.t - first_t) / speed - (time.monotonic() - self.started_at)
+                if delay > 0:
+                    time.sleep(delay)
+            self.replay_time = record.t
+            self.roi_rect = record.roi
+            self.gesture_result, self.gesture_score = record.gesture, record.score
+            self.handedness = list(zip(record.handedness, record.hand_scores.tolist()))
+            self.hand_gestures = record.hand_gestures
+            self.frame_hands = [ArrayHand(array) for array in record.landmarks]
+            # Recorded per-hand values are stored in the order of the recorded hands
+            self.recognized_hands = self.frame_hands
+            self.frame_timing = None  # recorded times are not comparable with the receiver's clock
+            self.run_gestures(None)
+            frames += 1
+            self.frames_processed = frames
+        self.replay_time = None
+        return frames
+
+    def run_pipeline(self, max_frames=None):
+        """
+        Pipelined loop: capture -> preprocess -> inference -> gesture/mapping, one
+        thread per stage joined by bounded queues, then the sender's own queue as the
+        dispatch stage. With `inference_workers`, inference runs in that many
+        processes and results are reassembled in frame order.
+        """
+        captured = BoundedQueue("capture", self.queue_size, self.drop_policy)
+        preprocessed = BoundedQueue("preprocess", self.queue_size, self.drop_policy)
+        # Results are never dropped so the gesture logic sees every inferred frame in order
+        inferred = BoundedQueue("inference", self.queue_size, "block")
+
+        if self.inference_workers:
+            inference = ParallelStage("inference", run_inference, self.prepare_inference, self.finish_inference,
+                                      preprocessed, inferred, workers=self.inference_workers,
+                                      initializer=init_inference_worker, initargs=(MODEL_PATH, self.max_hands))
+        else:
+            recognizer = self.wait_until_ready()
+            inference = Stage("inference", lambda item: self.finish_inference(
+                *self._infer_in_process(recognizer, item)), preprocessed, inferred)
+        self.stages = Pipeline([captured, preprocessed, inferred], [
+            Stage("preprocess", self.preprocess_stage, captured, preprocessed),
+            inference,
+            Stage("gesture", self.gesture_stage, inferred),
+        ]).start()
+
+        frames = 0
+        self.started_at = time.monotonic()
+        try:
+            while self.cap.isOpened() and (max_frames is None or frames < max_frames):
+                with self.profiler.stage("capture"):
+                    ret, frame, capture_time = self.cap.read_with_time(timeout=1.0)
                 if not ret:
-                    break
+                    continue
+                captured.put((frame, capture_time))
+                frames += 1
+        finally:
+            self.stages.stop()
+        return frames
 
-                frame = cv2.flip(frame, 1)
+    def preprocess_stage(self, item):
+        frame, capture_time = item
+        with self.profiler.stage("crop"):
+            inference_frame = self.crop_to_roi(frame)
+        with self.profiler.stage("convert"):
+            rgb = self.preprocessor.to_rgb(inference_frame, reuse=False)
+        timestamp_ms = max(int(capture_time * 1000), self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = timestamp_ms
+        return capture_time, timestamp_ms, rgb
+
+    def prepare_inference(self, item):
+        capture_time, timestamp_ms, rgb = item
+        self.inference_counters['submitted'] += 1
+        return (capture_time, timestamp_ms, time.monotonic()), (rgb, timestamp_ms)
+
+    def _infer_in_process(self, recognizer, item):
+        context, args = self.prepare_inference(item)
+        return context, run_inference(*args, recognizer=recognizer)
+
+    def finish_inference(self, context, result):
+        capture_time, timestamp_ms, submit_time = context
+        now = time.monotonic()
+        self.inference_counters['completed'] += 1
+        self.profiler.record("inference", now - submit_time)
+        self.profiler.record("result_age", now - capture_time)
+        return capture_time, timestamp_ms, now, result
+
+    def gesture_stage(self, item):
+        """ Stateful gesture logic; runs on one thread so results are applied in frame order. """
+        capture_time, timestamp_ms, done_time, (gesture, score, landmarks, handedness, hand_gestures) = item
+        self.result_timestamp_ms, self.gesture_result, self.gesture_score = timestamp_ms, gesture, score
+        self.handedness, self.hand_gestures = handedness, hand_gestures
+        self.recognized_hands = self.preprocessor.to_frame_hands([ArrayHand(array) for array in landmarks])
+        self.frame_hands = None
+        self.frame_timing = (capture_time, done_time)
+        self.run_gestures(None)
+        if self.recorder is not None:
+            self.recorder.add(capture_time, timestamp_ms, gesture, score, self.roi_rect, self.detect_hands(None),
+                              self.aligned_to_hands(handedness), self.aligned_to_hands(hand_gestures))
+        self.frames_processed += 1
+
+    def start_recognition(self, max_frames=None):
+        """ Start the video capture loop and process frames. """
+        if self.replay is not None:
+            return self.replay_recording(self.replay_speed, max_frames)
+        if self.pipeline:
+            return self.run_pipeline(max_frames)
+        frames = 0
+        self.started_at = time.monotonic()
+        with self.wait_until_ready() as recognizer:
+            while self.cap.isOpened() and (max_frames is None or frames < max_frames):
+                with self.profiler.stage("capture"):
+                    ret, frame, capture_time = self.cap.read_with_time(timeout=1.0)
+                if not ret:
+                    continue
+                frame_start = time.perf_counter()
+                self.process_frame(frame, recognizer, capture_time)
+                if self.tracker is not None:
+                    self.tracker.note_frame_time(time.perf_counter() - frame_start)
+                frames += 1
+                self.frames_processed = frames
+        return frames
 
-                mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                recognizer.recognize_async(mp_image, timestamp)
-                timestamp += 1  # Ensure monotonically increasing timestamps
+    def metrics(self):
+        """ Snapshot of throughput, per-stage latency, capture and sender counters. """
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            'frames': self.frames_processed,
+            'fps': self.frames_processed / elapsed if elapsed > 0 else 0.0,
+            'stages': self.profiler.summary(),
+            'capture': self.cap.stats() if self.cap is not None else {},
+            'sender': self.ws_sender.stats() if hasattr(self.ws_sender, 'stats') else {},
+            'tracker': self.tracker.stats() if self.tracker is not None else {},
+            'events': self.gesture_gate.stats(),
+            'inference': dict(self.inference_counters, in_flight=len(self.in_flight)),
+            'strokes': self.stroke_store.stats() if self.stroke_store is not None else {},
+            'startup': self.startup,
+            'latency': self.ws_sender.latency_stats() if hasattr(self.ws_sender, 'latency_stats') else {},
+            'recording': self.recorder.stats() if self.recorder is not None else {},
+            'pipeline': self.stages.stats() if self.stages is not None else {},
+            'hands': dict(self.hand_ids.stats(), states=self.hand_states.stats()) if self.max_hands > 1 else {},
+        }
 
-                if self.gesture_result and self.gesture_result != "None":
-                    print(self.gesture_result)
-                    self.ws_sender.send_sync(10000, 100, self.gesture_result, self.xdim, self.ydim, self.top_left_x, self.top_left_y)
-                else:
-                    self.print_finger_join_point(frame)
+
+_worker_recognizer = None
+
+
+def init_inference_worker(model_path, num_hands=1):
+    """ Process-pool initializer: build one VIDEO-mode recognizer per worker process. """
+    global _worker_recognizer
+    import mediapipe
+    options = mediapipe.tasks.vision.GestureRecognizerOptions(
+        base_options=mediapipe.tasks.BaseOptions(model_asset_path=model_path),
+        running_mode=mediapipe.tasks.vision.RunningMode.VIDEO, num_hands=num_hands)
+    _worker_recognizer = mediapipe.tasks.vision.GestureRecognizer.create_from_options(options)
+
+
+def run_inference(rgb, timestamp_ms, recognizer=None):
+    """
+    Recognize one RGB frame and reduce the result to picklable values:
+    (gesture, score, (N, 21, 3) landmarks, [(handedness, score)], [(gesture, score)] per hand).
+    """
+    import mediapipe
+    recognizer = recognizer or _worker_recognizer
+    result = recognizer.recognize_for_video(
+        mediapipe.Image(image_format=mediapipe.ImageFormat.SRGB, data=rgb), timestamp_ms)
+    if result and result.gestures:
+        gesture, score = result.gestures[0][0].category_name, result.gestures[0][0].score
+    else:
+        gesture, score = None, 0.0
+    hands = [ArrayHand.from_landmarks(hand) for hand in result.hand_landmarks] if result else []
+    handedness = [(h[0].category_name, h[0].score) for h in result.handedness] if result else []
+    hand_gestures = [(g[0].category_name, g[0].score) for g in result.gestures] if result else []
+    return gesture, score, hands_to_array(hands), handedness, hand_gestures
 
 
 class WebSocketSyncSender:
-    def __init__(self, url, from_id, to_id):
+    """Keeps one WebSocket open on a background event loop and feeds it from a bounded queue."""
+
+    def __init__(self, url, from_id, to_id, queue_size=256, min_backoff=0.5, max_backoff=8.0,
+                 protocol="json", batch_size=32, batch_delay=0.05, negotiate_timeout=2.0, trace=False):
         self.url = f"{url}?id={from_id}"
         self.from_id = from_id
         self.to_id = to_id
         self.socket = None
 
-    def send_sync(self, xval, yval, gestval, xdim, ydim, top_leftx, top_lefty):
-        """ Send (xval, yval) data synchronously to WebSocket. """
-        print(f"Sending message: {xval}, {yval}, {gestval}")
+        # "json" always sends JSON, "binary" forces batched frames, "auto" asks the receiver first
+        self.protocol = protocol
+        self.protocol_version = PROTOCOL_JSON
+        self.negotiate_timeout = negotiate_timeout
+        self.session_dims = None
+        self.batcher = PointBatcher(to_id, max_points=batch_size, max_delay=batch_delay)
+        self.batch_lock = threading.Lock()
+
+        # Bounded outbound queue, the oldest message is dropped when it is full
+        self.queue = deque(maxlen=queue_size)
+        self.queue_lock = threading.Lock()
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.counters = {'sent': 0, 'dropped': 0, 'reconnects': 0, 'errors': 0, 'bytes': 0}
+
+        # Optional per-message trace fields, acknowledged by the receiver (JSON protocol only)
+        self.collector = LatencyCollector() if trace else None
+        self.trace_seq = 0
+
+        self.running = True
+        self.loop = asyncio.new_event_loop()
+        self._wakeup = asyncio.Event()
+        self.thread = threading.Thread(target=self._run_loop, name="ws-sender", daemon=True)
+        self.thread.start()
+
+    def send_sync(self, xval, yval, gestval, xdim, ydim, top_leftx, top_lefty, event=None, timing=None, hand=None):
+        """ Queue (xval, yval) data for the WebSocket without blocking; `hand` is the presenter's hand id. """
+        logger.debug("Sending message: %s, %s, %s", xval, yval, gestval)
         relative_x = xval - top_leftx
         relative_y = yval - top_lefty
+        self.session_dims = (xdim, ydim)
 
-        message = json.dumps({
+        if self.protocol_version == PROTOCOL_BINARY:
+            if event == "end":
+                return  # batch frames carry no event field, receivers only act on starts
+            with self.batch_lock:
+                frame = self.batcher.add(relative_x / xdim, relative_y / ydim, gestval, hand or 0)
+            if frame:
+                self.enqueue(frame)
+            return
+
+        payload = {
             'to': self.to_id,
             'from': self.from_id,
             'xval': relative_x,
@@ -304,16 +835,341 @@ class WebSocketSyncSender:
             'gestval': gestval,
             'xdim': xdim,
             'ydim': ydim
-        })
+        }
+        if event:
+            payload['event'] = event
+        if hand is not None:
+            payload['hand'] = hand
+        if self.collector is not None:
+            # Left as a dict so _send_pending can stamp the send time just before serializing
+            payload['trace'] = self._trace_fields(timing)
+            self.enqueue(payload)
+            return
+        self.enqueue(json.dumps(payload))
+
+    def _trace_fields(self, timing):
+        self.trace_seq += 1
+        trace = {'seq': self.trace_seq, 't_enqueue': wall_ms()}
+        if timing is not None:
+            trace['t_capture'] = monotonic_to_ms(timing[0])
+            trace['t_infer'] = monotonic_to_ms(timing[1])
+        return trace
+
+    def send_stroke(self, points, xdim, ydim, hand=None):
+        """ Queue a finished stroke as one message with its (N, 2) board-pixel polyline. """
+        points = [[round(float(x), 1), round(float(y), 1)] for x, y in points]
+        if not points:
+            return
+        message = {
+            'to': self.to_id,
+            'from': self.from_id,
+            # The relay rejects messages at (0, 0), so the first point doubles as xval/yval
+            'xval': points[0][0],
+            'yval': points[0][1],
+            'gestval': 'stroke',
+            'points': points,
+            'xdim': xdim,
+            'ydim': ydim
+        }
+        if hand is not None:
+            message['hand'] = hand
+        self.enqueue(json.dumps(message))
+
+    def enqueue(self, message):
+        """ Add an encoded message to the outbound queue, dropping the oldest if full. """
+        with self.queue_lock:
+            if len(self.queue) == self.queue.maxlen:
+                self.counters['dropped'] += 1
+            self.queue.append(message)
+        self.loop.call_soon_threadsafe(self._wakeup.set)
+
+    def stats(self):
+        """ Return a snapshot of the send/drop/reconnect counters. """
+        with self.queue_lock:
+            snapshot = dict(self.counters)
+            snapshot['queued'] = len(self.queue)
+        snapshot['connected'] = self.socket is not None
+        snapshot['protocol'] = self.protocol_version
+        return snapshot
+
+    def latency_stats(self):
+        """ Per-hop latency histograms and loss rate from receiver acks, when tracing is on. """
+        return self.collector.stats() if self.collector is not None else {}
+
+    def flush(self):
+        """ Push any partially filled point batch onto the queue. """
+        with self.batch_lock:
+            frame = self.batcher.flush()
+        if frame:
+            self.enqueue(frame)
+
+    async def _send_session_header(self, websocket):
+        """
+        Write the session header straight to the socket. It never goes through the
+        queue, so it cannot be evicted or land behind the batches it describes.
+        """
+        xdim, ydim = self.session_dims or (1920, 1080)
+        header = encode_session_header(self.from_id, self.to_id, xdim, ydim)
+        await websocket.send(header)
+        self.counters['sent'] += 1
+        self.counters['bytes'] += len(header)
+
+    async def _start_binary_session(self, websocket):
+        """ Send the session header, then switch new points to binary batches. """
+        await self._send_session_header(websocket)
+        self.protocol_version = PROTOCOL_BINARY
+
+    def _has_queued_batches(self):
+        with self.queue_lock:
+            return any(isinstance(message, bytes) for message in self.queue)
+
+    def close(self, timeout=2.0):
+        """ Stop the background loop and close the connection. """
+        self.running = False
+        self.loop.call_soon_threadsafe(self._wakeup.set)
+        self.thread.join(timeout)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
         try:
-            asyncio.run(self._send_message(message))
-        except Exception as e:
-            print(f"WebSocket send error: {e}")
+            self.loop.run_until_complete(self._connection_loop())
+        finally:
+            self.loop.close()
+
+    def _pop(self):
+        with self.queue_lock:
+            return self.queue.popleft() if self.queue else None
+
+    def _requeue(self, message):
+        with self.queue_lock:
+            if len(self.queue) < self.queue.maxlen:
+                self.queue.appendleft(message)
+            else:
+                self.counters['dropped'] += 1
+
+    async def _connection_loop(self):
+        """ Connect, drain the queue, and reconnect with exponential backoff on failure. """
+        backoff = self.min_backoff
+        connected_once = False
+        while self.running:
+            try:
+                async with websockets.connect(self.url) as websocket:
+                    self.socket = websocket
+                    if connected_once:
+                        self.counters['reconnects'] += 1
+                    connected_once = True
+                    backoff = self.min_backoff
+                    reader = asyncio.ensure_future(self._drain_incoming(websocket))
+                    reader.add_done_callback(lambda _: self._wakeup.set())
+                    flusher = asyncio.ensure_future(self._flush_batches())
+                    try:
+                        await self._negotiate(websocket)
+                        await self._send_pending(websocket, reader)
+                    finally:
+                        reader.cancel()
+                        flusher.cancel()
+            except Exception as e:
+                self.counters['errors'] += 1
+                if self.running:
+                    logger.warning("WebSocket connection error: %s, retrying in %.1fs", e, backoff)
+            finally:
+                self.socket = None
+
+            if self.running:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    async def _negotiate(self, websocket):
+        """ Offer the binary protocol; the receiver's ack is picked up by _drain_incoming. """
+        self.protocol_version = PROTOCOL_JSON
+        if self.protocol == "binary":
+            await self._start_binary_session(websocket)
+        elif self.protocol == "auto":
+            if self._has_queued_batches():
+                # Batches left from the previous connection need their header in front of them
+                await self._send_session_header(websocket)
+            await websocket.send(json.dumps({
+                'to': self.to_id,
+                'from': self.from_id,
+                'gestval': HELLO,
+                'protocols': [PROTOCOL_BINARY, PROTOCOL_JSON],
+            }))
+            self.loop.call_later(self.negotiate_timeout, self._negotiation_timeout)
+
+    def _negotiation_timeout(self):
+        if self.protocol_version == PROTOCOL_JSON:
+            logger.info("No protocol ack from receiver, staying on JSON")
+
+    async def _flush_batches(self):
+        """ Flush point batches that hit the time threshold before filling up. """
+        while self.running:
+            await asyncio.sleep(self.batcher.max_delay / 2)
+            with self.batch_lock:
+                frame = self.batcher.flush() if self.batcher.due() else None
+            if frame:
+                self.enqueue(frame)
+
+    async def _send_pending(self, websocket, reader):
+        while self.running:
+            if reader.done():
+                raise ConnectionError("connection closed by relay")
+            message = self._pop()
+            if message is None:
+                self._wakeup.clear()
+                # Re-check after clearing so a concurrent enqueue is not missed
+                if not self.queue and not reader.done():
+                    await self._wakeup.wait()
+                continue
+            traced = message if isinstance(message, dict) else None
+            if traced is not None:
+                traced['trace']['t_send'] = wall_ms()
+                message = json.dumps(traced)
+            try:
+                await websocket.send(message)
+            except Exception:
+                # Requeue the traced dict so a retry gets a fresh t_send and is only counted once it goes out
+                self._requeue(traced if traced is not None else message)
+                raise
+            if traced is not None:
+                self.collector.note_sent(traced['trace']['seq'])
+            self.counters['sent'] += 1
+            self.counters['bytes'] += len(message)
+
+    async def _drain_incoming(self, websocket):
+        """ Read relay replies so pings and error messages never back up the socket. """
+        async for reply in websocket:
+            if not isinstance(reply, str):
+                continue
+            if '"error"' in reply:
+                logger.warning("Relay error: %s", reply)
+            elif TRACE_ACK in reply and self.collector is not None:
+                try:
+                    self.collector.record_ack(json.loads(reply).get('trace') or {})
+                except (json.JSONDecodeError, AttributeError):
+                    continue
+            elif ACK in reply and self.protocol == "auto":
+                try:
+                    data = json.loads(reply)
+                except json.JSONDecodeError:
+                    continue
+                if data.get('gestval') == ACK and data.get('protocol') == PROTOCOL_BINARY \
+                        and self.protocol_version != PROTOCOL_BINARY:
+                    await self._start_binary_session(websocket)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Track whiteboard gestures and stream them to the relay.")
+    # e.g. rtsp://100.104.52.142:8080/h264_pcm.sdp, a device index, a recorded video file,
+    # or shm://gitframe for frames published by `python -m utils.framebus publish`
+    parser.add_argument("source", nargs="*", default=[4, 0], help="video sources to try in order")
+    parser.add_argument("--dual-model", action="store_true",
+                        help="run mp.solutions.hands alongside GestureRecognizer (old path, for comparison)")
+    parser.add_argument("--calibration", default=None,
+                        help="board calibration .npz; overrides the per-source file in --calibration-dir")
+    parser.add_argument("--calibration-dir", default="calibrations",
+                        help="where calibrations are saved and looked up by camera source")
+    parser.add_argument("--no-auto-calibrate", action="store_true",
+                        help="skip fiducial/contour detection of the board")
+    parser.add_argument("--headless", action="store_true",
+                        help="never open the click picker; run uncalibrated if nothing is saved or detected")
+    parser.add_argument("--protocol", choices=["json", "binary", "auto"], default="json",
+                        help="wire format; auto negotiates binary batches with the receiver")
+    parser.add_argument("--log-level", default="INFO", help="DEBUG shows per-point messages (rate limited)")
+    parser.add_argument("--stats-interval", type=float, default=0,
+                        help="log a per-stage latency line every N seconds (0 disables)")
+    parser.add_argument("--trace", action="store_true",
+                        help="add latency trace fields to JSON messages and collect receiver acks")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve JSON metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--filter", choices=["none", "one_euro", "kalman"], default="none",
+                        help="smooth pointer and draw coordinates (parameters differ per gesture)")
+    parser.add_argument("--predict-ms", type=float, default=0.0,
+                        help="extrapolate filtered points this far ahead to hide latency")
+    parser.add_argument("--track", action="store_true",
+                        help="run full inference only every few frames and follow the hand with optical flow")
+    parser.add_argument("--max-track-interval", type=int, default=6,
+                        help="most frames between full inferences when the hand is still")
+    parser.add_argument("--frame-budget-ms", type=float, default=None,
+                        help="stretch the inference interval when frames take longer than this")
+    parser.add_argument("--min-gesture-confidence", type=float, default=0.6)
+    parser.add_argument("--gesture-hold-ms", type=float, default=150,
+                        help="how long a gesture must be held before its start event is sent")
+    parser.add_argument("--min-move-px", type=float, default=4.0,
+                        help="only send draw/laser points that moved at least this far")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="run capture, preprocessing, inference and gesture logic as separate stages")
+    parser.add_argument("--inference-workers", type=int, default=0,
+                        help="with --pipeline, run inference in this many worker processes (0 = a thread)")
+    parser.add_argument("--queue-size", type=int, default=4, help="capacity of each pipeline queue")
+    parser.add_argument("--drop-policy", choices=DROP_POLICIES, default="drop_oldest",
+                        help="what a full capture/preprocess queue does with new frames")
+    parser.add_argument("--record", default=None,
+                        help="record per-frame landmarks, gestures and timestamps into this directory")
+    parser.add_argument("--replay", default=None,
+                        help="replay a landmark recording instead of reading the camera and running models")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="replay pacing relative to the recording; 0 runs as fast as possible")
+    parser.add_argument("--strokes-out", default=None,
+                        help="record drawn strokes and save them to this .npz on exit")
+    parser.add_argument("--stream-strokes", action="store_true",
+                        help="send finished, simplified strokes instead of individual draw points")
+    parser.add_argument("--flip-pixels", action="store_true",
+                        help="mirror the image itself instead of mirroring landmark coordinates (old path)")
+    parser.add_argument("--max-in-flight", type=int, default=1,
+                        help="frames allowed to wait on the recognizer before new ones are skipped")
+    parser.add_argument("--max-hands", type=int, default=1,
+                        help="hands (presenters) tracked per frame, each with its own id, gestures and strokes")
+    parser.add_argument("--hand-match-distance", type=float, default=0.2,
+                        help="largest normalized centroid jump between frames that keeps a hand's id")
+    parser.add_argument("--roi", action="store_true", help="only run inference on the padded whiteboard box")
+    parser.add_argument("--roi-padding", type=int, default=40, help="pixels of margin around the board")
+    parser.add_argument("--inference-width", type=int, default=None,
+                        help="downscale the inference image to at most this width")
+    args = parser.parse_args(argv)
+    if args.predict_ms > 0 and args.filter == "none":
+        parser.error("--predict-ms needs --filter one_euro or kalman")
+    return args
 
-    async def _send_message(self, message):
-        async with websockets.connect(self.url) as websocket:
-            await websocket.send(message)
 
-ws_sender = WebSocketSyncSender('ws://localhost:8080/ws', '1', '2')
-reader = GestureReader("rtsp://100.104.52.142:8080/h264_pcm.sdp", ws_sender)
-reader.start_recognition()
\ No newline at end of file
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(args.log_level)
+    profiler = RollingProfiler() if args.stats_interval or args.metrics_port else None
+    ws_sender = WebSocketSyncSender('ws://localhost:8080/ws', '1', '2', protocol=args.protocol, trace=args.trace)
+    reader = GestureReader(args.source, ws_sender, single_model=not args.dual_model,
+                           roi=args.roi, roi_padding=args.roi_padding, inference_width=args.inference_width,
+                           calibration_path=args.calibration, calibration_dir=args.calibration_dir,
+                           auto_calibrate=not args.no_auto_calibrate, interactive=not args.headless,
+                           profiler=profiler,
+                           point_filter=GestureFilterBank(args.filter, args.predict_ms / 1000.0),
+                           tracker=LandmarkTracker(max_interval=args.max_track_interval,
+                                                   frame_budget=args.frame_budget_ms and args.frame_budget_ms / 1000.0)
+                           if args.track else None,
+                           gesture_gate=GestureEventGate(min_confidence=args.min_gesture_confidence,
+                                                         min_hold=args.gesture_hold_ms / 1000.0,
+                                                         min_move=args.min_move_px),
+                           stroke_store=StrokeStore() if args.strokes_out else None,
+                           stream_strokes=args.stream_strokes, flip_pixels=args.flip_pixels,
+                           max_in_flight=args.max_in_flight,
+                           replay=LandmarkRecording(args.replay) if args.replay else None,
+                           replay_speed=args.replay_speed, record_path=args.record,
+                           pipeline=args.pipeline, inference_workers=args.inference_workers,
+                           queue_size=args.queue_size, drop_policy=args.drop_policy,
+                           max_hands=args.max_hands, hand_match_distance=args.hand_match_distance)
+    if args.stats_interval:
+        StatsReporter(reader.metrics, args.stats_interval).start()
+    if args.metrics_port:
+        MetricsServer(reader.metrics, args.metrics_port).start()
+    try:
+        reader.start_recognition()
+    finally:
+        if args.strokes_out and reader.stroke_store is not None:
+            # Hand 0 keeps the given path, other hands get a -hand<N> suffix
+            for state in reader.hand_states:
+                path = args.strokes_out if not state.hand_id else \
+                    args.strokes_out.replace(".npz", "") + f"-hand{state.hand_id}.npz"
+                state.stroke_store.finish()
+                state.stroke_store.save(path)
+                logger.info("Saved %s to %s", state.stroke_store.stats(), path)
+        if reader.recorder is not None:
+            reader.recorder.close()
+            logger.info("Recorded %s to %s", reader.recorder.stats(), args.record)
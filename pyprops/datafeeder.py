@@ -1,67 +1,319 @@
+"""
+Load generator for the relay (socket/server, or relay.py for offline runs).
+
+Spawns many asyncio WebSocket clients: senders stream draw/laser points at a
+fixed rate to one receiver each, or to "all" with --fanout, and every client
+records what arrives. Each message carries its sequence number and send time
+in a trace field (which the relay stamps with t_relay). Because every client
+runs on the same host, the report can give delivered rate, loss and end-to-end
+and relay-hop latency percentiles without clock synchronisation.
+
+    python datafeeder.py --senders 1000 --receivers 50 --rate 30 --duration 30
+    python datafeeder.py --local-relay --senders 200 --receivers 20 --fanout --size 512
+    python datafeeder.py --processes 4 --senders 4000 --receivers 200 --output load.json
+
+With --processes the clients are split across worker processes that start
+sending at the same wall-clock time, so the generator itself is not the
+bottleneck.
+"""
+import argparse
 import asyncio
-import websockets
 import json
+import math
+import multiprocessing
 import random
+import time
+from urllib.parse import urlparse
+
+import websockets
+
+
+def wall_ms():
+    return time.time() * 1000.0
+
+
+def draw_trajectory(rng, xdim=1920, ydim=1080, rate=30.0):
+    """
+    Endless (x, y, gesture) points shaped like whiteboard writing: strokes of
+    0.3-2 s with a smoothly drifting heading, joined by short laser moves.
+    """
+    x, y = rng.uniform(0.2, 0.8) * xdim, rng.uniform(0.2, 0.8) * ydim
+    while True:
+        heading = rng.uniform(0, 2 * math.pi)
+        speed = rng.uniform(150, 600) / rate  # pixels per point
+        turn = 0.0
+        for _ in range(max(int(rng.uniform(0.3, 2.0) * rate), 2)):
+            turn = 0.8 * turn + rng.gauss(0, 0.15)
+            heading += turn
+            x = min(max(x + math.cos(heading) * speed, 1.0), xdim - 1.0)
+            y = min(max(y + math.sin(heading) * speed, 1.0), ydim - 1.0)
+            yield x, y, "draw"
+        target_x, target_y = rng.uniform(0.1, 0.9) * xdim, rng.uniform(0.1, 0.9) * ydim
+        moves = max(int(rng.uniform(0.1, 0.5) * rate), 1)
+        for i in range(1, moves + 1):
+            yield x + (target_x - x) * i / moves, y + (target_y - y) * i / moves, "laser"
+        x, y = target_x, target_y
+
 
-class WebSocketRandomSender:
-    def __init__(self, url, from_id, to_id):
-        self.url = f"{url}?id={from_id}"
-        self.from_id = from_id
-        self.to_id = to_id
-        self.socket = None
-        self.running = True
-
-    def get_random_gesture(self):
-        gestures = ['tap', 'swipe', 'pinch', 'rotate', 'long_press']
-        return random.choice(gestures)
-
-    def generate_random_message(self):
-        return {
-            'to': self.to_id,
-            'from': self.from_id,
-            'xval': random.uniform(0, 100),
-            'yval': random.uniform(0, 100),
-            'gestval': self.get_random_gesture()
-        }
-
-    async def connect(self):
-        async with websockets.connect(self.url) as websocket:
-            self.socket = websocket
-            sender_task = asyncio.create_task(self.send_messages())
-            receiver_task = asyncio.create_task(self.receive_messages())
-            await asyncio.gather(sender_task, receiver_task)
-
-    async def send_messages(self):
-        while self.running:
+def random_points(rng, xdim=1920, ydim=1080, rate=30.0):
+    while True:
+        yield rng.uniform(1, xdim), rng.uniform(1, ydim), rng.choice(("draw", "laser"))
+
+
+PAYLOADS = {"trajectory": draw_trajectory, "random": random_points}
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(q):
+        return round(values[min(int(q * len(values)), len(values) - 1)], 3)
+
+    return {'p50': pick(0.50), 'p90': pick(0.90), 'p99': pick(0.99), 'max': round(values[-1], 3),
+            'mean': round(sum(values) / len(values), 3), 'count': len(values)}
+
+
+class LoadRun:
+    """ The clients of one process and the counters they share (one event loop, so no locking). """
+
+    def __init__(self, args, senders, receivers):
+        self.args = args
+        self.senders = senders
+        self.receivers = receivers
+        self.counters = {'connected': 0, 'connect_failures': 0, 'sent': 0, 'expected': 0, 'send_errors': 0,
+                         'late_sends': 0, 'delivered': 0, 'reordered': 0, 'relay_errors': 0}
+        # With fan-out every other client, senders included, receives each message
+        self.fanout_targets = args.senders + args.receivers - 1
+        self.latencies = []
+        self.relay_latencies = []
+        self.error_samples = {}
+
+    async def connect(self, client_id, limit):
+        async with limit:
             try:
-                message = self.generate_random_message()
-                await self.socket.send(json.dumps(message))
-                await asyncio.sleep(1)
+                websocket = await websockets.connect(f"{self.args.url}?id={client_id}", compression=None,
+                                                     max_size=None, open_timeout=self.args.connect_timeout)
             except Exception as e:
-                print(f"Send error: {e}")
-                self.running = False
+                self.counters['connect_failures'] += 1
+                self.error_samples.setdefault(type(e).__name__, str(e))
+                return None
+        self.counters['connected'] += 1
+        return websocket
 
-    async def receive_messages(self):
-        while self.running:
-            try:
-                message = await self.socket.recv()
+    async def receive(self, websocket):
+        last_seq = {}
+        try:
+            async for data in websocket:
+                now = wall_ms()
+                if isinstance(data, bytes):
+                    continue
                 try:
-                    data = json.loads(message)
-                    print('Received:', data)
-                except json.JSONDecodeError:
-                    print('Error parsing message')
-            except Exception as e:
-                print(f"Receive error: {e}")
-                self.running = False
-
-# Usage
-async def main():
-    sender = WebSocketRandomSender(
-        'ws://localhost:8080/ws', 
-        '1', 
-        '2'
-    )
-    await sender.connect()
+                    message = json.loads(data)
+                except ValueError:
+                    continue
+                if "error" in message:
+                    self.counters['relay_errors'] += 1
+                    self.error_samples.setdefault(message["error"].split(" ")[0], message["error"])
+                    continue
+                trace = message.get("trace")
+                if not isinstance(trace, dict) or "t_send" not in trace:
+                    continue
+                self.counters['delivered'] += 1
+                self.latencies.append(now - trace["t_send"])
+                if "t_relay" in trace:
+                    self.relay_latencies.append(trace["t_relay"] - trace["t_send"])
+                sender = message.get("from")
+                if trace["seq"] <= last_seq.get(sender, -1):
+                    self.counters['reordered'] += 1
+                last_seq[sender] = trace["seq"]
+        except websockets.ConnectionClosed:
+            pass
+
+    async def send(self, websocket, sender_id, to_id, start_at, end_at, rng):
+        args = self.args
+        interval = 1.0 / args.rate
+        points = PAYLOADS[args.payload](rng, args.xdim, args.ydim, args.rate)
+        pad = None
+        seq = 0
+        # Stagger senders across one interval so they do not all fire together
+        next_at = start_at + rng.uniform(0, interval)
+        while True:
+            now = time.time()
+            if now >= end_at:
+                break
+            if next_at > now:
+                await asyncio.sleep(next_at - now)
+            elif now - next_at > interval:
+                # Fell more than one interval behind: count it and resume the schedule from now
+                self.counters['late_sends'] += 1
+                next_at = now
+            x, y, gesture = next(points)
+            message = {'to': to_id, 'from': sender_id, 'xval': round(x, 1), 'yval': round(y, 1),
+                       'gestval': gesture, 'xdim': args.xdim, 'ydim': args.ydim,
+                       'trace': {'seq': seq, 't_send': round(wall_ms(), 3)}}
+            if args.size:
+                if pad is None:
+                    pad = "x" * max(args.size - len(json.dumps(message)) - len(', "pad": ""'), 0)
+                message['pad'] = pad
+            try:
+                await websocket.send(json.dumps(message))
+            except websockets.ConnectionClosed:
+                self.counters['send_errors'] += 1
+                break
+            self.counters['sent'] += 1
+            self.counters['expected'] += self.fanout_targets if to_id == "all" else 1
+            seq += 1
+            next_at += interval
+
+    async def run(self, start_at):
+        args = self.args
+        limit = asyncio.Semaphore(args.connect_concurrency)
+        # Receivers first so senders' targets exist by the time sending starts
+        receiver_sockets = await asyncio.gather(*(self.connect(client_id, limit) for client_id in self.receivers))
+        sender_sockets = await asyncio.gather(*(self.connect(client_id, limit) for client_id, _ in self.senders))
+        sockets = [s for s in receiver_sockets + sender_sockets if s is not None]
+        readers = [asyncio.ensure_future(self.receive(s)) for s in sockets]
+
+        delay = start_at - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        end_at = start_at + args.duration
+        await asyncio.gather(*(self.send(websocket, sender_id, to_id, start_at, end_at,
+                                         random.Random(f"{args.seed}:{sender_id}"))
+                               for websocket, (sender_id, to_id) in zip(sender_sockets, self.senders)
+                               if websocket is not None))
+        # Let messages still in flight arrive before counting them as lost
+        await asyncio.sleep(args.drain)
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*(s.close() for s in sockets), return_exceptions=True)
+
+    def result(self):
+        return {'counters': self.counters, 'latencies': self.latencies,
+                'relay_latencies': self.relay_latencies, 'errors': self.error_samples}
+
+
+def plan_clients(args, process_index=0):
+    """ (senders as (id, target), receiver ids) handled by one process. """
+    receivers = [f"{args.prefix}-r{j}" for j in range(args.receivers)]
+    senders = [(f"{args.prefix}-s{i}", "all" if args.fanout else receivers[i % len(receivers)])
+               for i in range(args.senders)]
+    return senders[process_index::args.processes], receivers[process_index::args.processes]
+
+
+def run_process(args, process_index, start_at):
+    raise_fd_limit()
+    senders, receivers = plan_clients(args, process_index)
+    load = LoadRun(args, senders, receivers)
+    asyncio.run(load.run(start_at))
+    return load.result()
+
+
+def raise_fd_limit():
+    """ Every client is a socket; lift the soft descriptor limit to the hard one where possible. """
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def start_local_relay(port):
+    """ Run relay.py in its own process so it does not share a core with the clients. """
+    import relay
+    process = multiprocessing.Process(target=relay.main, args=(["--port", str(port)],), daemon=True)
+    process.start()
+    time.sleep(1.0)
+    return process
+
+
+def summarize(args, results, elapsed):
+    counters = {}
+    latencies, relay_latencies, errors = [], [], {}
+    for result in results:
+        for key, value in result['counters'].items():
+            counters[key] = counters.get(key, 0) + value
+        latencies.extend(result['latencies'])
+        relay_latencies.extend(result['relay_latencies'])
+        errors.update(result['errors'])
+    expected = counters['expected']
+    return {
+        'config': {key: value for key, value in vars(args).items()},
+        'clients': {'senders': args.senders, 'receivers': args.receivers, 'connected': counters['connected'],
+                    'connect_failures': counters['connect_failures']},
+        'sent': counters['sent'],
+        'expected': expected,
+        'delivered': counters['delivered'],
+        'loss_rate': round(1.0 - counters['delivered'] / expected, 5) if expected else 0.0,
+        'send_rate': round(counters['sent'] / args.duration, 1),
+        'delivered_rate': round(counters['delivered'] / args.duration, 1),
+        'late_sends': counters['late_sends'],
+        'send_errors': counters['send_errors'],
+        'relay_errors': counters['relay_errors'],
+        'reordered': counters['reordered'],
+        'latency_ms': percentiles(latencies),
+        'relay_hop_ms': percentiles(relay_latencies),
+        'errors': errors,
+        'wall_s': round(elapsed, 2),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load generator for the gesture relay.")
+    parser.add_argument("--url", default="ws://localhost:8080/ws")
+    parser.add_argument("--senders", type=int, default=100)
+    parser.add_argument("--receivers", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=30.0, help="messages per second per sender")
+    parser.add_argument("--size", type=int, default=0, help="pad every message to about this many bytes")
+    parser.add_argument("--fanout", action="store_true", help='send to "all" instead of one receiver each')
+    parser.add_argument("--payload", choices=sorted(PAYLOADS), default="trajectory",
+                        help="draw-like strokes or uniformly random points")
+    parser.add_argument("--xdim", type=int, default=1920)
+    parser.add_argument("--ydim", type=int, default=1080)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of sending")
+    parser.add_argument("--drain", type=float, default=2.0, help="seconds to wait for stragglers after sending")
+    parser.add_argument("--processes", type=int, default=1, help="split the clients across this many processes")
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="handshakes in flight at once")
+    parser.add_argument("--connect-timeout", type=float, default=10.0)
+    parser.add_argument("--setup-time", type=float, default=None,
+                        help="seconds allowed for connecting before sending starts (default scales with clients)")
+    parser.add_argument("--prefix", default="load", help="client id prefix, to run next to real clients")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--local-relay", action="store_true",
+                        help="start relay.py on the --url port and benchmark against it")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    if args.receivers < 1 and not args.fanout:
+        parser.error("--receivers must be at least 1 without --fanout")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    relay_process = start_local_relay(urlparse(args.url).port or 80) if args.local_relay else None
+    setup_time = args.setup_time if args.setup_time is not None else \
+        2.0 + (args.senders + args.receivers) / args.connect_concurrency / args.processes
+    start_at = time.time() + setup_time
+    started = time.monotonic()
+    try:
+        if args.processes > 1:
+            with multiprocessing.Pool(args.processes) as pool:
+                results = pool.starmap(run_process, [(args, index, start_at) for index in range(args.processes)])
+        else:
+            results = [run_process(args, 0, start_at)]
+    finally:
+        if relay_process is not None:
+            relay_process.terminate()
+    report = json.dumps(summarize(args, results, time.monotonic() - started), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
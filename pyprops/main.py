@@ -1,22 +1,56 @@
+import argparse
+import importlib
+import threading
+
 import cv2
 import numpy as np
 import utils.calibrate
-from utils.annotate import HandDrawingAnnotator
+from utils.shared import load_root_module
+
+# The frame bus reader and the preview server are shared with the repository root rather than copied
+framebus = load_root_module("framebus")
+PreviewServer = load_root_module("preview").PreviewServer
+
+parser = argparse.ArgumentParser(description="Headless finger drawing with an optional MJPEG preview.")
+parser.add_argument("--preview-port", type=int, default=8090, help="port of the MJPEG preview (0 disables it)")
+parser.add_argument("--preview-host", default="127.0.0.1")
+parser.add_argument("--preview-fps", type=float, default=10.0)
+parser.add_argument("--preview-width", type=int, default=640)
+args = parser.parse_args()
 
-# Initialize video capture
+# Import mediapipe (through the annotator) in the background while the camera opens and calibrates
+annotate_import = threading.Thread(target=importlib.import_module, args=("utils.annotate",), daemon=True)
+annotate_import.start()
+
+# Initialize video capture: a phone IP, or shm://name to share frames another process already decodes
 ip = input()
-capture_url = f'rtsp://{ip}:8080/h264_pcm.sdp'
+capture_url = ip if ip.startswith(framebus.SCHEME) else f'rtsp://{ip}:8080/h264_pcm.sdp'
 try:
-    cap = cv2.VideoCapture(capture_url)
+    if capture_url.startswith(framebus.SCHEME):
+        cap = framebus.SharedFrameCapture(capture_url[len(framebus.SCHEME):])
+    else:
+        cap = cv2.VideoCapture(capture_url)
 except:
     cap = cv2.VideoCapture(0)
 
 calibrate_reference_result, calibrate_reference_image = cap.read()
-coords = utils.calibrate.get_whiteboard(calibrate_reference_image)
+coords = utils.calibrate.load_or_calibrate(calibrate_reference_image, capture_url)
+
+annotate_import.join()
+from utils.annotate import HandDrawingAnnotator
 
 # Initialize the annotator
 annotator = HandDrawingAnnotator(coords)
 
+# Overlays are drawn and encoded on the preview thread, only while someone watches;
+# GET /clear replaces the old 'c' key and is applied between frames
+clear_requested = threading.Event()
+preview = None
+if args.preview_port:
+    preview = PreviewServer(args.preview_port, args.preview_host, render=annotator.render_overlay,
+                            max_fps=args.preview_fps, width=args.preview_width,
+                            commands={"clear": clear_requested.set}).start()
+
 try:
     while cap.isOpened():
         ret, frame = cap.read()
@@ -24,23 +58,25 @@ try:
             continue
             
         frame = cv2.flip(frame, 1)
+
+        if clear_requested.is_set():
+            clear_requested.clear()
+            annotator.clear_drawing()
         
-        # Process the frame
-        annotated_frame = annotator.process_frame(frame)
-        
-        # Display the result
-        cv2.imshow("Finger Drawing", annotated_frame)
+        # Process the frame; no drawing happens on this loop
+        annotator.process_frame(frame, annotate=False)
         
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            break
-        elif key == ord('c'):
-            annotator.clear_drawing()
+        if preview is not None:
+            preview.submit(frame, annotator.overlay)
+
+except KeyboardInterrupt:
+    pass
 
 except Exception as e:
     print(f"Main loop error: {e}")
 
 finally:
+    if preview is not None:
+        preview.stop()
     annotator.cleanup()
     cap.release()
-    cv2.destroyAllWindows()
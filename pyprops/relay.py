@@ -0,0 +1,191 @@
+"""
+Pure-Python stand-in for the Go relay in socket/server, for benchmarking the
+sender -> relay -> receiver path offline.
+
+It speaks the same protocol: clients connect to /ws?id=<client id>. JSON
+messages are validated the way server.go does it and routed by their "to" field.
+Traced messages get the relay's wall-clock time stamped in as trace.t_relay.
+Binary protocol v2 frames ("GF" | version | type | len(to) | to | ...) are
+routed by their prefix only. "to": "all" goes to every other client, for JSON as
+well as binary frames, without the per-message field validation.
+
+    python relay.py --port 8080
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+
+# Control gestures carry no coordinates, see GestureProtocolHello/Ack and GestureTraceAck in data.go
+CONTROL_GESTURES = ("protocol_hello", "protocol_ack", "trace_ack")
+BINARY_MAGIC = b"GF"
+BINARY_PREFIX_LENGTH = 5
+
+
+def validate_message(message):
+    """ Same checks as WebSocketServer.validateMessage; returns an error string or None. """
+    if not message.get("from"):
+        return "from field is required"
+    if not message.get("to"):
+        return "to field is required"
+    if not message.get("xval") and not message.get("yval") and message.get("gestval") not in CONTROL_GESTURES:
+        return "invalid coordinate values"
+    if not message.get("gestval"):
+        return "gesture value is required"
+    return None
+
+
+def binary_target(frame):
+    """ Recipient id from a binary frame's routing prefix, or raises ValueError. """
+    if len(frame) < BINARY_PREFIX_LENGTH or frame[:2] != BINARY_MAGIC:
+        raise ValueError("not a binary protocol frame")
+    end = BINARY_PREFIX_LENGTH + frame[4]
+    if len(frame) < end:
+        raise ValueError("truncated routing prefix")
+    return frame[BINARY_PREFIX_LENGTH:end].decode()
+
+
+def request_path(websocket):
+    # The request moved from `websocket.path` to `websocket.request.path` in the newer websockets API
+    request = getattr(websocket, "request", None)
+    return request.path if request is not None else websocket.path
+
+
+class Relay:
+    def __init__(self):
+        self.clients = {}
+        self.counters = {'connections': 0, 'received': 0, 'forwarded': 0, 'errors': 0, 'bytes': 0}
+
+    async def handle(self, websocket):
+        client_id = parse_qs(urlparse(request_path(websocket)).query).get("id", [""])[0]
+        if not client_id:
+            await self.send_error(websocket, "Client ID required")
+            return
+        self.clients[client_id] = websocket
+        self.counters['connections'] += 1
+        try:
+            async for data in websocket:
+                self.counters['received'] += 1
+                self.counters['bytes'] += len(data)
+                if isinstance(data, bytes):
+                    await self.route_binary(websocket, client_id, data)
+                else:
+                    await self.route_text(websocket, data)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            # A reconnect under the same id may already have replaced this connection
+            if self.clients.get(client_id) is websocket:
+                del self.clients[client_id]
+
+    async def route_text(self, websocket, data):
+        try:
+            message = json.loads(data)
+            if not isinstance(message, dict):
+                raise ValueError("expected a JSON object")
+            # ParseData in data.go rejects these before any routing
+            if not message.get("from"):
+                raise ValueError("sender (from) is required")
+            if not message.get("to"):
+                raise ValueError("recipient (to) is required")
+        except ValueError as e:
+            await self.send_error(websocket, f"Invalid message format: {e}")
+            return
+        to_id, from_id = message.get("to"), message.get("from")
+        if to_id != "all" and to_id not in self.clients:
+            await self.send_error(websocket, f"Target client {to_id} does not exist")
+            return
+        if to_id == from_id:
+            await self.send_error(websocket, "Sender and recipient cannot be the same")
+            return
+        trace = message.get("trace")
+        if isinstance(trace, dict) and message.get("gestval") != "trace_ack":
+            trace["t_relay"] = int(time.time() * 1000)
+            data = json.dumps(message)
+        if to_id == "all":
+            self.broadcast(from_id, data)
+            return
+        error = validate_message(message)
+        if error:
+            await self.send_error(websocket, error)
+            return
+        await self.forward(to_id, data)
+
+    async def route_binary(self, websocket, client_id, frame):
+        try:
+            to_id = binary_target(frame)
+        except (ValueError, UnicodeDecodeError) as e:
+            await self.send_error(websocket, f"Invalid message format: {e}")
+            return
+        if to_id == client_id:
+            await self.send_error(websocket, "Sender and recipient cannot be the same")
+        elif to_id == "all":
+            self.broadcast(client_id, frame)
+        elif to_id not in self.clients:
+            await self.send_error(websocket, f"Target client {to_id} does not exist")
+        else:
+            await self.forward(to_id, frame)
+
+    async def forward(self, to_id, data):
+        target = self.clients.get(to_id)
+        if target is None:
+            return
+        try:
+            await target.send(data)
+            self.counters['forwarded'] += 1
+        except websockets.ConnectionClosed:
+            pass
+
+    def broadcast(self, from_id, data):
+        targets = [conn for client_id, conn in self.clients.items() if client_id != from_id]
+        # Writes without waiting on each receiver, so one slow client cannot stall the fan-out
+        websockets.broadcast(targets, data)
+        self.counters['forwarded'] += len(targets)
+
+    async def send_error(self, websocket, error):
+        self.counters['errors'] += 1
+        try:
+            await websocket.send(json.dumps({"error": error}))
+        except websockets.ConnectionClosed:
+            pass
+
+    def stats(self):
+        return dict(self.counters, clients=len(self.clients))
+
+
+async def report(relay, interval):
+    while True:
+        await asyncio.sleep(interval)
+        print(json.dumps(relay.stats()))
+
+
+async def serve(host="localhost", port=8080, stats_interval=0.0, ready=None):
+    """ Run a relay until cancelled; `ready` (an asyncio.Event) is set once it is listening. """
+    relay = Relay()
+    # No permessage-deflate, matching the gorilla upgrader's default
+    async with websockets.serve(relay.handle, host, port, compression=None, max_size=None):
+        print(f"Relay listening on ws://{host}:{port}/ws")
+        if ready is not None:
+            ready.set()
+        if stats_interval:
+            asyncio.ensure_future(report(relay, stats_interval))
+        await asyncio.Future()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Python relay compatible with socket/server, for offline benchmarks.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--stats-interval", type=float, default=0, help="print relay counters every N seconds")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.stats_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,12 @@ import numpy as np
 from collections import deque
 
 class HandDrawingAnnotator:
-    def __init__(self,coords):
+    def __init__(self,coords, tile_size=64, max_num_hands=1):
         # Initialize MediaPipe Hands
         self.coords = coords
         self.mp_hands = mp.solutions.hands
         self.hands = self.mp_hands.Hands(
-            max_num_hands=1,
+            max_num_hands=max_num_hands,
             min_detection_confidence=0.7,
             min_tracking_confidence=0.7)
         self.mp_draw = mp.solutions.drawing_utils
@@ -18,12 +18,27 @@ class HandDrawingAnnotator:
         self.drawing_mask = None
         self.prev_point = None
         self.drawing = False
+        # Open stroke of every hand drawing last frame, as (last point, stroke); each hand
+        # continues the nearest one so several presenters draw independent lines
+        self.active_strokes = []
         self.color = (0, 0, 255)  # Red color in BGR
         self.thickness = 4
+
+        # Sparse compositing: only tiles containing ink are blended onto the frame
+        self.tile_size = tile_size
+        self.ink_tiles = set()
+        self.tile_buffers = {}
+
+        # Vector copy of everything drawn, one list of points per stroke
+        self.strokes = []
+        self.current_stroke = None
         
         # Stability buffer
         self.point_buffer = deque(maxlen=3)
 
+        # Landmarks and cursor points of the last frame, for overlays drawn off the processing loop
+        self.overlay = ([], [])
+
     def calculate_distance(self, point1, point2):
         return np.sqrt((point1[0] - point2[0])**2 + (point1[1] - point2[1])**2)
 
@@ -55,17 +70,77 @@ class HandDrawingAnnotator:
         except (AttributeError, TypeError):
             return False, None
 
-    def process_frame(self, frame):
+    def mark_ink(self, p1, p2):
+        """Record which tiles a stroke segment touched"""
+        h, w = self.drawing_mask.shape[:2]
+        pad = self.thickness
+        x0 = max(0, min(p1[0], p2[0]) - pad)
+        y0 = max(0, min(p1[1], p2[1]) - pad)
+        x1 = min(w - 1, max(p1[0], p2[0]) + pad)
+        y1 = min(h - 1, max(p1[1], p2[1]) + pad)
+        if x0 > x1 or y0 > y1:
+            return
+
+        ts = self.tile_size
+        for ty in range(y0 // ts, y1 // ts + 1):
+            for tx in range(x0 // ts, x1 // ts + 1):
+                self.ink_tiles.add((ty, tx))
+
+    def draw_segment(self, p1, p2, stroke=None):
+        cv2.line(self.drawing_mask, p1, p2, self.color, self.thickness)
+        self.mark_ink(p1, p2)
+        (stroke if stroke is not None else self.current_stroke).append(p2)
+
+    def continue_stroke(self, draw_point, active):
+        """Extend the nearest open stroke within reach, or start a new one"""
+        nearest = None
+        for candidate in active:
+            distance = self.calculate_distance(candidate[0], draw_point)
+            if distance < 50 and (nearest is None or distance < nearest[0]):
+                nearest = (distance, candidate)
+        if nearest is not None:
+            active.remove(nearest[1])
+            prev_point, stroke = nearest[1]
+            self.draw_segment(prev_point, draw_point, stroke)
+        else:
+            stroke = [draw_point]
+            self.strokes.append(stroke)
+        self.current_stroke = stroke
+        return draw_point, stroke
+
+    def composite(self, frame):
+        """Blend the ink tiles onto the frame in place, leaving empty tiles untouched"""
+        ts = self.tile_size
+        # Snapshot the tiles: a preview thread may composite while the loop adds ink
+        for ty, tx in list(self.ink_tiles):
+            y0, x0 = ty * ts, tx * ts
+            frame_tile = frame[y0:y0 + ts, x0:x0 + ts]
+            th, tw = frame_tile.shape[:2]
+            # Contiguous scratch buffer per tile shape, reused every frame
+            buffer = self.tile_buffers.get((th, tw))
+            if buffer is None:
+                buffer = self.tile_buffers[(th, tw)] = np.empty_like(frame_tile)
+            cv2.addWeighted(self.drawing_mask[y0:y0 + ts, x0:x0 + ts], 0.5, frame_tile, 1.0, 0, dst=buffer)
+            frame_tile[...] = buffer
+        return frame
+
+    def process_frame(self, frame, annotate=True):
         """
-        Process a single frame and return the annotated result
+        Process a single frame and return the annotated result. With annotate=False
+        only the drawing state is updated and the frame is returned untouched;
+        render_overlay draws the overlays later, e.g. on a preview thread.
         """
-        if self.drawing_mask is None:
+        if self.drawing_mask is None or self.drawing_mask.shape != frame.shape:
             self.drawing_mask = np.zeros_like(frame)
+            self.ink_tiles.clear()
             
         # Convert frame to RGB for MediaPipe
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         results = self.hands.process(rgb_frame)
         
+        active = list(self.active_strokes)
+        self.active_strokes = []
+        cursors = []
         if results.multi_hand_landmarks:
             for hand_landmarks in results.multi_hand_landmarks:
                 try:
@@ -75,34 +150,45 @@ class HandDrawingAnnotator:
                     if fingers_together and draw_point:
                         # Check if the draw_point is inside the polygon
                         if self.check_inside_polygon(draw_point[0], draw_point[1]):
-                            cv2.circle(frame, draw_point, 10, (0, 255, 0), -1)
-                            
-                            if self.prev_point is not None and self.calculate_distance(self.prev_point, draw_point) < 50:
-                                cv2.line(self.drawing_mask, self.prev_point, draw_point, self.color, self.thickness)
-                            self.prev_point = draw_point
-                            self.drawing = True
-                        else:
-                            self.drawing = False
-                            self.prev_point = None
-                    else:
-                        self.drawing = False
-                        self.prev_point = None
-                    
-                    # Draw hand landmarks
-                    self.mp_draw.draw_landmarks(frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
+                            cursors.append(draw_point)
+                            self.active_strokes.append(self.continue_stroke(draw_point, active))
                 
                 except Exception as e:
                     print(f"Error processing hand landmarks: {e}")
                     continue
         
+        self.drawing = bool(self.active_strokes)
+        self.prev_point = self.active_strokes[-1][0] if self.active_strokes else None
+        self.overlay = (list(results.multi_hand_landmarks or []), cursors)
+
+        if not annotate:
+            return frame
+        return self.render_overlay(frame, self.overlay)
+
+    def render_overlay(self, frame, overlay=None):
+        """Draw cursors, hand landmarks and the ink onto the frame in place"""
+        hand_landmarks_list, cursors = overlay if overlay is not None else self.overlay
+        for draw_point in cursors:
+            cv2.circle(frame, draw_point, 10, (0, 255, 0), -1)
+        for hand_landmarks in hand_landmarks_list:
+            self.mp_draw.draw_landmarks(frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
+
         # Combine the drawing mask with the frame
-        frame = cv2.addWeighted(self.drawing_mask, 0.5, frame, 1.0, 0)
+        if self.drawing_mask is not None and self.drawing_mask.shape == frame.shape:
+            self.composite(frame)
         return frame
 
     def clear_drawing(self):
         """Clear the drawing mask"""
         if self.drawing_mask is not None:
-            self.drawing_mask = np.zeros_like(self.drawing_mask)
+            ts = self.tile_size
+            for ty, tx in self.ink_tiles:
+                self.drawing_mask[ty * ts:(ty + 1) * ts, tx * ts:(tx + 1) * ts] = 0
+        self.ink_tiles.clear()
+        self.strokes = []
+        self.current_stroke = None
+        self.prev_point = None
+        self.active_strokes = []
 
     def cleanup(self):
         """Clean up resources"""
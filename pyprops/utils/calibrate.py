@@ -1,19 +1,69 @@
+import hashlib
+import json
+import os
+
 import cv2
 
-coords = []
+from utils.shared import load_root_module
+
+
+class WhiteboardPicker:
+    """ Collects four clicked corners on a copy of the image. """
+
+    def __init__(self, image, window="image"):
+        self.img = image.copy()
+        self.window = window
+        self.coords = []
+
+    def click_event(self, event, x, y, flags, params):
+        if event == cv2.EVENT_LBUTTONDOWN and len(self.coords) < 4:
+            cv2.circle(self.img, (x, y), 5, (0, 0, 255), -1)
+            cv2.imshow(self.window, self.img)
+            self.coords.append((x, y))
+
+    def run(self):
+        cv2.imshow(self.window, self.img)
+        cv2.setMouseCallback(self.window, self.click_event)
+        cv2.waitKey(0)
+        cv2.destroyAllWindows()
+        return self.coords
 
-def click_event(event, x, y, flags, params):
-    global img
-    if event == cv2.EVENT_LBUTTONDOWN and len(coords) < 4:
-        cv2.circle(img, (x, y), 5, (0, 0, 255), -1)
-        cv2.imshow('image', img)
-        coords.append((x, y))
 
 def get_whiteboard(image):
-    global img
-    img = image
-    cv2.imshow('image', img)
-    cv2.setMouseCallback('image', click_event)
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
-    return coords
\ No newline at end of file
+    return WhiteboardPicker(image).run()
+
+
+def detect_whiteboard(image, min_area=0.15, epsilon=0.02):
+    """ Corners found by the root utils/board.py contour detector, as int tuples, or None. """
+    corners = load_root_module("board").detect_contour(image, min_area, epsilon)
+    if corners is None:
+        return None
+    return [tuple(int(v) for v in point) for point in corners]
+
+
+def calibration_path(source, directory="calibrations"):
+    digest = hashlib.sha1(str(source).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(directory, f"{digest}.json")
+
+
+def load_or_calibrate(image, source, directory="calibrations", interactive=True):
+    """
+    Saved corners for this camera source, else detected from the board contour,
+    else clicked in the picker. New calibrations are saved for the next start.
+    """
+    path = calibration_path(source, directory)
+    height, width = image.shape[:2]
+    if os.path.exists(path):
+        with open(path) as f:
+            saved = json.load(f)
+        if saved.get("size") == [width, height]:
+            return [tuple(point) for point in saved["coords"]]
+
+    coords = detect_whiteboard(image)
+    if coords is None and interactive:
+        coords = get_whiteboard(image)
+    if coords and len(coords) == 4:
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"source": str(source), "size": [width, height], "coords": coords}, f)
+    return coords
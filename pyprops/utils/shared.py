@@ -0,0 +1,31 @@
+"""
+Modules shared with the `utils` package in the repository root.
+
+pyprops has its own `utils` package, so putting the root on sys.path would
+still resolve `utils` to this one. Root modules are loaded by file path instead,
+under a "gitframe_utils." name, and imported once per process:
+
+    framebus = load_root_module("framebus")
+"""
+import importlib.util
+import os
+import sys
+
+ROOT_UTILS = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "utils"))
+PREFIX = "gitframe_utils."
+
+
+def load_root_module(name):
+    """ The root utils/<name>.py module; only its top-level imports must not reach into `utils`. """
+    qualified = PREFIX + name
+    module = sys.modules.get(qualified)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(qualified, os.path.join(ROOT_UTILS, name + ".py"))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[qualified] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[qualified]
+            raise
+    return module
@@ -3,16 +3,18 @@ package server
 import (
 	"encoding/json"
 	"fmt"
+	"time"
 )
 
 type Message struct {
-	To      string  `json:"to"`
-	From    string  `json:"from"`
-	Xval    float64 `json:"xval"`
-	Yval    float64 `json:"yval"`
-	Gestval string  `json:"gestval"`
-	DimX	float64 `json:"xdim"`
-	DimY	float64 `json:"ydim"`
+	To      string          `json:"to"`
+	From    string          `json:"from"`
+	Xval    float64         `json:"xval"`
+	Yval    float64         `json:"yval"`
+	Gestval string          `json:"gestval"`
+	DimX    float64         `json:"xdim"`
+	DimY    float64         `json:"ydim"`
+	Trace   json.RawMessage `json:"trace,omitempty"`
 }
 
 // ParseData parses a JSON-encoded message with basic validation
@@ -32,3 +34,72 @@ func ParseData(data []byte) (*Message, error) {
 
 	return &message, nil
 }
+
+// Binary point-stream frames (protocol version 2) start with
+// "GF" | version | frame type | len(to) | to, followed by an opaque payload.
+const (
+	binaryMagic0       = 'G'
+	binaryMagic1       = 'F'
+	binaryPrefixLength = 5
+)
+
+// Control gestures used to negotiate the wire protocol between peers
+const (
+	GestureProtocolHello = "protocol_hello"
+	GestureProtocolAck   = "protocol_ack"
+	GestureTraceAck      = "trace_ack"
+)
+
+// StampRelayTime adds the relay's wall-clock time (ms) to a traced message.
+// Messages it cannot rewrite are returned unchanged.
+func StampRelayTime(data []byte) []byte {
+	var fields map[string]json.RawMessage
+	if err := json.Unmarshal(data, &fields); err != nil {
+		return data
+	}
+	var trace map[string]json.RawMessage
+	if err := json.Unmarshal(fields["trace"], &trace); err != nil {
+		return data
+	}
+	// "trace": null unmarshals into a nil map without an error
+	if trace == nil {
+		return data
+	}
+	trace["t_relay"] = json.RawMessage(fmt.Sprintf("%d", time.Now().UnixMilli()))
+	stamped, err := json.Marshal(trace)
+	if err != nil {
+		return data
+	}
+	fields["trace"] = stamped
+	out, err := json.Marshal(fields)
+	if err != nil {
+		return data
+	}
+	return out
+}
+
+type BinaryHeader struct {
+	Version   byte
+	FrameType byte
+	To        string
+}
+
+// ParseBinaryHeader reads only the routing prefix of a binary frame
+func ParseBinaryHeader(data []byte) (*BinaryHeader, error) {
+	if len(data) < binaryPrefixLength || data[0] != binaryMagic0 || data[1] != binaryMagic1 {
+		return nil, fmt.Errorf("invalid binary frame")
+	}
+	toLength := int(data[4])
+	if len(data) < binaryPrefixLength+toLength {
+		return nil, fmt.Errorf("truncated binary frame")
+	}
+	header := &BinaryHeader{
+		Version:   data[2],
+		FrameType: data[3],
+		To:        string(data[binaryPrefixLength : binaryPrefixLength+toLength]),
+	}
+	if header.To == "" {
+		return nil, fmt.Errorf("recipient (to) is required")
+	}
+	return header, nil
+}
@@ -50,13 +50,23 @@ func (s *WebSocketServer) HandleConnections(w http.ResponseWriter, r *http.Reque
 	fmt.Printf("Client %s connected\n", clientID)
 
 	for {
-		_, msg, err := conn.ReadMessage()
+		messageType, msg, err := conn.ReadMessage()
 		if err != nil {
 			break
 		}
 
+		if messageType == websocket.BinaryMessage {
+			s.routeBinary(conn, clientID, msg)
+			continue
+		}
+
 		message, err := ParseData(msg)
-		if !s.clientExists(message.To) {
+		if err != nil {
+			sendErrorToConnection(conn, fmt.Sprintf("Invalid message format: %v", err))
+			continue
+		}
+
+		if message.To != "all" && !s.clientExists(message.To) {
 			sendErrorToConnection(conn, fmt.Sprintf("Target client %s does not exist", message.To))
 			continue
 		}
@@ -66,18 +76,13 @@ func (s *WebSocketServer) HandleConnections(w http.ResponseWriter, r *http.Reque
 			continue
 		}
 
-		if message.To == "all" {
-			for clientID := range s.clients {
-				if clientID == message.From {
-					continue
-				}
-				s.SendMessageToClient(clientID, msg)
-			}
-			continue
+		// Only traced messages pay for the rewrite; acks keep the forward-path stamp
+		if message.Trace != nil && message.Gestval != GestureTraceAck {
+			msg = StampRelayTime(msg)
 		}
 
-		if err != nil {
-			sendErrorToConnection(conn, fmt.Sprintf("Invalid message format: %v", err))
+		if message.To == "all" {
+			s.broadcast(message.From, websocket.TextMessage, msg)
 			continue
 		}
 
@@ -98,6 +103,45 @@ func (s *WebSocketServer) HandleConnections(w http.ResponseWriter, r *http.Reque
 	fmt.Printf("Client %s disconnected\n", clientID)
 }
 
+// routeBinary forwards a protocol v2 frame using only its routing prefix
+func (s *WebSocketServer) routeBinary(conn *websocket.Conn, clientID string, msg []byte) {
+	header, err := ParseBinaryHeader(msg)
+	if err != nil {
+		sendErrorToConnection(conn, fmt.Sprintf("Invalid message format: %v", err))
+		return
+	}
+	if header.To == clientID {
+		sendErrorToConnection(conn, "Sender and recipient cannot be the same")
+		return
+	}
+
+	if header.To == "all" {
+		s.broadcast(clientID, websocket.BinaryMessage, msg)
+		return
+	}
+
+	if !s.clientExists(header.To) {
+		sendErrorToConnection(conn, fmt.Sprintf("Target client %s does not exist", header.To))
+		return
+	}
+	s.SendFrameToClient(header.To, websocket.BinaryMessage, msg)
+}
+
+// broadcast sends a frame to every connected client except the sender
+func (s *WebSocketServer) broadcast(fromID string, messageType int, msg []byte) {
+	s.lock.RLock()
+	targets := make([]string, 0, len(s.clients))
+	for id := range s.clients {
+		if id != fromID {
+			targets = append(targets, id)
+		}
+	}
+	s.lock.RUnlock()
+	for _, id := range targets {
+		s.SendFrameToClient(id, messageType, msg)
+	}
+}
+
 func (s *WebSocketServer) clientExists(clientID string) bool {
 	s.lock.RLock()
 	defer s.lock.RUnlock()
@@ -112,6 +156,10 @@ func sendErrorToConnection(conn *websocket.Conn, errorMsg string) {
 }
 
 func (s *WebSocketServer) SendMessageToClient(clientID string, msg []byte) error {
+	return s.SendFrameToClient(clientID, websocket.TextMessage, msg)
+}
+
+func (s *WebSocketServer) SendFrameToClient(clientID string, messageType int, msg []byte) error {
 	s.lock.RLock()
 	defer s.lock.RUnlock()
 
@@ -120,7 +168,7 @@ func (s *WebSocketServer) SendMessageToClient(clientID string, msg []byte) error
 		return fmt.Errorf("client %s not found", clientID)
 	}
 
-	return conn.WriteMessage(websocket.TextMessage, msg)
+	return conn.WriteMessage(messageType, msg)
 }
 
 func (s *WebSocketServer) validateMessage(m *Message) error {
@@ -130,7 +178,8 @@ func (s *WebSocketServer) validateMessage(m *Message) error {
 	if m.To == "" {
 		return fmt.Errorf("to field is required")
 	}
-	if m.Xval == 0 && m.Yval == 0 {
+	isControl := m.Gestval == GestureProtocolHello || m.Gestval == GestureProtocolAck || m.Gestval == GestureTraceAck
+	if m.Xval == 0 && m.Yval == 0 && !isControl {
 		return fmt.Errorf("invalid coordinate values")
 	}
 	if m.Gestval == "" {
@@ -0,0 +1,209 @@
+"""
+Runs one GestureReader per board, each in its own process.
+
+Boards are listed in a JSON file:
+
+    {
+      "url": "ws://localhost:8080/ws",
+      "boards": [
+        {"name": "room-a", "source": "rtsp://10.0.0.5:8080/h264_pcm.sdp",
+         "calibration": "room-a.npz", "from_id": "1", "to_id": "2", "cpu": 1,
+         "options": {"roi": true, "track": true}}
+      ]
+    }
+
+Calibrations are looked up per camera source (or from "calibration") and
+otherwise detected from fiducials or the board contour; workers never open
+the click picker. Every worker gets its own sender connection and reports heartbeats with its
+metrics. Workers that die or whose frame count stops advancing are restarted
+with backoff.
+
+    python supervisor.py boards.json --report-interval 10
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from utils.log import setup_logging
+
+logger = logging.getLogger("supervisor")
+
+READER_OPTIONS = ("single_model", "roi", "roi_padding", "inference_width", "max_hands")
+
+
+def pin_to_cpu(cpu):
+    """ Pin the current process to one core where the platform allows it. """
+    if cpu is None or not hasattr(os, "sched_setaffinity"):
+        return
+    try:
+        os.sched_setaffinity(0, {int(cpu)})
+    except OSError as e:
+        logger.warning("Could not pin to CPU %s: %s", cpu, e)
+
+
+def run_board(board, url, status_queue, heartbeat_interval):
+    """ Worker process entry point: build the sender and reader for one board and run it. """
+    setup_logging(board.get("log_level", "INFO"))
+    pin_to_cpu(board.get("cpu"))
+
+    # Imported in the worker so the supervisor itself stays light
+    from new_main import GestureReader, WebSocketSyncSender
+    from utils.filters import GestureFilterBank
+    from utils.profiling import RollingProfiler
+    from utils.tracking import LandmarkTracker
+
+    name = board["name"]
+    options = board.get("options", {})
+
+    sender = WebSocketSyncSender(url, board["from_id"], board["to_id"], protocol=options.get("protocol", "json"))
+    reader = GestureReader(
+        board["source"], sender,
+        calibration_path=board.get("calibration"),
+        calibration_dir=board.get("calibration_dir", "calibrations"),
+        interactive=False,
+        profiler=RollingProfiler(),
+        point_filter=GestureFilterBank(options.get("filter", "none"), options.get("predict_ms", 0.0) / 1000.0),
+        tracker=LandmarkTracker() if options.get("track") else None,
+        **{key: options[key] for key in READER_OPTIONS if key in options}
+    )
+    if reader.board is None:
+        raise SystemExit(f"{name}: no saved calibration and the board could not be detected")
+
+    def heartbeat():
+        while True:
+            status_queue.put((name, os.getpid(), time.time(), reader.metrics()))
+            time.sleep(heartbeat_interval)
+
+    threading.Thread(target=heartbeat, name="heartbeat", daemon=True).start()
+    reader.start_recognition()
+    sender.close()
+
+
+class BoardWorker:
+    """ Supervisor-side handle for one board's process and its latest health report. """
+
+    def __init__(self, board, url, status_queue, heartbeat_interval):
+        self.board = board
+        self.name = board["name"]
+        self.url = url
+        self.status_queue = status_queue
+        self.heartbeat_interval = heartbeat_interval
+        self.process = None
+        self.restarts = 0
+        self.backoff = 1.0
+        self.next_start = 0.0
+        self.last_progress = None
+        self.frames = 0
+        self.metrics = {}
+
+    def start(self):
+        self.process = multiprocessing.Process(
+            target=run_board, name=f"board-{self.name}",
+            args=(self.board, self.url, self.status_queue, self.heartbeat_interval), daemon=True)
+        self.process.start()
+        self.last_progress = time.time()
+        self.frames = 0
+        logger.info("Started %s (pid %s)", self.name, self.process.pid)
+
+    def stop(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(5)
+            if self.process.is_alive():
+                self.process.kill()
+
+    def check(self, now, heartbeat_timeout):
+        """ Restart the worker if it exited or stopped processing frames. """
+        if self.process is None:
+            if now >= self.next_start:
+                self.start()
+            return
+
+        alive = self.process.is_alive()
+        # Model loading and the first capture can take a while, so allow extra time before the first frame
+        timeout = heartbeat_timeout if self.frames else heartbeat_timeout * 3
+        stale = now - self.last_progress > timeout
+        if alive and not stale:
+            return
+
+        reason = f"exited with code {self.process.exitcode}" if not alive else "stalled"
+        logger.warning("%s %s, restarting in %.0fs", self.name, reason, self.backoff)
+        self.stop()
+        self.process = None
+        self.restarts += 1
+        self.next_start = now + self.backoff
+        self.backoff = min(self.backoff * 2, 60.0)
+
+    def record(self, pid, timestamp, metrics):
+        """ A heartbeat only counts as healthy if the frame counter moved since the last one. """
+        if self.process is None or pid != self.process.pid:
+            return  # late report from a worker that was already replaced
+        frames = metrics.get("frames", 0)
+        if frames > self.frames:
+            self.last_progress = timestamp
+            self.frames = frames
+            self.backoff = 1.0
+        self.metrics = metrics
+
+
+def report_line(workers):
+    parts = []
+    total_fps = 0.0
+    for worker in workers:
+        fps = worker.metrics.get("fps", 0.0)
+        total_fps += fps
+        sender = worker.metrics.get("sender", {})
+        parts.append(f"{worker.name}: fps={fps:.1f} frames={worker.metrics.get('frames', 0)} "
+                     f"sent={sender.get('sent', 0)} dropped={sender.get('dropped', 0)} restarts={worker.restarts}")
+    return f"total fps={total_fps:.1f} | " + " | ".join(parts)
+
+
+def supervise(config, heartbeat_interval=2.0, heartbeat_timeout=15.0, report_interval=10.0):
+    status_queue = multiprocessing.Queue()
+    url = config.get("url", "ws://localhost:8080/ws")
+    workers = {board["name"]: BoardWorker(board, url, status_queue, heartbeat_interval) for board in config["boards"]}
+    next_report = time.time() + report_interval
+
+    try:
+        while True:
+            try:
+                name, pid, timestamp, metrics = status_queue.get(timeout=0.5)
+                workers[name].record(pid, timestamp, metrics)
+            except queue.Empty:
+                pass
+
+            now = time.time()
+            for worker in workers.values():
+                worker.check(now, heartbeat_timeout)
+            if now >= next_report:
+                logger.info(report_line(workers.values()))
+                next_report = now + report_interval
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        for worker in workers.values():
+            worker.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run one gesture reader process per board.")
+    parser.add_argument("config", help="JSON file listing the boards")
+    parser.add_argument("--heartbeat-interval", type=float, default=2.0)
+    parser.add_argument("--heartbeat-timeout", type=float, default=15.0,
+                        help="restart a worker whose frame count has not advanced for this long")
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(args.log_level)
+    with open(args.config) as f:
+        config = json.load(f)
+    supervise(config, args.heartbeat_interval, args.heartbeat_timeout, args.report_interval)
@@ -0,0 +1,49 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from utils.board import BoardCalibration
+from utils.preprocess import FramePreprocessor
+
+
+def off_centre_frame():
+    """ 480x640 frame with the board filled in on the left third of the raw image. """
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    frame[100:300, 40:240] = 255
+    corners = [(40, 100), (240, 100), (240, 300), (40, 300)]
+    return frame, corners
+
+
+def test_mirrored_board_matches_mirrored_landmarks():
+    frame, corners = off_centre_frame()
+    board = BoardCalibration(corners, frame.shape).mirrored()
+    # A raw-frame point at x=60 is reported by mirrored landmarks at 640 - 60
+    assert board.contains(640 - 60, 200)
+    assert not board.contains(60, 200)
+    u, v = board.to_board((640 - 40, 100))
+    assert u == pytest.approx(0.0, abs=1e-6) and v == pytest.approx(0.0, abs=1e-6)
+
+
+@pytest.mark.parametrize("flip_pixels", [False, True])
+def test_roi_crop_lands_on_off_centre_board(flip_pixels):
+    frame, corners = off_centre_frame()
+    board = BoardCalibration(corners, frame.shape).mirrored()
+    rect = (board.top_left_x, board.top_left_y, board.xdim, board.ydim)
+    cropped = FramePreprocessor(flip_pixels=flip_pixels).crop(frame, rect)
+    assert cropped.shape[:2] == (200, 200)
+    assert cropped.min() == 255
+
+
+def test_unversioned_calibration_is_rejected(tmp_path):
+    frame, corners = off_centre_frame()
+    board = BoardCalibration(corners, frame.shape)
+    legacy = tmp_path / "legacy.npz"
+    np.savez_compressed(legacy, corners=board.corners, frame_shape=np.array(frame.shape[:2]),
+                        homography=board.homography, mask=board.mask)
+    assert BoardCalibration.load_or_none(str(legacy)) is None
+
+    current = tmp_path / "current.npz"
+    board.mirrored().save(str(current))
+    loaded = BoardCalibration.load_or_none(str(current))
+    assert loaded is not None and np.allclose(loaded.corners, board.mirrored().corners)
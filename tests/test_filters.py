@@ -0,0 +1,30 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils import filters
+
+
+def write_trajectory(path, count=60):
+    t = np.arange(count) / 30.0
+    trajectory = np.stack([t, 100 + 200 * t, 50 + 10 * np.sin(t * 6)], axis=1)
+    np.save(path, trajectory)
+    return str(path)
+
+
+def test_cli_with_prediction_evaluates_every_kind(tmp_path):
+    path = write_trajectory(tmp_path / "traj.npy")
+    results = filters.main([path, "--predict-ms", "30"])
+    assert set(results) == {"none", "one_euro", "kalman"}
+    assert results["none"]["rms_error_px"] >= 0.0
+
+
+def test_cli_rejects_prediction_without_filter(tmp_path):
+    path = write_trajectory(tmp_path / "traj.npy")
+    with pytest.raises(SystemExit):
+        filters.main([path, "--kind", "none", "--predict-ms", "30"])
+
+
+def test_make_filter_rejects_prediction_without_filter():
+    with pytest.raises(ValueError):
+        filters.make_filter("none", 0.03)
@@ -0,0 +1,182 @@
+import hashlib
+import logging
+import os
+import re
+
+import cv2
+import numpy as np
+
+# Saved calibrations hold corners in mirrored-frame pixels since version 2; version 1
+# files (no version field) were in raw-frame pixels and are no longer valid
+CALIBRATION_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+# ArUco ids expected at the board's top-left, top-right, bottom-right and bottom-left corners
+CORNER_MARKER_IDS = (0, 1, 2, 3)
+
+
+def order_corners(points):
+    """ Order four points as top-left, top-right, bottom-right, bottom-left. """
+    pts = np.asarray(points, dtype=np.float32).reshape(4, 2)
+    sums = pts.sum(axis=1)
+    diffs = pts[:, 1] - pts[:, 0]
+    return np.array([
+        pts[np.argmin(sums)],
+        pts[np.argmin(diffs)],
+        pts[np.argmax(sums)],
+        pts[np.argmax(diffs)],
+    ], dtype=np.float32)
+
+
+def calibration_path_for(source, directory="calibrations"):
+    """ Calibration file for a camera source: a readable slug plus a short hash of the full source. """
+    source = str(source)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", source).strip("-")[-40:] or "camera"
+    digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(directory, f"{slug}-{digest}.npz")
+
+
+def detect_markers(frame, marker_ids=CORNER_MARKER_IDS):
+    """
+    Board corners from four ArUco markers (DICT_4X4_50), using each marker's
+    corner that points at the board's outer corner. None without all four or
+    without the cv2.aruco module.
+    """
+    aruco = getattr(cv2, "aruco", None)
+    if aruco is None:
+        return None
+    dictionary = aruco.getPredefinedDictionary(aruco.DICT_4X4_50)
+    if hasattr(aruco, "ArucoDetector"):
+        marker_corners, ids, _ = aruco.ArucoDetector(dictionary).detectMarkers(frame)
+    else:
+        marker_corners, ids, _ = aruco.detectMarkers(frame, dictionary)
+    if ids is None:
+        return None
+    found = {int(marker_id): corners.reshape(4, 2) for marker_id, corners in zip(ids.ravel(), marker_corners)}
+    if not all(marker_id in found for marker_id in marker_ids):
+        return None
+    # ArUco corners are ordered TL, TR, BR, BL, so marker i contributes its own corner i
+    return np.array([found[marker_id][i] for i, marker_id in enumerate(marker_ids)], dtype=np.float32)
+
+
+def detect_contour(frame, min_area=0.15, epsilon=0.02):
+    """
+    Board corners from the largest convex quadrilateral contour covering at least
+    `min_area` of the frame, or None.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    edges = cv2.dilate(edges, None)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    frame_area = gray.shape[0] * gray.shape[1]
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True):
+        if cv2.contourArea(contour) < min_area * frame_area:
+            break
+        approx = cv2.approxPolyDP(contour, epsilon * cv2.arcLength(contour, True), True)
+        if len(approx) == 4 and cv2.isContourConvex(approx):
+            return approx.reshape(4, 2).astype(np.float32)
+    return None
+
+
+class BoardCalibration:
+    """
+    Perspective mapping from camera pixels to normalized whiteboard space.
+
+    The homography and a rasterized inside-board mask are computed once, so
+    per-point work is a table lookup and a 3x3 multiply.
+    """
+
+    UNIT_SQUARE = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=np.float32)
+
+    def __init__(self, corners, frame_shape, homography=None, mask=None):
+        self.corners = order_corners(corners)
+        self.frame_h, self.frame_w = int(frame_shape[0]), int(frame_shape[1])
+        self.homography = homography if homography is not None else \
+            cv2.getPerspectiveTransform(self.corners, self.UNIT_SQUARE)
+        self.mask = mask if mask is not None else self._rasterize()
+
+        x_vals, y_vals = self.corners[:, 0], self.corners[:, 1]
+        self.top_left_x, self.top_left_y = int(x_vals.min()), int(y_vals.min())
+        self.xdim = int(x_vals.max()) - self.top_left_x
+        self.ydim = int(y_vals.max()) - self.top_left_y
+
+    def _rasterize(self):
+        mask = np.zeros((self.frame_h, self.frame_w), dtype=np.uint8)
+        cv2.fillPoly(mask, [self.corners.round().astype(np.int32)], 1)
+        return mask
+
+    def contains(self, x, y):
+        """ O(1) point-in-board test against the precomputed mask. """
+        x, y = int(x), int(y)
+        if 0 <= x < self.frame_w and 0 <= y < self.frame_h:
+            return bool(self.mask[y, x])
+        return False
+
+    def contains_many(self, points):
+        """ Vectorized point-in-board test for an (N, 2) array of pixel coordinates. """
+        pts = np.asarray(points).reshape(-1, 2).astype(np.int64)
+        inside = (pts[:, 0] >= 0) & (pts[:, 0] < self.frame_w) & (pts[:, 1] >= 0) & (pts[:, 1] < self.frame_h)
+        result = np.zeros(len(pts), dtype=bool)
+        result[inside] = self.mask[pts[inside, 1], pts[inside, 0]].astype(bool)
+        return result
+
+    @classmethod
+    def detect(cls, frame):
+        """ Calibrate from fiducial markers, falling back to the board contour. Returns (board, method). """
+        for method, detector in (("markers", detect_markers), ("contour", detect_contour)):
+            corners = detector(frame)
+            if corners is not None:
+                return cls(corners, frame.shape), method
+        return None, None
+
+    def mirrored(self):
+        """ The same board in horizontally mirrored frame pixels (x -> frame_w - x), like mirrored landmarks. """
+        corners = self.corners.copy()
+        corners[:, 0] = self.frame_w - corners[:, 0]
+        return BoardCalibration(corners, (self.frame_h, self.frame_w))
+
+    def matches(self, frame_shape):
+        """ True when this calibration was made at the given frame resolution. """
+        return (self.frame_h, self.frame_w) == (int(frame_shape[0]), int(frame_shape[1]))
+
+    def to_board(self, points):
+        """ Map pixel coordinates to normalized [0, 1] board space. Accepts (2,) or (N, 2). """
+        pts = np.asarray(points, dtype=np.float64)
+        single = pts.ndim == 1
+        pts = pts.reshape(-1, 2)
+        projected = pts @ self.homography[:, :2].T + self.homography[:, 2]
+        mapped = projected[:, :2] / projected[:, 2:3]
+        return mapped[0] if single else mapped
+
+    def to_board_pixels(self, points, xdim, ydim):
+        """ Map pixel coordinates to board space scaled to an (xdim, ydim) canvas. """
+        return self.to_board(points) * np.array([xdim, ydim], dtype=np.float64)
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(path, version=CALIBRATION_VERSION, corners=self.corners,
+                            frame_shape=np.array([self.frame_h, self.frame_w]),
+                            homography=self.homography, mask=self.mask)
+
+    @classmethod
+    def load(cls, path):
+        """ Load a saved calibration; raises ValueError for files from another format version. """
+        with np.load(path) as data:
+            version = int(data["version"]) if "version" in data.files else 1
+            if version != CALIBRATION_VERSION:
+                raise ValueError(f"Calibration {path} has version {version}, expected {CALIBRATION_VERSION}")
+            return cls(data["corners"], tuple(data["frame_shape"]),
+                       homography=data["homography"], mask=data["mask"])
+
+    @classmethod
+    def load_or_none(cls, path):
+        """ Saved calibration, or None when there is none or it is from an incompatible version. """
+        if path and os.path.exists(path):
+            try:
+                return cls.load(path)
+            except ValueError as e:
+                logger.warning("%s, recalibrating", e)
+        return None
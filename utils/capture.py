@@ -0,0 +1,170 @@
+import logging
+import os
+import threading
+import time
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+def parse_source(source):
+    """ Turn a device index, digit string, file path or stream URL into a VideoCapture argument. """
+    if isinstance(source, int):
+        return source
+    source = str(source).strip()
+    if source.isdigit():
+        return int(source)
+    return source
+
+
+def is_live_source(source):
+    """ Devices and network streams are live; local files and image sequences are played back in order. """
+    source = parse_source(source)
+    if isinstance(source, int):
+        return True
+    if "%" in source:
+        return False  # printf-style image sequence, e.g. frames/%05d.png
+    return "://" in source or not os.path.exists(source)
+
+
+def open_capture(sources):
+    """ Open the first source in `sources` that VideoCapture reports as opened. """
+    if isinstance(sources, (str, int)):
+        sources = [sources]
+    for source in sources:
+        cap = cv2.VideoCapture(parse_source(source))
+        # VideoCapture never raises on a bad source, so probe it explicitly
+        if cap.isOpened():
+            return cap, source
+        cap.release()
+    raise RuntimeError(f"Could not open any video source from {list(sources)}")
+
+
+def open_frame_source(sources, copy_frames=False):
+    """
+    LatestFrameCapture for devices, streams and files, or a SharedFrameCapture when
+    the first source is a frame bus segment ("shm://name", see utils.framebus).
+    """
+    first = sources if isinstance(sources, (str, int)) else next(iter(sources), None)
+    if isinstance(first, str) and first.startswith("shm://"):
+        from utils.framebus import SharedFrameCapture
+        return SharedFrameCapture(first[len("shm://"):], copy_frames=copy_frames)
+    return LatestFrameCapture(sources)
+
+
+class LatestFrameCapture:
+    """
+    Decodes frames on a dedicated thread and keeps only the newest one.
+
+    Exposes the same read/isOpened/release interface as cv2.VideoCapture so it
+    can be dropped into existing processing loops.
+    """
+
+    def __init__(self, sources, stall_timeout=2.0, reconnect_delay=1.0, max_reconnects=None):
+        if isinstance(sources, (str, int)):
+            sources = [sources]
+        self.sources = list(sources)
+        self.stall_timeout = stall_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnects = max_reconnects
+
+        self.cap, self.source = open_capture(self.sources)
+        self.live = is_live_source(self.source)
+
+        # Single-slot buffer guarded by a condition variable
+        self.cond = threading.Condition()
+        self.frame = None
+        self.frame_id = 0
+        self.frame_time = 0.0
+        self.last_read_id = 0
+
+        self.counters = {'captured': 0, 'dropped': 0, 'reconnects': 0, 'read_failures': 0}
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, name="capture", daemon=True)
+        self.thread.start()
+
+    def _capture_loop(self):
+        last_frame_at = time.monotonic()
+        while self.running:
+            ret, frame = self.cap.read()
+            now = time.monotonic()
+            if not ret:
+                self.counters['read_failures'] += 1
+                if not self.live:
+                    break
+                if now - last_frame_at > self.stall_timeout:
+                    if not self._reconnect():
+                        break
+                    # The new stream gets a full stall_timeout before it counts as stalled
+                    last_frame_at = time.monotonic()
+                time.sleep(0.005)
+                continue
+
+            last_frame_at = now
+            with self.cond:
+                if not self.live:
+                    # Files are not real-time, so wait for the consumer instead of dropping
+                    while self.running and self.frame_id != self.last_read_id:
+                        self.cond.wait(0.1)
+                elif self.frame_id != self.last_read_id:
+                    self.counters['dropped'] += 1
+                self.frame = frame
+                self.frame_id += 1
+                self.frame_time = now
+                self.counters['captured'] += 1
+                self.cond.notify_all()
+
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def _reconnect(self):
+        """ Reopen a stalled stream. Returns False once reconnect attempts are exhausted. """
+        if self.max_reconnects is not None and self.counters['reconnects'] >= self.max_reconnects:
+            return False
+        logger.warning("Capture stalled on %s, reconnecting", self.source)
+        self.cap.release()
+        time.sleep(self.reconnect_delay)
+        self.counters['reconnects'] += 1
+        try:
+            self.cap, self.source = open_capture(self.sources)
+        except RuntimeError as e:
+            logger.error("Reconnect failed: %s", e)
+        return True
+
+    def read(self, timeout=None):
+        """ Block until a frame newer than the last one returned is available. """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.frame_id != self.last_read_id or not self.running, timeout):
+                return False, None
+            if self.frame_id == self.last_read_id:
+                return False, None
+            self.last_read_id = self.frame_id
+            frame = self.frame
+            self.cond.notify_all()
+        return True, frame
+
+    def read_with_time(self, timeout=None):
+        """ Like read(), but also returns the monotonic time the frame was decoded. """
+        with self.cond:
+            ok, frame = self.read(timeout)
+            return ok, frame, self.frame_time
+
+    def isOpened(self):
+        return self.running or self.frame_id != self.last_read_id
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def stats(self):
+        snapshot = dict(self.counters)
+        snapshot['source'] = str(self.source)
+        return snapshot
+
+    def release(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join(timeout=2.0)
+        self.cap.release()
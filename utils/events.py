@@ -0,0 +1,92 @@
+import math
+
+
+class GestureEventGate:
+    """
+    Turns per-frame recognizer output into edge-triggered events.
+
+    A gesture becomes active after it has been seen with at least `min_confidence`
+    for `min_hold` seconds, and stays active until it has been missing (or below
+    `release_confidence`) for `release_time` seconds. Only the transitions are
+    reported, as ("start", gesture) and ("end", gesture). A start inside the
+    gesture's cooldown is swallowed together with its matching end.
+
+    Draw and laser points go through `should_send_point`, which passes a point only
+    when it moved more than `min_move` pixels, the point type changed, or
+    `keepalive` seconds have passed.
+    """
+
+    def __init__(self, min_confidence=0.6, release_confidence=0.4, min_hold=0.15, release_time=0.2,
+                 cooldowns=None, default_cooldown=1.5, min_move=4.0, keepalive=0.5):
+        self.min_confidence = min_confidence
+        self.release_confidence = release_confidence
+        self.min_hold = min_hold
+        self.release_time = release_time
+        self.cooldowns = cooldowns or {}
+        self.default_cooldown = default_cooldown
+        self.min_move = min_move
+        self.keepalive = keepalive
+
+        self.active = None
+        self.active_emitted = False
+        self.active_seen = 0.0
+        self.candidate = None
+        self.candidate_since = 0.0
+        self.last_start = {}
+
+        self.last_point = None  # (kind, x, y, t)
+        self.counters = {'frames': 0, 'gesture_events': 0, 'cooldown_suppressed': 0,
+                         'points_sent': 0, 'points_suppressed': 0}
+
+    def update(self, gesture, score, now):
+        """ Feed one frame's top gesture and score; returns the list of events to send. """
+        self.counters['frames'] += 1
+        events = []
+        observed = gesture if gesture and gesture != "None" else None
+
+        if self.active is not None:
+            if observed == self.active and score >= self.release_confidence:
+                self.active_seen = now
+            elif now - self.active_seen >= self.release_time:
+                if self.active_emitted:
+                    events.append(("end", self.active))
+                self.active = None
+
+        if self.active is None:
+            if observed is not None and score >= self.min_confidence:
+                if observed != self.candidate:
+                    self.candidate, self.candidate_since = observed, now
+                if now - self.candidate_since >= self.min_hold:
+                    self._activate(observed, now, events)
+            else:
+                self.candidate = None
+
+        self.counters['gesture_events'] += len(events)
+        return events
+
+    def _activate(self, gesture, now, events):
+        cooldown = self.cooldowns.get(gesture, self.default_cooldown)
+        self.active, self.active_seen, self.candidate = gesture, now, None
+        self.active_emitted = now - self.last_start.get(gesture, -math.inf) >= cooldown
+        if self.active_emitted:
+            self.last_start[gesture] = now
+            events.append(("start", gesture))
+        else:
+            self.counters['cooldown_suppressed'] += 1
+
+    def should_send_point(self, kind, x, y, now):
+        """ Rate-limit draw/laser points to real movement. """
+        if self.last_point is not None:
+            last_kind, last_x, last_y, last_t = self.last_point
+            if kind == last_kind and math.hypot(x - last_x, y - last_y) < self.min_move \
+                    and now - last_t < self.keepalive:
+                self.counters['points_suppressed'] += 1
+                return False
+        self.last_point = (kind, x, y, now)
+        self.counters['points_sent'] += 1
+        return True
+
+    def stats(self):
+        snapshot = dict(self.counters)
+        snapshot['active'] = self.active
+        return snapshot
@@ -0,0 +1,258 @@
+"""
+Per-point trajectory filters for pointer and draw coordinates.
+
+Filters take (t, x, y) with t in seconds and return a filtered (x, y). They are
+plain-float implementations so the per-point cost stays in the microseconds.
+
+Offline evaluation on a recorded trajectory (.npy or .csv with t, x, y columns):
+
+    python -m utils.filters trajectory.npy --kind one_euro --predict-ms 30
+"""
+import argparse
+import math
+
+import numpy as np
+
+
+class PassThroughFilter:
+    def __call__(self, t, x, y):
+        return x, y
+
+    def reset(self):
+        pass
+
+
+class OneEuroFilter:
+    """
+    One Euro filter (Casiez et al.): a low-pass filter whose cutoff rises with speed,
+    so slow movements are smoothed heavily and fast ones follow with little lag.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.last_t = None
+        self.x = self.y = 0.0
+        self.dx = self.dy = 0.0
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, t, x, y):
+        if self.last_t is None or t <= self.last_t:
+            self.last_t, self.x, self.y = t, float(x), float(y)
+            return self.x, self.y
+
+        dt = t - self.last_t
+        self.last_t = t
+
+        a_d = self._alpha(self.d_cutoff, dt)
+        self.dx += a_d * ((x - self.x) / dt - self.dx)
+        self.dy += a_d * ((y - self.y) / dt - self.dy)
+
+        speed = math.hypot(self.dx, self.dy)
+        a = self._alpha(self.min_cutoff + self.beta * speed, dt)
+        self.x += a * (x - self.x)
+        self.y += a * (y - self.y)
+        return self.x, self.y
+
+    def velocity(self):
+        return self.dx, self.dy
+
+
+class KalmanFilter:
+    """
+    Constant-velocity Kalman filter, run independently per axis with a 2x2 covariance.
+
+    `process_noise` is the acceleration variance (px^2/s^4), `measurement_noise`
+    the landmark jitter variance (px^2).
+    """
+
+    def __init__(self, process_noise=5e4, measurement_noise=16.0):
+        self.q = process_noise
+        self.r = measurement_noise
+        self.reset()
+
+    def reset(self):
+        self.last_t = None
+        # Per axis: position, velocity and covariance entries p00, p01, p11
+        self.state = [[0.0, 0.0, 0.0, 0.0, 0.0], [0.0, 0.0, 0.0, 0.0, 0.0]]
+
+    def _step(self, axis, z, dt):
+        pos, vel, p00, p01, p11 = self.state[axis]
+        # Predict
+        pos += vel * dt
+        dt2 = dt * dt
+        p00 += dt * (2 * p01 + dt * p11) + self.q * dt2 * dt2 / 4
+        p01 += dt * p11 + self.q * dt2 * dt / 2
+        p11 += self.q * dt2
+        # Update with the position measurement
+        s = p00 + self.r
+        k0, k1 = p00 / s, p01 / s
+        innovation = z - pos
+        pos += k0 * innovation
+        vel += k1 * innovation
+        p11 -= k1 * p01
+        p01 -= k1 * p00
+        p00 -= k0 * p00
+        self.state[axis] = [pos, vel, p00, p01, p11]
+        return pos
+
+    def __call__(self, t, x, y):
+        if self.last_t is None or t <= self.last_t:
+            self.last_t = t
+            self.state = [[float(x), 0.0, self.r, 0.0, 1e4], [float(y), 0.0, self.r, 0.0, 1e4]]
+            return float(x), float(y)
+        dt = t - self.last_t
+        self.last_t = t
+        return self._step(0, x, dt), self._step(1, y, dt)
+
+    def velocity(self):
+        return self.state[0][1], self.state[1][1]
+
+
+class PredictiveFilter:
+    """ Extrapolates a velocity-tracking filter `horizon` seconds ahead to hide pipeline latency. """
+
+    def __init__(self, inner, horizon=0.03, max_jump=80.0):
+        self.inner = inner
+        self.horizon = horizon
+        self.max_jump = max_jump
+
+    def reset(self):
+        self.inner.reset()
+
+    def __call__(self, t, x, y):
+        fx, fy = self.inner(t, x, y)
+        vx, vy = self.inner.velocity()
+        px, py = vx * self.horizon, vy * self.horizon
+        # Never predict further than max_jump pixels, which would overshoot on direction changes
+        jump = math.hypot(px, py)
+        if jump > self.max_jump:
+            px, py = px * self.max_jump / jump, py * self.max_jump / jump
+        return fx + px, fy + py
+
+
+# Laser pointing favours responsiveness, drawing favours smooth strokes
+DEFAULT_PARAMS = {
+    'one_euro': {
+        'draw': {'min_cutoff': 1.0, 'beta': 0.005},
+        'laser': {'min_cutoff': 2.5, 'beta': 0.02},
+    },
+    'kalman': {
+        'draw': {'process_noise': 2e4, 'measurement_noise': 25.0},
+        'laser': {'process_noise': 1e5, 'measurement_noise': 16.0},
+    },
+}
+
+
+def make_filter(kind, predict=0.0, **params):
+    """ Build a filter by name: "none", "one_euro" or "kalman", optionally with prediction. """
+    if kind in (None, "none"):
+        if predict > 0:
+            raise ValueError("Prediction needs a filter that estimates velocity (one_euro or kalman)")
+        return PassThroughFilter()
+    if kind == "one_euro":
+        point_filter = OneEuroFilter(**params)
+    elif kind == "kalman":
+        point_filter = KalmanFilter(**params)
+    else:
+        raise ValueError(f"Unknown filter kind: {kind}")
+    if predict > 0:
+        point_filter = PredictiveFilter(point_filter, horizon=predict)
+    return point_filter
+
+
+class GestureFilterBank:
+    """
+    Keeps one filter per gesture type and resets it when the stream is interrupted,
+    so a new stroke never starts by smoothing towards the end of the last one.
+    """
+
+    def __init__(self, kind="one_euro", predict=0.0, params=None, reset_after=0.25):
+        self.kind = kind
+        self.predict = predict
+        self.params = params if params is not None else DEFAULT_PARAMS.get(kind, {})
+        self.reset_after = reset_after
+        self.filters = {}
+        self.last_gesture = None
+        self.last_t = None
+
+    def __call__(self, t, x, y, gesture):
+        point_filter = self.filters.get(gesture)
+        if point_filter is None:
+            point_filter = make_filter(self.kind, self.predict, **self.params.get(gesture, {}))
+            self.filters[gesture] = point_filter
+        if gesture != self.last_gesture or (self.last_t is not None and t - self.last_t > self.reset_after):
+            point_filter.reset()
+        self.last_gesture, self.last_t = gesture, t
+        return point_filter(t, x, y)
+
+
+def load_trajectory(path):
+    """ Load an (N, 3) array of t, x, y from .npy or comma-separated text. """
+    if path.endswith(".npy"):
+        return np.load(path)
+    return np.loadtxt(path, delimiter=",", ndmin=2)
+
+
+def evaluate(trajectory, point_filter, reference_window=9):
+    """
+    Score a filter on a recorded (N, 3) trajectory.
+
+    The reference is a centred (zero-lag) moving average of the raw points, which
+    no causal filter can see. Jitter is the RMS second difference of the output.
+    """
+    traj = np.asarray(trajectory, dtype=np.float64)
+    t, raw = traj[:, 0], traj[:, 1:3]
+    out = np.array([point_filter(ti, xi, yi) for ti, xi, yi in traj[:, :3]])
+
+    kernel = np.ones(reference_window) / reference_window
+    half = reference_window // 2
+    reference = np.column_stack([np.convolve(raw[:, i], kernel, mode="same") for i in range(2)])
+    valid = slice(half, len(traj) - half)
+
+    def jitter(points):
+        return float(np.sqrt((np.diff(points, n=2, axis=0) ** 2).sum(axis=1).mean())) if len(points) > 2 else 0.0
+
+    error = np.linalg.norm(out[valid] - reference[valid], axis=1)
+    return {
+        'points': int(len(traj)),
+        'duration_s': float(t[-1] - t[0]) if len(t) else 0.0,
+        'rms_error_px': float(np.sqrt((error ** 2).mean())) if error.size else 0.0,
+        'max_error_px': float(error.max()) if error.size else 0.0,
+        'raw_jitter_px': jitter(raw),
+        'filtered_jitter_px': jitter(out),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate pointer filters on a recorded trajectory.")
+    parser.add_argument("trajectory", help=".npy or .csv with t, x, y columns")
+    parser.add_argument("--kind", choices=["none", "one_euro", "kalman", "all"], default="all")
+    parser.add_argument("--gesture", choices=["draw", "laser"], default="draw")
+    parser.add_argument("--predict-ms", type=float, default=0.0)
+    args = parser.parse_args(argv)
+    if args.kind == "none" and args.predict_ms > 0:
+        parser.error("--predict-ms needs --kind one_euro, kalman or all")
+
+    trajectory = load_trajectory(args.trajectory)
+    kinds = ["none", "one_euro", "kalman"] if args.kind == "all" else [args.kind]
+    results = {}
+    for kind in kinds:
+        params = DEFAULT_PARAMS.get(kind, {}).get(args.gesture, {})
+        # The unfiltered baseline has no velocity estimate to predict with
+        predict = args.predict_ms / 1000.0 if kind != "none" else 0.0
+        result = results[kind] = evaluate(trajectory, make_filter(kind, predict, **params))
+        print(kind, " ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in result.items()))
+    return results
+
+
+if __name__ == "__main__":
+    main()
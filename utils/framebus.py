@@ -0,0 +1,280 @@
+"""
+Shared-memory frame bus: one process decodes, any number of processes read.
+
+The publisher owns a `multiprocessing.shared_memory` segment laid out as
+
+    control  int64[8 + slots]   magic, version, slots, height, width, channels,
+                                latest sequence number, open flag, then the
+                                sequence number held by each slot (-1 while written)
+    times    float64[slots]     capture time of each slot (time.monotonic)
+    frames   uint8[slots, h, w, c]
+
+Frames are decoded straight into the next slot of the ring. Readers attach by
+name and get NumPy views into the segment without copying. A reader that falls
+behind simply skips to the newest frame; the producer never waits for anyone.
+A view stays valid until the producer wraps around to its slot, which
+`FrameSubscriber.is_current(seq)` checks.
+
+    python -m utils.framebus publish rtsp://10.0.0.5:8080/h264_pcm.sdp 0 --name gitframe
+    python new_main.py shm://gitframe
+"""
+import argparse
+import logging
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = 0x47465242  # "GFRB"
+VERSION = 1
+CONTROL_FIELDS = 8
+LATEST, OPEN = 6, 7
+SCHEME = "shm://"
+
+
+def _layout(slots, shape):
+    control_bytes = (CONTROL_FIELDS + slots) * 8
+    times_bytes = slots * 8
+    # Align frame data to a cache line
+    frames_offset = (control_bytes + times_bytes + 63) // 64 * 64
+    return control_bytes, frames_offset, frames_offset + slots * int(np.prod(shape))
+
+
+def _attach(name):
+    """ Attach without letting this process's resource tracker unlink the producer's segment at exit. """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class _Ring:
+    def _map(self, slots, shape):
+        control_bytes, frames_offset, _ = _layout(slots, shape)
+        buf = self.shm.buf
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.control = np.ndarray((CONTROL_FIELDS + slots,), dtype=np.int64, buffer=buf)
+        self.slot_seq = self.control[CONTROL_FIELDS:]
+        self.times = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=control_bytes)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=buf, offset=frames_offset)
+
+    def _release_views(self):
+        # Views must be dropped before the segment can be closed
+        self.control = self.slot_seq = self.times = self.frames = None
+
+
+class FramePublisher(_Ring):
+    """ Producer side of the ring. `shape` is (height, width, channels) of uint8 frames. """
+
+    def __init__(self, name, shape, slots=8):
+        _, _, size = _layout(slots, shape)
+        self.name = name
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._map(slots, shape)
+        self.control[:CONTROL_FIELDS] = (MAGIC, VERSION, slots, shape[0], shape[1], shape[2], -1, 1)
+        self.slot_seq[:] = -1
+        self.seq = -1
+
+    def next_slot(self):
+        """ Claim the next slot for writing; returns (seq, writable view). Call `commit(seq)` when done. """
+        seq = self.seq + 1
+        slot = seq % self.slots
+        self.slot_seq[slot] = -1  # readers treat the slot as invalid while it is being written
+        return seq, self.frames[slot]
+
+    def commit(self, seq, timestamp=None):
+        slot = seq % self.slots
+        self.times[slot] = time.monotonic() if timestamp is None else timestamp
+        self.slot_seq[slot] = seq
+        self.control[LATEST] = seq
+        self.seq = seq
+
+    def publish(self, frame, timestamp=None):
+        seq, view = self.next_slot()
+        view[...] = frame
+        self.commit(seq, timestamp)
+        return seq
+
+    def close(self, unlink=True):
+        if self.control is not None:
+            self.control[OPEN] = 0
+        self._release_views()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class FrameSubscriber(_Ring):
+    """ Reader side of the ring: zero-copy views of the newest frame, never blocking the producer. """
+
+    def __init__(self, name, poll_interval=0.002):
+        self.name = name
+        self.poll_interval = poll_interval
+        self.shm = _attach(name)
+        header = np.ndarray((CONTROL_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        if header[0] != MAGIC or header[1] != VERSION:
+            header = None
+            self.shm.close()
+            raise ValueError(f"{name} is not a frame bus segment")
+        slots, shape = int(header[2]), (int(header[3]), int(header[4]), int(header[5]))
+        header = None
+        self._map(slots, shape)
+        self.frames.flags.writeable = False  # only the publisher writes into the ring
+        self.counters = {'read': 0, 'skipped': 0, 'overruns': 0}
+
+    @property
+    def latest(self):
+        return int(self.control[LATEST])
+
+    @property
+    def producer_open(self):
+        return bool(self.control[OPEN])
+
+    def is_current(self, seq):
+        """ True while the slot holding `seq` has not been reused by the producer. """
+        return int(self.slot_seq[seq % self.slots]) == seq
+
+    def read(self, after=-1, timeout=None, copy=False):
+        """
+        Newest frame with a sequence number above `after`, as (seq, frame, capture_time).
+        Returns (None, None, None) on timeout or once the producer has closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            seq = self.latest
+            if seq > after:
+                slot = seq % self.slots
+                frame = self.frames[slot]
+                if copy:
+                    frame = frame.copy()
+                timestamp = float(self.times[slot])
+                if self.is_current(seq):
+                    if after >= 0 and seq > after + 1:
+                        self.counters['skipped'] += seq - after - 1
+                    self.counters['read'] += 1
+                    return seq, frame, timestamp
+                self.counters['overruns'] += 1  # slot reused while reading; take the next newest
+                continue
+            if not self.producer_open:
+                return None, None, None
+            if deadline is not None and time.monotonic() >= deadline:
+                return None, None, None
+            time.sleep(self.poll_interval)
+
+    def stats(self):
+        snapshot = dict(self.counters)
+        snapshot['latest'] = self.latest
+        return snapshot
+
+    def close(self):
+        self._release_views()
+        self.shm.close()
+
+
+class SharedFrameCapture:
+    """
+    FrameSubscriber behind the LatestFrameCapture interface, so "shm://name" can be
+    used anywhere a camera source is accepted. `copy_frames` hands out private
+    copies for consumers that keep frames past the next read.
+    """
+
+    def __init__(self, name, copy_frames=False):
+        self.source = SCHEME + name
+        self.subscriber = FrameSubscriber(name)
+        self.copy_frames = copy_frames
+        self.last_seq = -1
+
+    def read(self, timeout=None):
+        ok, frame, _ = self.read_with_time(timeout)
+        return ok, frame
+
+    def read_with_time(self, timeout=None):
+        seq, frame, timestamp = self.subscriber.read(self.last_seq, timeout, copy=self.copy_frames)
+        if seq is None:
+            return False, None, None
+        self.last_seq = seq
+        return True, frame, timestamp
+
+    def isOpened(self):
+        return self.subscriber.producer_open or self.subscriber.latest > self.last_seq
+
+    def get(self, prop):
+        import cv2
+        height, width = self.subscriber.shape[:2]
+        return {cv2.CAP_PROP_FRAME_WIDTH: width, cv2.CAP_PROP_FRAME_HEIGHT: height}.get(prop, 0.0)
+
+    def stats(self):
+        snapshot = self.subscriber.stats()
+        return {'captured': snapshot['read'], 'dropped': snapshot['skipped'], 'overruns': snapshot['overruns'],
+                'source': self.source}
+
+    def release(self):
+        self.subscriber.close()
+
+
+def publish(sources, name, slots=8, reconnect_delay=1.0, report_interval=10.0):
+    """ Decode `sources` (first one that opens) into the ring until interrupted or a file ends. """
+    from utils.capture import is_live_source, open_capture
+
+    cap, source = open_capture(sources)
+    ok, first = cap.read()
+    if not ok:
+        raise RuntimeError(f"No frame from {source}")
+    publisher = FramePublisher(name, first.shape, slots)
+    publisher.publish(first)
+    logger.info("Publishing %s as %s%s (%dx%d, %d slots)", source, SCHEME, name, first.shape[1], first.shape[0], slots)
+    live = is_live_source(source)
+    frames, last_report = 1, time.monotonic()
+    try:
+        while True:
+            seq, view = publisher.next_slot()
+            # Decode straight into the shared slot when OpenCV accepts the output buffer
+            ok, frame = cap.read(view)
+            if not ok:
+                if not live:
+                    break
+                logger.warning("Read failed on %s, reconnecting", source)
+                cap.release()
+                time.sleep(reconnect_delay)
+                cap, source = open_capture(sources)
+                continue
+            if frame is not view and frame.shape == view.shape:
+                view[...] = frame
+            elif frame.shape != view.shape:
+                logger.error("Frame size changed to %s, restart the publisher", frame.shape)
+                break
+            publisher.commit(seq)
+            frames += 1
+            now = time.monotonic()
+            if now - last_report >= report_interval:
+                logger.info("Published %d frames (%.1f fps)", frames, frames / (now - last_report))
+                frames, last_report = 0, now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        publisher.close()
+
+
+def main(argv=None):
+    from utils.log import setup_logging
+
+    parser = argparse.ArgumentParser(description="Decode a camera once and share its frames through shared memory.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pub = sub.add_parser("publish", help="decode a source into a shared-memory ring")
+    pub.add_argument("source", nargs="+", help="stream URL, device index or file; later ones are fallbacks")
+    pub.add_argument("--name", default="gitframe", help="shared-memory segment name readers attach to")
+    pub.add_argument("--slots", type=int, default=8, help="ring size; how far a reader may lag before skipping")
+    pub.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+    setup_logging(args.log_level)
+    publish(args.source, args.name, args.slots)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Stable ids for several hands in one camera, and the gesture state kept per hand.
+
+HandIdAssigner matches each frame's hand centroids to the tracks of the
+previous frames, nearest pairs first, so a presenter keeps their id while the
+hand moves. Hands without a match within `max_distance` get the smallest free
+id, or take over the track missing longest once all ids are in use. Tracks
+unseen for `max_missing` frames are dropped and their ids reused. Ids stay
+below `max_ids`, which lets the binary protocol carry them in three bits.
+
+match_hands pairs the hands of two models that saw the same frame, e.g. the
+GestureRecognizer's hands with a separate landmark model's, since neither
+promises to list hands in the same order.
+
+HandStates keeps one gesture gate, point filter and stroke store per id, so
+every presenter has independent gesture events and an independent stroke stream.
+"""
+import copy
+
+import numpy as np
+
+from utils.landmarks import hands_to_array
+
+
+def hand_centroids(hands):
+    """ (N, 2) mean normalized x, y of each hand's landmarks. """
+    return hands_to_array(hands)[:, :, :2].mean(axis=1)
+
+
+def greedy_match(a, b, max_distance):
+    """ Index into `b` for each row of `a` (None when unmatched), pairing nearest points one-to-one. """
+    matches = [None] * len(a)
+    if not len(a) or not len(b):
+        return matches
+    distances = np.linalg.norm(a[:, None] - b[None], axis=2)
+    used = set()
+    # Greedy matching over all pairs, closest first
+    for flat in np.argsort(distances, axis=None):
+        row, col = divmod(int(flat), len(b))
+        if distances[row, col] > max_distance:
+            break
+        if matches[row] is None and col not in used:
+            matches[row] = col
+            used.add(col)
+    return matches
+
+
+def match_hands(hands, reference, max_distance=0.2):
+    """ Index of the hand in `reference` that each of `hands` corresponds to, by landmark centroid. """
+    if hands is reference:
+        return list(range(len(hands)))
+    try:
+        return greedy_match(hand_centroids(hands), hand_centroids(reference), max_distance)
+    except (AttributeError, TypeError, ValueError):
+        return [None] * len(hands)
+
+
+class HandIdAssigner:
+    def __init__(self, max_distance=0.2, max_missing=5, max_ids=8):
+        self.max_distance = max_distance
+        self.max_missing = max_missing
+        self.max_ids = max_ids
+        self.tracks = {}  # id -> [centroid, frames missed]
+        self.counters = {'created': 0, 'expired': 0, 'unassigned': 0}
+
+    def assign(self, centroids):
+        """ Id for each centroid (None if every id is taken), updating the tracks. """
+        centroids = np.asarray(centroids, dtype=np.float32).reshape(-1, 2)
+        track_ids = list(self.tracks)
+        previous = np.array([self.tracks[hand_id][0] for hand_id in track_ids], dtype=np.float32).reshape(-1, 2)
+        ids = [None if col is None else track_ids[col]
+               for col in greedy_match(centroids, previous, self.max_distance)]
+        matched = {hand_id for hand_id in ids if hand_id is not None}
+
+        for hand_id in track_ids:
+            if hand_id not in matched:
+                self.tracks[hand_id][1] += 1
+                if self.tracks[hand_id][1] > self.max_missing:
+                    del self.tracks[hand_id]
+                    self.counters['expired'] += 1
+
+        for row, hand_id in enumerate(ids):
+            if hand_id is None:
+                hand_id = next((i for i in range(self.max_ids) if i not in self.tracks), None)
+                if hand_id is None:
+                    # All ids in use: take over the track that has been missing longest
+                    idle = [i for i in self.tracks if i not in matched]
+                    if not idle:
+                        self.counters['unassigned'] += 1
+                        continue
+                    hand_id = max(idle, key=lambda i: self.tracks[i][1])
+                ids[row] = hand_id
+                matched.add(hand_id)
+                self.counters['created'] += 1
+            self.tracks[hand_id] = [centroids[row], 0]
+        return ids
+
+    def stats(self):
+        snapshot = dict(self.counters)
+        snapshot['active'] = sorted(self.tracks)
+        return snapshot
+
+
+class HandState:
+    __slots__ = ("hand_id", "gesture_gate", "point_filter", "stroke_store")
+
+    def __init__(self, hand_id, gesture_gate, point_filter, stroke_store):
+        self.hand_id = hand_id
+        self.gesture_gate = gesture_gate
+        self.point_filter = point_filter
+        self.stroke_store = stroke_store
+
+
+class HandStates:
+    """
+    Per-hand gate, filter and stroke store. Hand 0 uses the objects passed in,
+    so single-hand setups and their metrics are unchanged; other hands get
+    copies of them as they were before any frame was processed.
+    """
+
+    def __init__(self, gesture_gate, point_filter, stroke_store=None):
+        self.templates = copy.deepcopy((gesture_gate, point_filter, stroke_store))
+        self.states = {0: HandState(0, gesture_gate, point_filter, stroke_store)}
+
+    def get(self, hand_id):
+        state = self.states.get(hand_id)
+        if state is None:
+            state = self.states[hand_id] = HandState(hand_id, *copy.deepcopy(self.templates))
+        return state
+
+    def __iter__(self):
+        return iter(list(self.states.values()))
+
+    def stats(self):
+        return {state.hand_id: {
+            'events': state.gesture_gate.stats(),
+            'strokes': state.stroke_store.stats() if state.stroke_store is not None else {},
+        } for state in self}
@@ -0,0 +1,159 @@
+"""
+Vectorized hand landmark geometry.
+
+Hands are converted once into a (21, 3) float32 array of normalized x, y, z,
+and every predicate is evaluated in one pass over an (N, 21, 3) batch. The
+single-hand methods on GestureReader are thin wrappers around `evaluate`, and
+the same function scores recorded datasets offline:
+
+    python -m utils.landmarks session.npz --width 1280 --height 720 --thresholds 20 30 40 50
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+NUM_LANDMARKS = 21
+
+WRIST = 0
+THUMB_CMC, THUMB_MCP, THUMB_IP, THUMB_TIP = 1, 2, 3, 4
+INDEX_MCP, INDEX_PIP, INDEX_DIP, INDEX_TIP = 5, 6, 7, 8
+MIDDLE_MCP, MIDDLE_PIP, MIDDLE_DIP, MIDDLE_TIP = 9, 10, 11, 12
+RING_MCP, RING_PIP, RING_DIP, RING_TIP = 13, 14, 15, 16
+PINKY_MCP, PINKY_PIP, PINKY_DIP, PINKY_TIP = 17, 18, 19, 20
+
+FINGER_TIPS = np.array([INDEX_TIP, MIDDLE_TIP, RING_TIP, PINKY_TIP])
+FINGER_PIPS = FINGER_TIPS - 2
+FINGER_MCPS = np.array([INDEX_MCP, MIDDLE_MCP, RING_MCP, PINKY_MCP])
+
+
+class ArrayHand:
+    """
+    Hand backed by a (21, 3) array, with `.landmark` objects built only on demand.
+    The one hand type shared by model output, mirrored, tracked and recorded hands.
+    """
+
+    __slots__ = ("array",)
+
+    def __init__(self, array):
+        self.array = array
+
+    @classmethod
+    def from_landmarks(cls, landmarks):
+        """ Hand from a list of landmark objects, e.g. one hand of GestureRecognizer output. """
+        return cls(np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32).reshape(NUM_LANDMARKS, 3))
+
+    @property
+    def landmark(self):
+        return [LandmarkPoint(x, y, z) for x, y, z in self.array.tolist()]
+
+
+class LandmarkPoint:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+
+def landmark_array(hand):
+    """ (21, 3) float32 array for a hand with `.landmark`; array-backed hands are returned as-is. """
+    array = getattr(hand, "array", None)
+    if array is not None:
+        return array
+    return np.array([(lm.x, lm.y, lm.z) for lm in hand.landmark], dtype=np.float32).reshape(NUM_LANDMARKS, 3)
+
+
+def hands_to_array(hands):
+    """ Stack hands into one (N, 21, 3) array. """
+    if not hands:
+        return np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+    return np.stack([landmark_array(hand) for hand in hands])
+
+
+def evaluate(landmarks, w, h, pinch_threshold=40.0, thumb_spread=40.0):
+    """
+    Score every predicate for a (21, 3) or (N, 21, 3) array at once.
+
+    Pixel measurements use truncated integer pixel coordinates like the
+    per-landmark code did, so existing thresholds keep their meaning. Returns a
+    dict of arrays with a leading N axis:
+
+        pinch_distance, fingers_joined, join_point    index/middle tip distance, index tip
+        open_palm, palm_point                         all fingers up, thumb spread, middle tip
+        thumbs_up, thumbs_down, thumb_point           fingers curled, thumb up/down, thumb tip
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    if landmarks.ndim == 2:
+        landmarks = landmarks[None]
+    y = landmarks[..., 1]
+    pixels = (landmarks[..., :2] * np.array([w, h], dtype=np.float32)).astype(np.int32)
+
+    pinch = pixels[:, INDEX_TIP] - pixels[:, MIDDLE_TIP]
+    pinch_distance = np.hypot(pinch[:, 0], pinch[:, 1])
+
+    fingers_up = (pixels[:, FINGER_TIPS, 1] < pixels[:, FINGER_MCPS, 1]).all(axis=1)
+    thumb_out = np.abs(pixels[:, THUMB_TIP, 0] - pixels[:, INDEX_TIP, 0]) > thumb_spread
+
+    fingers_curled = (y[:, FINGER_TIPS] >= y[:, FINGER_PIPS]).all(axis=1)
+    thumb_tip, thumb_ip, wrist = y[:, THUMB_TIP], y[:, THUMB_IP], y[:, WRIST]
+
+    return {
+        'pinch_distance': pinch_distance,
+        'fingers_joined': pinch_distance < pinch_threshold,
+        'join_point': pixels[:, INDEX_TIP],
+        'open_palm': fingers_up & thumb_out,
+        'palm_point': pixels[:, MIDDLE_TIP],
+        'thumbs_up': fingers_curled & (thumb_tip < thumb_ip) & (thumb_tip < wrist),
+        'thumbs_down': fingers_curled & (thumb_tip > thumb_ip) & (thumb_tip > wrist),
+        'thumb_point': pixels[:, THUMB_TIP],
+    }
+
+
+def sweep_pinch_threshold(landmarks, w, h, thresholds, labels=None):
+    """
+    Fraction of frames classified as "draw" for each pinch threshold; with boolean
+    `labels` (True = draw) also precision and recall.
+    """
+    distances = evaluate(landmarks, w, h)['pinch_distance']
+    rows = []
+    for threshold in thresholds:
+        predicted = distances < threshold
+        row = {'threshold': float(threshold), 'draw_rate': float(predicted.mean()) if predicted.size else 0.0}
+        if labels is not None:
+            labels = np.asarray(labels, dtype=bool)
+            true_positive = int((predicted & labels).sum())
+            row['precision'] = true_positive / max(int(predicted.sum()), 1)
+            row['recall'] = true_positive / max(int(labels.sum()), 1)
+        rows.append(row)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-score landmark predicates over a recorded dataset.")
+    parser.add_argument("path", help="recording directory, or .npz with a 'landmarks' (N, 21, 3) array "
+                                     "and optional boolean 'labels'")
+    parser.add_argument("--width", type=int, required=True, help="pixel width the landmarks are normalized to")
+    parser.add_argument("--height", type=int, required=True)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[20, 30, 40, 50, 60])
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.path):
+        from utils.recording import LandmarkRecording
+        landmarks, labels = LandmarkRecording(args.path).landmarks(), None
+    else:
+        with np.load(args.path) as data:
+            landmarks = data["landmarks"]
+            labels = data["labels"] if "labels" in data else None
+    results = evaluate(landmarks, args.width, args.height)
+    report = {
+        'hands': int(len(landmarks)),
+        'rates': {name: float(results[name].mean()) if len(landmarks) else 0.0
+                  for name in ('fingers_joined', 'open_palm', 'thumbs_up', 'thumbs_down')},
+        'pinch_sweep': sweep_pinch_threshold(landmarks, args.width, args.height, args.thresholds, labels),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import logging
+import threading
+import time
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets each message template through at most `rate` times per `period` seconds.
+
+    Hot-path messages such as per-point debug lines are keyed on their format
+    string, so different coordinates still count as the same message.
+    """
+
+    def __init__(self, rate=5, period=1.0):
+        super().__init__()
+        self.rate = rate
+        self.period = period
+        self.windows = {}
+        self.suppressed = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            start, count = self.windows.get(key, (now, 0))
+            if now - start >= self.period:
+                skipped = self.suppressed.pop(key, 0)
+                if skipped:
+                    record.msg = f"{record.msg} ({skipped} similar suppressed)"
+                self.windows[key] = (now, 1)
+                return True
+            if count < self.rate:
+                self.windows[key] = (start, count + 1)
+                return True
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return False
+
+
+def setup_logging(level="INFO", rate=5, period=1.0):
+    """ Configure root logging with a rate-limited console handler. """
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handler.addFilter(RateLimitFilter(rate, period))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
@@ -0,0 +1,277 @@
+"""
+Staged execution: threads connected by bounded queues.
+
+Each Stage pulls from its input queue, applies its function and pushes the
+result (unless None) to its output queue. A full queue either blocks the
+producer or drops an item, depending on its policy, so one slow stage cannot
+stall capture. ParallelStage runs its function in a process pool and emits
+results in submission order.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DROP_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+class QueueClosed(Exception):
+    pass
+
+
+class BoundedQueue:
+    """
+    FIFO with a fixed capacity and a policy for when it is full:
+
+        block        wait for space (backpressure to the producer)
+        drop_oldest  evict the oldest item, keeping the freshest frames
+        drop_newest  discard the incoming item
+    """
+
+    def __init__(self, name, maxsize=4, policy="drop_oldest"):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {policy!r}, expected one of {DROP_POLICIES}")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.counters = {'put': 0, 'got': 0, 'dropped': 0, 'max_depth': 0}
+        self.depth_sum = 0  # sum of depths seen at each put, for mean occupancy
+
+    def put(self, item):
+        with self.cond:
+            if self.closed:
+                raise QueueClosed(self.name)
+            if len(self.items) >= self.maxsize:
+                if self.policy == "block":
+                    while len(self.items) >= self.maxsize and not self.closed:
+                        self.cond.wait()
+                    if self.closed:
+                        raise QueueClosed(self.name)
+                elif self.policy == "drop_oldest":
+                    self.items.popleft()
+                    self.counters['dropped'] += 1
+                else:
+                    self.counters['dropped'] += 1
+                    return False
+            self.items.append(item)
+            self.counters['put'] += 1
+            self.depth_sum += len(self.items)
+            self.counters['max_depth'] = max(self.counters['max_depth'], len(self.items))
+            self.cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """ Next item; raises QueueClosed once closed and drained, TimeoutError on timeout. """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.items or self.closed, timeout):
+                raise TimeoutError(self.name)
+            if not self.items:
+                raise QueueClosed(self.name)
+            item = self.items.popleft()
+            self.counters['got'] += 1
+            self.cond.notify_all()
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            snapshot = dict(self.counters)
+            snapshot['depth'] = len(self.items)
+            snapshot['capacity'] = self.maxsize
+            snapshot['policy'] = self.policy
+            puts = self.counters['put']
+            snapshot['occupancy'] = self.depth_sum / (puts * self.maxsize) if puts else 0.0
+        return snapshot
+
+
+class Stage:
+    """ Runs `fn(item)` on `workers` threads between two queues. `outq` may be None for a sink. """
+
+    def __init__(self, name, fn, inq, outq=None, workers=1):
+        self.name = name
+        self.fn = fn
+        self.inq = inq
+        self.outq = outq
+        self.threads = [threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+        self.lock = threading.Lock()
+        self.counters = {'processed': 0, 'errors': 0}
+        self.busy = 0.0
+        self.started_at = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                item = self.inq.get()
+            except QueueClosed:
+                break
+            start = time.perf_counter()
+            try:
+                result = self.fn(item)
+            except Exception:
+                logger.exception("Stage %s failed on an item", self.name)
+                with self.lock:
+                    self.counters['errors'] += 1
+                continue
+            finally:
+                with self.lock:
+                    self.busy += time.perf_counter() - start
+            with self.lock:
+                self.counters['processed'] += 1
+            if result is not None and self.outq is not None:
+                try:
+                    self.outq.put(result)
+                except QueueClosed:
+                    break
+
+    def join(self, timeout=None):
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def stats(self):
+        with self.lock:
+            snapshot = dict(self.counters)
+            elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+            # Fraction of wall time the stage's threads spent working
+            snapshot['utilization'] = self.busy / (elapsed * len(self.threads)) if elapsed else 0.0
+        return snapshot
+
+
+class ParallelStage:
+    """
+    Runs `fn(*args)` in a process pool with at most `max_pending` tasks in flight.
+
+    `prepare(item)` returns (context, args): the args are sent to a worker and
+    `finish(context, result)` builds the output item in the parent. Results are
+    collected strictly in submission order, so downstream stages see frames in
+    sequence even though workers finish out of order.
+    """
+
+    def __init__(self, name, fn, prepare, finish, inq, outq, workers=2, max_pending=None,
+                 initializer=None, initargs=()):
+        self.name = name
+        self.fn = fn
+        self.prepare = prepare
+        self.finish = finish
+        self.inq = inq
+        self.outq = outq
+        self.workers = workers
+        self.max_pending = max_pending or workers * 2
+        # Spawned rather than forked: the parent already runs capture and sender threads
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=initializer, initargs=initargs)
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.done = False
+        self.counters = {'submitted': 0, 'processed': 0, 'errors': 0, 'max_pending': 0}
+        self.threads = [threading.Thread(target=self._submit_loop, name=f"{name}-submit", daemon=True),
+                        threading.Thread(target=self._collect_loop, name=f"{name}-collect", daemon=True)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def _submit_loop(self):
+        while True:
+            try:
+                item = self.inq.get()
+            except QueueClosed:
+                break
+            context, args = self.prepare(item)
+            with self.cond:
+                self.cond.wait_for(lambda: len(self.pending) < self.max_pending)
+                try:
+                    future = self.executor.submit(self.fn, *args)
+                except Exception as e:
+                    # e.g. a broken pool after a worker crashed; keep draining so shutdown still works
+                    logger.error("Stage %s could not submit: %s", self.name, e)
+                    self.counters['errors'] += 1
+                    continue
+                self.pending.append((context, future))
+                self.counters['submitted'] += 1
+                self.counters['max_pending'] = max(self.counters['max_pending'], len(self.pending))
+                self.cond.notify_all()
+        with self.cond:
+            self.done = True
+            self.cond.notify_all()
+
+    def _collect_loop(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending or self.done)
+                if not self.pending:
+                    break
+                context, future = self.pending[0]
+            # Wait outside the lock so the submitter can keep the pool busy
+            try:
+                result = future.result()
+            except Exception:
+                logger.exception("Stage %s worker failed", self.name)
+                result = None
+            with self.cond:
+                self.pending.popleft()
+                self.counters['processed' if result is not None else 'errors'] += 1
+                self.cond.notify_all()
+            if result is None:
+                continue
+            try:
+                self.outq.put(self.finish(context, result))
+            except QueueClosed:
+                break
+
+    def join(self, timeout=None):
+        for thread in self.threads:
+            thread.join(timeout)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self.cond:
+            snapshot = dict(self.counters)
+            snapshot['pending'] = len(self.pending)
+            snapshot['workers'] = self.workers
+        return snapshot
+
+
+class Pipeline:
+    """
+    Owns the queues and stages of one pipeline so they can be started, stopped
+    and reported together. `queues[i]` is the input queue of `stages[i]`.
+    """
+
+    def __init__(self, queues, stages):
+        self.queues = queues
+        self.stages = stages
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        """ Close each stage's input queue in order, letting it drain before closing the next one. """
+        for queue, stage in zip(self.queues, self.stages):
+            queue.close()
+            stage.join(timeout)
+
+    def stats(self):
+        return {
+            'queues': {queue.name: queue.stats() for queue in self.queues},
+            'stages': {stage.name: stage.stats() for stage in self.stages},
+        }
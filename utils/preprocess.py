@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+
+from utils.landmarks import ArrayHand, landmark_array
+
+
+def mirror_hands(hands):
+    """ Mirror normalized landmarks horizontally (x -> 1 - x) instead of flipping the image. """
+    mirrored = []
+    for hand in hands:
+        array = landmark_array(hand).copy()
+        array[:, 0] = 1.0 - array[:, 0]
+        mirrored.append(ArrayHand(array))
+    return mirrored
+
+
+class FramePreprocessor:
+    """
+    Crops, optionally downscales and color-converts frames into reused buffers.
+
+    By default the image is never flipped: the ROI is cropped from the mirrored
+    position in the raw frame and landmarks are mirrored back afterwards with
+    `mirror_hands`. `flip_pixels=True` keeps the old cv2.flip behaviour (still
+    into a preallocated buffer) for comparison.
+    """
+
+    def __init__(self, inference_width=None, flip_pixels=False):
+        self.inference_width = inference_width
+        self.flip_pixels = flip_pixels
+        self.flip_buffer = None
+        self.resize_buffer = None
+        self.rgb = None
+
+    @property
+    def mirrors_coordinates(self):
+        return not self.flip_pixels
+
+    @staticmethod
+    def _buffer(buffer, shape, dtype=np.uint8):
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=dtype)
+        return buffer
+
+    def crop(self, frame, rect):
+        """ Return the inference image for `rect`, given as (x, y, w, h) in mirrored-frame pixels. """
+        frame_w = frame.shape[1]
+        x0, y0, w, h = rect
+        if self.flip_pixels:
+            self.flip_buffer = self._buffer(self.flip_buffer, frame.shape)
+            frame = cv2.flip(frame, 1, dst=self.flip_buffer)
+        else:
+            x0 = frame_w - x0 - w
+        cropped = frame[y0:y0 + h, x0:x0 + w]
+
+        if self.inference_width and w > self.inference_width:
+            size = (self.inference_width, max(1, int(h * self.inference_width / w)))
+            self.resize_buffer = self._buffer(self.resize_buffer, (size[1], size[0]) + frame.shape[2:])
+            cropped = cv2.resize(cropped, size, dst=self.resize_buffer, interpolation=cv2.INTER_AREA)
+        return cropped
+
+    def to_rgb(self, bgr, reuse=True):
+        """
+        Single BGR->RGB conversion into the shared buffer that every model reads from.
+        `reuse=False` returns a fresh array instead, for handing to another pipeline stage.
+        """
+        if not reuse:
+            return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        self.rgb = self._buffer(self.rgb, bgr.shape)
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        return self.rgb
+
+    def to_frame_hands(self, hands):
+        """ Bring model landmarks into mirrored-frame orientation. """
+        return mirror_hands(hands) if self.mirrors_coordinates else hands
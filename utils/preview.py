@@ -0,0 +1,178 @@
+"""
+Operator preview over HTTP as a throttled MJPEG stream.
+
+The processing loop only calls `submit(frame, overlay)`. That is a no-op while
+nobody is watching, and it keeps at most one frame per `1 / max_fps` seconds
+otherwise. Overlay drawing, downscaling and JPEG encoding run on the preview
+thread, so the loop needs no display and no GUI calls:
+
+    http://host:port/              page with the live stream
+    http://host:port/stream.mjpg   multipart/x-mixed-replace JPEG stream
+    http://host:port/snapshot.jpg  latest frame
+    http://host:port/<command>     runs a registered command, e.g. /clear
+"""
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+BOUNDARY = "previewframe"
+PAGE = b"<html><body style='margin:0;background:#000'><img src='/stream.mjpg' style='width:100%'></body></html>"
+
+
+class PreviewServer:
+    """
+    `render(frame, overlay)` draws onto a private copy of the frame on the preview
+    thread; `commands` maps URL names to callables run from the HTTP thread.
+    """
+
+    def __init__(self, port, host="127.0.0.1", render=None, max_fps=10.0, width=640, quality=70, commands=None):
+        self.render = render
+        self.interval = 1.0 / max_fps
+        self.width = width
+        self.quality = quality
+        self.commands = commands or {}
+        self.cond = threading.Condition()
+        self.pending = None  # (frame, overlay) waiting to be encoded
+        self.jpeg = None
+        self.seq = 0
+        self.clients = 0
+        self.last_submit = 0.0
+        self.running = True
+        self.counters = {'submitted': 0, 'encoded': 0, 'encode_s': 0.0}
+
+        preview = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0].strip("/")
+                if path == "":
+                    self._send(PAGE, "text/html")
+                elif path == "stream.mjpg":
+                    preview._stream(self)
+                elif path == "snapshot.jpg":
+                    jpeg = preview.snapshot()
+                    if jpeg is None:
+                        self.send_error(503, "No frame yet")
+                    else:
+                        self._send(jpeg, "image/jpeg")
+                elif path in preview.commands:
+                    preview.commands[path]()
+                    self._send(b"ok\n", "text/plain")
+                else:
+                    self.send_error(404)
+
+            def _send(self, body, content_type):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.threads = [threading.Thread(target=self.server.serve_forever, name="preview-http", daemon=True),
+                        threading.Thread(target=self._encode_loop, name="preview-encode", daemon=True)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        logger.info("Preview available at http://%s:%d/", *self.server.server_address[:2])
+        return self
+
+    @property
+    def active(self):
+        return self.clients > 0
+
+    def submit(self, frame, overlay=None):
+        """ Offer a frame from the processing loop; cheap when nobody watches or the rate cap applies. """
+        if not self.clients:
+            return False
+        now = time.monotonic()
+        if now - self.last_submit < self.interval:
+            return False
+        self.last_submit = now
+        # The loop may reuse or overwrite its buffer, so keep a copy for the preview thread
+        with self.cond:
+            self.pending = (frame.copy(), overlay)
+            self.counters['submitted'] += 1
+            self.cond.notify_all()
+        return True
+
+    def snapshot(self):
+        with self.cond:
+            return self.jpeg
+
+    def _encode_loop(self):
+        while self.running:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending is not None or not self.running)
+                if not self.running:
+                    break
+                frame, overlay = self.pending
+                self.pending = None
+            start = time.perf_counter()
+            try:
+                if self.render is not None:
+                    self.render(frame, overlay)
+                if self.width and frame.shape[1] > self.width:
+                    height = int(frame.shape[0] * self.width / frame.shape[1])
+                    frame = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+                ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            except Exception:
+                logger.exception("Preview render failed")
+                continue
+            if not ok:
+                continue
+            with self.cond:
+                self.jpeg = encoded.tobytes()
+                self.seq += 1
+                self.counters['encoded'] += 1
+                self.counters['encode_s'] += time.perf_counter() - start
+                self.cond.notify_all()
+
+    def _stream(self, handler):
+        handler.send_response(200)
+        handler.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.end_headers()
+        with self.cond:
+            self.clients += 1
+        seen = -1
+        try:
+            while self.running:
+                with self.cond:
+                    if not self.cond.wait_for(lambda: self.seq != seen or not self.running, timeout=5.0):
+                        continue
+                    jpeg, seen = self.jpeg, self.seq
+                if jpeg is None:
+                    continue
+                handler.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                    f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                handler.wfile.write(jpeg)
+                handler.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self.cond:
+                self.clients -= 1
+
+    def stats(self):
+        with self.cond:
+            snapshot = dict(self.counters)
+            snapshot['clients'] = self.clients
+        return snapshot
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
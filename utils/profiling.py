@@ -0,0 +1,162 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class NullProfiler:
+    """ Profiler that records nothing, used when timing is switched off. """
+
+    _context = nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+    def record(self, name, seconds):
+        pass
+
+    def summary(self):
+        return {}
+
+
+def summarize(values):
+    """ Count, mean and p50/p90/p99/max in milliseconds for a list of durations in seconds. """
+    ms = np.asarray(values) * 1000.0
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        'count': int(ms.size),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(p50),
+        'p90_ms': float(p90),
+        'p99_ms': float(p99),
+        'max_ms': float(ms.max()),
+    }
+
+
+class StageProfiler:
+    """ Records wall-clock durations per named pipeline stage. """
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.samples[name].append(seconds)
+
+    def summary(self):
+        """ Per-stage count, mean and p50/p90/p99/max latency in milliseconds. """
+        return {name: summarize(values) for name, values in self.samples.items() if values}
+
+
+class RollingProfiler:
+    """
+    Keeps the last `window` durations per stage for long-running processes.
+
+    Safe to record from the capture, callback and sender threads at once.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.totals = defaultdict(int)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self.lock:
+            self.samples[name].append(seconds)
+            self.totals[name] += 1
+
+    def summary(self):
+        with self.lock:
+            snapshot = {name: (list(values), self.totals[name]) for name, values in self.samples.items()}
+        result = {}
+        for name, (values, total) in snapshot.items():
+            if values:
+                result[name] = summarize(values)
+                result[name]['total'] = total
+        return result
+
+
+def format_stats_line(summary):
+    """ Compact one-line rendering of a profiler summary: stage=p50/p99 ms. """
+    return " ".join(f"{name}={s['p50_ms']:.1f}/{s['p99_ms']:.1f}ms" for name, s in sorted(summary.items()))
+
+
+class StatsReporter:
+    """ Logs a stats line from `collect()` every `interval` seconds on a daemon thread. """
+
+    def __init__(self, collect, interval=5.0):
+        self.collect = collect
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="stats", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            metrics = self.collect()
+            logger.info("fps=%.1f %s sender=%s", metrics.get('fps', 0.0),
+                        format_stats_line(metrics.get('stages', {})), metrics.get('sender', {}))
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class MetricsServer:
+    """ Serves `collect()` as JSON at http://host:port/metrics on a daemon thread. """
+
+    def __init__(self, collect, port, host="127.0.0.1"):
+        collect_fn = collect
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = json.dumps(collect_fn()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        logger.info("Metrics available at http://%s:%d/metrics", *self.server.server_address[:2])
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,138 @@
+import struct
+import time
+
+# Binary point-stream protocol (version 2).
+#
+# Every frame starts with:   b"GF" | u8 version | u8 frame type | u8 len(to) | to
+# so the relay can route it without decoding the rest.
+#
+# Session header (type 0):   u8 len(from) | from | u16 xdim | u16 ydim
+# Point batch    (type 1):   u32 base_ts_ms | u16 count | count * (u16 dt_ms, u16 x, u16 y, u8 hand << 5 | gesture)
+#
+# x and y are normalized board coordinates quantized to 0..65535. The top three bits of the
+# gesture byte carry the presenter's hand id, so hand 0 encodes exactly as before. All
+# integers are little-endian.
+
+MAGIC = b"GF"
+PROTOCOL_JSON = 1
+PROTOCOL_BINARY = 2
+
+FRAME_HEADER = 0
+FRAME_POINTS = 1
+
+QUANT_MAX = 0xFFFF
+HAND_SHIFT = 5
+GESTURE_MASK = (1 << HAND_SHIFT) - 1
+MAX_HAND_IDS = 1 << (8 - HAND_SHIFT)
+POINT = struct.Struct("<HHHB")
+BATCH = struct.Struct("<IH")
+DIMS = struct.Struct("<HH")
+
+# Control messages used to negotiate the protocol over the JSON channel
+HELLO = "protocol_hello"
+ACK = "protocol_ack"
+
+GESTURE_CODES = {
+    "draw": 1,
+    "laser": 2,
+    "erase": 3,
+    "next": 4,
+    "previous": 5,
+    "Thumb_Up": 16,
+    "Thumb_Down": 17,
+    "Open_Palm": 18,
+    "Closed_Fist": 19,
+    "ILoveYou": 20,
+    "Pointing_Up": 21,
+    "Victory": 22,
+}
+GESTURE_NAMES = {code: name for name, code in GESTURE_CODES.items()}
+
+
+def quantize(value):
+    """ Clamp a normalized coordinate to [0, 1] and scale it to u16. """
+    return int(round(min(max(value, 0.0), 1.0) * QUANT_MAX))
+
+
+def _prefix(frame_type, to_id):
+    to_bytes = to_id.encode()
+    return MAGIC + bytes([PROTOCOL_BINARY, frame_type, len(to_bytes)]) + to_bytes
+
+
+def encode_session_header(from_id, to_id, xdim, ydim):
+    from_bytes = from_id.encode()
+    return (_prefix(FRAME_HEADER, to_id) + bytes([len(from_bytes)]) + from_bytes
+            + DIMS.pack(min(int(xdim), QUANT_MAX), min(int(ydim), QUANT_MAX)))
+
+
+def encode_points(to_id, base_ts_ms, points):
+    """ Encode [(ts_ms, x_norm, y_norm, gesture[, hand]), ...] into a single batch frame. """
+    body = bytearray(_prefix(FRAME_POINTS, to_id))
+    body += BATCH.pack(base_ts_ms & 0xFFFFFFFF, len(points))
+    for ts_ms, x_norm, y_norm, gesture, *hand in points:
+        dt = min(max(ts_ms - base_ts_ms, 0), QUANT_MAX)
+        code = GESTURE_CODES.get(gesture, 0) | (hand[0] % MAX_HAND_IDS if hand else 0) << HAND_SHIFT
+        body += POINT.pack(dt, quantize(x_norm), quantize(y_norm), code)
+    return bytes(body)
+
+
+def decode_frame(data):
+    """ Decode a binary frame into a dict. Mostly useful for tests and offline tools. """
+    if data[:2] != MAGIC:
+        raise ValueError("not a gitfarm binary frame")
+    version, frame_type, to_len = data[2], data[3], data[4]
+    offset = 5 + to_len
+    frame = {"version": version, "type": frame_type, "to": data[5:offset].decode()}
+
+    if frame_type == FRAME_HEADER:
+        from_len = data[offset]
+        frame["from"] = data[offset + 1:offset + 1 + from_len].decode()
+        frame["xdim"], frame["ydim"] = DIMS.unpack_from(data, offset + 1 + from_len)
+    elif frame_type == FRAME_POINTS:
+        base_ts, count = BATCH.unpack_from(data, offset)
+        offset += BATCH.size
+        points = []
+        for i in range(count):
+            dt, qx, qy, code = POINT.unpack_from(data, offset + i * POINT.size)
+            points.append((base_ts + dt, qx / QUANT_MAX, qy / QUANT_MAX,
+                           GESTURE_NAMES.get(code & GESTURE_MASK, "unknown"), code >> HAND_SHIFT))
+        frame["base_ts"] = base_ts
+        frame["points"] = points
+    else:
+        raise ValueError(f"unknown frame type {frame_type}")
+    return frame
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+class PointBatcher:
+    """ Accumulates points and emits a batch frame once it is full or old enough. """
+
+    def __init__(self, to_id, max_points=32, max_delay=0.05):
+        self.to_id = to_id
+        self.max_points = max_points
+        self.max_delay = max_delay
+        self.points = []
+        self.first_at = None
+
+    def add(self, x_norm, y_norm, gesture, hand=0):
+        """ Add a point; returns an encoded frame if the size threshold was reached. """
+        if not self.points:
+            self.first_at = time.monotonic()
+        self.points.append((now_ms(), x_norm, y_norm, gesture, hand))
+        if len(self.points) >= self.max_points:
+            return self.flush()
+        return None
+
+    def due(self):
+        return bool(self.points) and time.monotonic() - self.first_at >= self.max_delay
+
+    def flush(self):
+        if not self.points:
+            return None
+        frame = encode_points(self.to_id, self.points[0][0], self.points)
+        self.points = []
+        self.first_at = None
+        return frame
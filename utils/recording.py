@@ -0,0 +1,226 @@
+"""
+Columnar on-disk recording of what the gesture logic saw, frame by frame.
+
+A recording is a directory with a manifest and fixed-size chunks. Every chunk
+holds one .npy file per column, so it can be memory-mapped and sliced without
+parsing:
+
+    session/
+      manifest.json                frame shape, board corners, gesture labels, chunk list
+      chunk-000000/t.npy           per-frame columns (see FRAME_COLUMNS)
+      chunk-000000/landmarks.npy   per-hand columns (see HAND_COLUMNS)
+      ...
+
+The manifest is rewritten after every chunk, so a crashed session is readable
+up to its last full chunk.
+
+    python -m utils.recording session/
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from utils.board import BoardCalibration
+from utils.landmarks import NUM_LANDMARKS, landmark_array
+
+FORMAT_VERSION = 1
+
+# name -> (dtype, per-row shape)
+FRAME_COLUMNS = {
+    't': (np.float64, ()),              # capture time in seconds (time.monotonic)
+    'timestamp_ms': (np.int64, ()),     # recognizer timestamp of the result in use
+    'gesture': (np.int16, ()),          # index into the manifest labels, -1 for none
+    'score': (np.float32, ()),
+    'roi': (np.int32, (4,)),            # x, y, w, h the landmarks are normalized to
+    'hand_offset': (np.int64, ()),      # first row of this frame in the chunk's hand columns
+    'hand_count': (np.uint8, ()),
+}
+HAND_COLUMNS = {
+    'landmarks': (np.float32, (NUM_LANDMARKS, 3)),  # normalized x, y, z in mirrored-frame orientation
+    'handedness': (np.int8, ()),                    # 0 left, 1 right, -1 unknown
+    'hand_score': (np.float32, ()),
+    'hand_gesture': (np.int16, ()),                 # this hand's own gesture label, -1 for none
+    'hand_gesture_score': (np.float32, ()),
+}
+HANDEDNESS = {"Left": 0, "Right": 1}
+HANDEDNESS_NAMES = {code: name for name, code in HANDEDNESS.items()}
+
+
+class RecordedFrame:
+    __slots__ = ("t", "timestamp_ms", "gesture", "score", "roi", "landmarks", "handedness", "hand_scores",
+                 "hand_gestures")
+
+    def __init__(self, t, timestamp_ms, gesture, score, roi, landmarks, handedness, hand_scores, hand_gestures):
+        self.t = t
+        self.timestamp_ms = timestamp_ms
+        self.gesture = gesture
+        self.score = score
+        self.roi = roi
+        self.landmarks = landmarks
+        self.handedness = handedness
+        self.hand_scores = hand_scores
+        self.hand_gestures = hand_gestures
+
+
+class LandmarkRecorder:
+    """ Buffers frames in memory and writes them out every `chunk_frames` frames. """
+
+    def __init__(self, path, frame_shape, corners=None, chunk_frames=1024):
+        self.path = path
+        self.chunk_frames = chunk_frames
+        os.makedirs(path, exist_ok=True)
+        self.manifest = {
+            'version': FORMAT_VERSION,
+            'frame_shape': [int(frame_shape[0]), int(frame_shape[1])],
+            'corners': np.asarray(corners).tolist() if corners is not None else None,
+            'labels': [],
+            'chunks': [],
+        }
+        self.label_codes = {}
+        self._reset()
+
+    def _reset(self):
+        self.frames = {name: [] for name in FRAME_COLUMNS}
+        self.hands = {name: [] for name in HAND_COLUMNS}
+
+    def _label(self, gesture):
+        if not gesture:
+            return -1
+        if gesture not in self.label_codes:
+            self.label_codes[gesture] = len(self.manifest['labels'])
+            self.manifest['labels'].append(gesture)
+        return self.label_codes[gesture]
+
+    def add(self, t, timestamp_ms, gesture, score, roi, hands, handedness=(), hand_gestures=()):
+        """ Append one frame; `handedness` and `hand_gestures` are optional (label, score) pairs per hand. """
+        self.frames['t'].append(t)
+        self.frames['timestamp_ms'].append(timestamp_ms)
+        self.frames['gesture'].append(self._label(gesture))
+        self.frames['score'].append(score)
+        self.frames['roi'].append(roi if roi is not None else (0, 0, 0, 0))
+        self.frames['hand_offset'].append(len(self.hands['landmarks']))
+        self.frames['hand_count'].append(len(hands))
+        for index, hand in enumerate(hands):
+            label, hand_score = handedness[index] if index < len(handedness) else (None, 0.0)
+            self.hands['landmarks'].append(landmark_array(hand))
+            self.hands['handedness'].append(HANDEDNESS.get(label, -1))
+            self.hands['hand_score'].append(hand_score)
+            hand_gesture, hand_gesture_score = hand_gestures[index] if index < len(hand_gestures) else (None, 0.0)
+            self.hands['hand_gesture'].append(self._label(hand_gesture))
+            self.hands['hand_gesture_score'].append(hand_gesture_score)
+        if len(self.frames['t']) >= self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        """ Write buffered frames as a new chunk and update the manifest. """
+        count = len(self.frames['t'])
+        if not count:
+            return
+        name = f"chunk-{len(self.manifest['chunks']):06d}"
+        directory = os.path.join(self.path, name)
+        os.makedirs(directory, exist_ok=True)
+        for columns, spec in ((self.frames, FRAME_COLUMNS), (self.hands, HAND_COLUMNS)):
+            for column, (dtype, shape) in spec.items():
+                values = np.asarray(columns[column], dtype=dtype).reshape((-1,) + shape)
+                np.save(os.path.join(directory, column + ".npy"), values)
+        self.manifest['chunks'].append({'name': name, 'frames': count, 'hands': len(self.hands['landmarks'])})
+        self._write_manifest()
+        self._reset()
+
+    def _write_manifest(self):
+        target = os.path.join(self.path, "manifest.json")
+        with open(target + ".tmp", "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(target + ".tmp", target)
+
+    def close(self):
+        self.flush()
+        self._write_manifest()
+
+    def stats(self):
+        chunks = self.manifest['chunks']
+        return {'frames': sum(chunk['frames'] for chunk in chunks) + len(self.frames['t']),
+                'chunks': len(chunks)}
+
+
+class LandmarkRecording:
+    """ Read side of a recording; every column is memory-mapped, nothing is loaded up front. """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording version {self.manifest.get('version')}")
+        self.labels = self.manifest['labels']
+        self.frame_shape = tuple(self.manifest['frame_shape'])
+        self.chunks = [self._open_chunk(chunk['name']) for chunk in self.manifest['chunks']]
+
+    def _open_chunk(self, name):
+        directory = os.path.join(self.path, name)
+        return {column: np.load(os.path.join(directory, column + ".npy"), mmap_mode="r")
+                for column in list(FRAME_COLUMNS) + list(HAND_COLUMNS)}
+
+    def __len__(self):
+        return sum(chunk['frames'] for chunk in self.manifest['chunks'])
+
+    def board(self):
+        """ The calibration the session was recorded with, if any. """
+        corners = self.manifest.get('corners')
+        return BoardCalibration(corners, self.frame_shape) if corners is not None else None
+
+    def column(self, name):
+        """ One column across all chunks (copied into memory). """
+        parts = [chunk[name] for chunk in self.chunks]
+        if not parts:
+            dtype, shape = {**FRAME_COLUMNS, **HAND_COLUMNS}[name]
+            return np.zeros((0,) + shape, dtype=dtype)
+        return np.concatenate(parts)
+
+    def landmarks(self):
+        """ Every recorded hand as one (N, 21, 3) array, for batch scoring with utils.landmarks. """
+        return self.column('landmarks')
+
+    def frames(self):
+        """ Yield frames in order, with landmark views straight out of the memory map. """
+        def label(code):
+            return self.labels[code] if code >= 0 else None
+
+        for chunk in self.chunks:
+            gestures = chunk['gesture']
+            for i in range(len(chunk['t'])):
+                start = int(chunk['hand_offset'][i])
+                end = start + int(chunk['hand_count'][i])
+                gesture, score = label(int(gestures[i])), float(chunk['score'][i])
+                hand_gestures = [(label(int(code)), float(hand_score)) for code, hand_score in
+                                 zip(chunk['hand_gesture'][start:end], chunk['hand_gesture_score'][start:end])]
+                yield RecordedFrame(
+                    float(chunk['t'][i]), int(chunk['timestamp_ms'][i]), gesture, score,
+                    tuple(int(v) for v in chunk['roi'][i]), chunk['landmarks'][start:end],
+                    [HANDEDNESS_NAMES.get(int(code), None) for code in chunk['handedness'][start:end]],
+                    chunk['hand_score'][start:end], hand_gestures)
+
+    def summary(self):
+        t = self.column('t')
+        gestures = self.column('gesture')
+        return {
+            'frames': len(self),
+            'hands': int(self.column('hand_count').sum()) if len(self) else 0,
+            'chunks': len(self.chunks),
+            'duration_s': float(t[-1] - t[0]) if len(t) else 0.0,
+            'frame_shape': list(self.frame_shape),
+            'gestures': {label: int((gestures == code).sum()) for code, label in enumerate(self.labels)},
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a landmark recording.")
+    parser.add_argument("path", help="recording directory")
+    args = parser.parse_args(argv)
+    print(json.dumps(LandmarkRecording(args.path).summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
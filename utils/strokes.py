@@ -0,0 +1,151 @@
+"""
+Vector stroke model for drawn points.
+
+Consecutive "draw" points in normalized board space are grouped into
+timestamped polylines, simplified with Ramer-Douglas-Peucker when they finish,
+and can be saved to a compact .npz and re-rendered at any resolution.
+"""
+import cv2
+import numpy as np
+
+QUANT_MAX = 0xFFFF
+
+
+def rdp(points, epsilon):
+    """
+    Ramer-Douglas-Peucker simplification of an (N, D) array; only the first two
+    columns (x, y) are used for distances. Returns the kept rows.
+    """
+    points = np.asarray(points)
+    if len(points) < 3:
+        return points
+    xy = points[:, :2].astype(np.float64)
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = xy[end] - xy[start]
+        rel = xy[start + 1:end] - xy[start]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            distances = np.abs(segment[0] * rel[:, 1] - segment[1] * rel[:, 0]) / length
+        index = int(np.argmax(distances))
+        if distances[index] > epsilon:
+            split = start + 1 + index
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return points[keep]
+
+
+class Stroke:
+    """ One polyline; `points` is an (N, 3) array of t (seconds), x, y in board space. """
+
+    __slots__ = ("points", "raw_count")
+
+    def __init__(self, points, raw_count=None):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.raw_count = raw_count if raw_count is not None else len(self.points)
+
+    @property
+    def start_time(self):
+        return float(self.points[0, 0])
+
+    def xy(self):
+        return self.points[:, 1:3]
+
+
+class StrokeStore:
+    """
+    Collects draw points into strokes.
+
+    A stroke ends when a non-draw point arrives, when two draw points are more
+    than `max_gap` seconds apart, or when `expire` finds it idle for that long.
+    Finished strokes are simplified with tolerance `epsilon` (in board units).
+    """
+
+    def __init__(self, epsilon=0.002, max_gap=0.25):
+        self.epsilon = epsilon
+        self.max_gap = max_gap
+        self.strokes = []
+        self.current = []
+
+    def add(self, t, x, y, kind):
+        """ Add one point; returns the stroke this point finished, if any. """
+        finished = None
+        if kind != "draw":
+            return self.finish()
+        if self.current and t - self.current[-1][0] > self.max_gap:
+            finished = self.finish()
+        self.current.append((t, x, y))
+        return finished
+
+    def expire(self, now):
+        """ Finish the open stroke if no point has arrived for `max_gap` seconds. """
+        if self.current and now - self.current[-1][0] > self.max_gap:
+            return self.finish()
+        return None
+
+    def finish(self):
+        if not self.current:
+            return None
+        raw = np.array(self.current, dtype=np.float64)
+        self.current = []
+        stroke = Stroke(rdp(raw, self.epsilon), raw_count=len(raw))
+        self.strokes.append(stroke)
+        return stroke
+
+    def undo(self):
+        return self.strokes.pop() if self.strokes else None
+
+    def clear(self):
+        self.strokes = []
+        self.current = []
+
+    def render(self, width, height, color=(0, 0, 255), thickness=4, canvas=None):
+        """ Rasterize all strokes onto a (height, width, 3) canvas at any resolution. """
+        if canvas is None:
+            canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        scale = np.array([width, height], dtype=np.float64)
+        polylines = [np.round(stroke.xy() * scale).astype(np.int32) for stroke in self.strokes]
+        if polylines:
+            cv2.polylines(canvas, polylines, False, color, thickness, lineType=cv2.LINE_AA)
+        return canvas
+
+    def save(self, path):
+        """
+        Store strokes as quantized u16 coordinates and u32 millisecond offsets from
+        the first stroke, plus an index of where each stroke starts.
+        """
+        strokes = self.strokes + ([Stroke(self.current)] if self.current else [])
+        if not strokes:
+            np.savez_compressed(path, xy=np.zeros((0, 2), np.uint16), t_ms=np.zeros(0, np.uint32),
+                                offsets=np.zeros(1, np.int64), start_time=np.float64(0))
+            return
+        points = np.concatenate([stroke.points for stroke in strokes])
+        start_time = points[0, 0]
+        xy = np.round(np.clip(points[:, 1:3], 0.0, 1.0) * QUANT_MAX).astype(np.uint16)
+        t_ms = np.round((points[:, 0] - start_time) * 1000).astype(np.uint32)
+        offsets = np.cumsum([0] + [len(stroke.points) for stroke in strokes]).astype(np.int64)
+        np.savez_compressed(path, xy=xy, t_ms=t_ms, offsets=offsets, start_time=np.float64(start_time))
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        store = cls(**kwargs)
+        with np.load(path) as data:
+            xy = data["xy"].astype(np.float64) / QUANT_MAX
+            t = data["t_ms"].astype(np.float64) / 1000.0 + float(data["start_time"])
+            offsets = data["offsets"]
+        points = np.column_stack([t, xy])
+        store.strokes = [Stroke(points[a:b]) for a, b in zip(offsets[:-1], offsets[1:])]
+        return store
+
+    def stats(self):
+        raw = sum(stroke.raw_count for stroke in self.strokes)
+        kept = sum(len(stroke.points) for stroke in self.strokes)
+        return {'strokes': len(self.strokes), 'raw_points': raw, 'kept_points': kept}
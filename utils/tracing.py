@@ -0,0 +1,132 @@
+"""
+End-to-end latency tracing from camera capture to canvas render.
+
+With tracing on, every JSON message carries a `trace` object with wall-clock
+milliseconds stamped along the way:
+
+    seq        per-sender sequence number
+    t_capture  frame captured (LatestFrameCapture)
+    t_infer    landmarks for that frame available (recognizer callback or tracker)
+    t_enqueue  message built in send_sync
+    t_send     handed to the websocket
+    t_relay    forwarded by the Go relay
+    t_recv     received by the canvas
+    t_render   next animation frame after drawing
+
+The canvas echoes the trace back as a "trace_ack" message, and
+`LatencyCollector` turns the acks into per-hop histograms and a loss rate.
+Hops that cross machines are only as accurate as their clock sync.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+TRACE_ACK = "trace_ack"
+
+HOPS = (
+    ("inference", "t_capture", "t_infer"),
+    ("queue", "t_infer", "t_enqueue"),
+    ("sender", "t_enqueue", "t_send"),
+    ("relay", "t_send", "t_relay"),
+    ("delivery", "t_relay", "t_recv"),
+    ("render", "t_recv", "t_render"),
+    ("total", "t_capture", "t_render"),
+)
+
+# Histogram bucket upper edges in milliseconds; the last bucket is open-ended
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Offset that turns time.monotonic() readings into wall-clock seconds
+_WALL_OFFSET = time.time() - time.monotonic()
+
+
+def monotonic_to_ms(t):
+    """ Wall-clock milliseconds for a time.monotonic() reading, comparable across processes. """
+    return int(round((t + _WALL_OFFSET) * 1000))
+
+
+def wall_ms():
+    return int(round(time.time() * 1000))
+
+
+class LatencyCollector:
+    """
+    Matches trace acks to sent sequence numbers.
+
+    A sequence number counts as lost once it has gone `ack_timeout` seconds
+    without an ack; at most `max_pending` unacknowledged messages are tracked.
+    Hop latencies are kept as bucket counts plus the last `window` samples for
+    percentiles.
+    """
+
+    def __init__(self, ack_timeout=5.0, max_pending=4096, window=1000):
+        self.ack_timeout = ack_timeout
+        self.max_pending = max_pending
+        self.window = window
+        self.pending = OrderedDict()  # seq -> monotonic send time
+        self.histograms = {name: np.zeros(len(BUCKETS_MS) + 1, dtype=np.int64) for name, _, _ in HOPS}
+        self.samples = {name: [] for name, _, _ in HOPS}
+        self.counters = {'sent': 0, 'acked': 0, 'lost': 0, 'late': 0}
+        self.lock = threading.Lock()
+
+    def note_sent(self, seq):
+        now = time.monotonic()
+        with self.lock:
+            self.counters['sent'] += 1
+            self.pending[seq] = now
+            self._expire(now)
+
+    def record_ack(self, trace):
+        """ Feed one echoed trace object; returns the hop latencies it contained. """
+        with self.lock:
+            seq = trace.get('seq')
+            if self.pending.pop(seq, None) is None:
+                self.counters['late'] += 1  # already counted as lost, or from another session
+                return {}
+            self.counters['acked'] += 1
+            hops = {}
+            for name, start, end in HOPS:
+                if trace.get(start) is None or trace.get(end) is None:
+                    continue
+                value = max(0.0, float(trace[end]) - float(trace[start]))
+                hops[name] = value
+                self.histograms[name][np.searchsorted(BUCKETS_MS, value)] += 1
+                samples = self.samples[name]
+                samples.append(value)
+                if len(samples) > self.window:
+                    del samples[:len(samples) - self.window]
+            return hops
+
+    def _expire(self, now):
+        while self.pending:
+            seq, sent = next(iter(self.pending.items()))
+            if now - sent <= self.ack_timeout and len(self.pending) <= self.max_pending:
+                break
+            self.pending.popitem(last=False)
+            self.counters['lost'] += 1
+
+    def stats(self):
+        """ Counters, loss rate, and per-hop p50/p90/p99 plus bucket counts in milliseconds. """
+        with self.lock:
+            self._expire(time.monotonic())
+            snapshot = dict(self.counters)
+            settled = snapshot['acked'] + snapshot['lost']
+            snapshot['loss_rate'] = snapshot['lost'] / settled if settled else 0.0
+            hops = {}
+            for name, _, _ in HOPS:
+                values = self.samples[name]
+                if not values:
+                    continue
+                p50, p90, p99 = np.percentile(values, [50, 90, 99])
+                hops[name] = {
+                    'count': int(self.histograms[name].sum()),
+                    'p50_ms': float(p50),
+                    'p90_ms': float(p90),
+                    'p99_ms': float(p99),
+                    'buckets': dict(zip([f"<={edge}" for edge in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"],
+                                        self.histograms[name].tolist())),
+                }
+            snapshot['hops'] = hops
+        return snapshot
@@ -0,0 +1,137 @@
+import threading
+
+import cv2
+import numpy as np
+
+from utils.landmarks import ArrayHand, landmark_array
+
+
+class LandmarkTracker:
+    """
+    Detect-then-track scheduler.
+
+    Full landmark inference runs every `interval` frames; in between, the last
+    landmarks are carried forward with pyramidal Lucas-Kanade optical flow. The
+    interval shrinks when the hand moves fast or tracking degrades, and grows
+    when the hand is still or the per-frame time exceeds `frame_budget`.
+    """
+
+    LK_PARAMS = dict(winSize=(21, 21), maxLevel=3,
+                     criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+    def __init__(self, min_interval=1, max_interval=6, motion_low=2.0, motion_high=12.0,
+                 min_tracked=0.8, max_fb_error=1.5, frame_budget=None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.motion_low = motion_low
+        self.motion_high = motion_high
+        self.min_tracked = min_tracked
+        self.max_fb_error = max_fb_error
+        self.frame_budget = frame_budget
+
+        self.prev_gray = None
+        self.points = None  # (hands, 21, 2) float32 pixel coordinates
+        self.depths = None
+        self.frames_since_detect = 0
+        self.lost = True
+        self.frame_time = None
+
+        # Seeds can arrive from the recognizer's callback thread
+        self.seed_lock = threading.Lock()
+        self.pending_seed = None
+        self.counters = {'detections': 0, 'tracked_frames': 0, 'lost': 0}
+
+    def should_detect(self):
+        """ True when this frame should go through full inference. """
+        if self.lost or self.frames_since_detect >= self.interval:
+            self.frames_since_detect = 0
+            self.counters['detections'] += 1
+            return True
+        return False
+
+    def seed(self, image, hands, is_rgb=True, current=False):
+        """
+        Hand over fresh model landmarks together with the image they were computed on.
+
+        `current` marks a seed computed on the frame about to be tracked, which is
+        then returned as-is instead of being tracked onto itself.
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY if is_rgb else cv2.COLOR_BGR2GRAY)
+        with self.seed_lock:
+            self.pending_seed = (gray, hands, current)
+
+    def _apply_seed(self):
+        with self.seed_lock:
+            seed, self.pending_seed = self.pending_seed, None
+        if seed is None:
+            return False
+        gray, hands, current = seed
+        h, w = gray.shape
+        self.prev_gray = gray
+        if not hands:
+            self.points, self.depths, self.lost = None, None, True
+            return current
+        arrays = np.stack([landmark_array(hand) for hand in hands])
+        self.points = arrays[..., :2] * np.array([w, h], dtype=np.float32)
+        self.depths = arrays[..., 2:3].copy()
+        self.lost = False
+        return current
+
+    def track(self, frame):
+        """ Propagate landmarks onto `frame` (BGR) and return them as normalized hands. """
+        self.frames_since_detect += 1
+        if self._apply_seed():
+            return self._as_hands(self.prev_gray.shape)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        if self.points is None or self.prev_gray is None or self.prev_gray.shape != gray.shape:
+            self.prev_gray = gray
+            return []
+
+        p0 = self.points.reshape(-1, 1, 2)
+        p1, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, p0, None, **self.LK_PARAMS)
+        # Forward-backward check rejects points that drifted onto the background
+        p0r, status_back, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, p1, None, **self.LK_PARAMS)
+        fb_error = np.linalg.norm((p0 - p0r).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (status_back.ravel() == 1) & (fb_error < self.max_fb_error)
+
+        self.prev_gray = gray
+        if good.mean() < self.min_tracked:
+            self.counters['lost'] += 1
+            self.points, self.lost = None, True
+            return []
+
+        new_points = p1.reshape(self.points.shape)
+        motion = float(np.median(np.linalg.norm((new_points - self.points).reshape(-1, 2)[good], axis=1)))
+        self.points = new_points
+        self._adapt(motion)
+        self.counters['tracked_frames'] += 1
+
+        return self._as_hands(gray.shape)
+
+    def _as_hands(self, shape):
+        if self.points is None:
+            return []
+        h, w = shape
+        arrays = np.concatenate([self.points / np.array([w, h], dtype=np.float32), self.depths], axis=2)
+        return [ArrayHand(array) for array in arrays]
+
+    def note_frame_time(self, seconds):
+        """ Feed the measured per-frame processing time into the load-based interval control. """
+        self.frame_time = seconds if self.frame_time is None else 0.9 * self.frame_time + 0.1 * seconds
+
+    def _adapt(self, motion):
+        interval = self.interval
+        if motion > self.motion_high:
+            interval -= 1
+        elif motion < self.motion_low:
+            interval += 1
+        if self.frame_budget and self.frame_time and self.frame_time > self.frame_budget:
+            interval += 1
+        self.interval = min(self.max_interval, max(self.min_interval, interval))
+
+    def stats(self):
+        snapshot = dict(self.counters)
+        snapshot['interval'] = self.interval
+        return snapshot